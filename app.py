@@ -2,7 +2,8 @@
 Flask web application for interactive data analysis and prediction.
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, Response,
+                   stream_with_context, g)
 import pandas as pd
 import numpy as np
 import os
@@ -20,9 +21,25 @@ from datetime import datetime
 import sys
 sys.path.append('src')
 from analysis.data_analyzer import DataAnalyzer
+from analysis.sketches import load_quantile_sketches
+from analysis.incremental import update_analysis_state
+from analysis.sampling import draw_sample
+from analysis.out_of_core import OutOfCoreAnalyzer
+from analysis.aggregation import GroupIndex
 from models.predictor import Predictor
+from models.registry import ModelRegistry, dataset_fingerprint, stored_fingerprint, model_key
+from models.scoring import iter_scored_csv, score_to_csv
+from models.jobs import JobQueue
 from visualization.plotter import Plotter
 from utils.data_generator import generate_sample_data
+from utils.dataset_cache import DatasetCache
+from utils.data_loader import (read_dataset, ingest_upload, dataset_columns, iter_dataset_chunks,
+                               dataframe_nbytes)
+from utils.streaming_upload import StreamingUpload, load_upload_profile
+from utils.row_index import RowIndex
+from utils.column_store import ColumnStore
+from utils.cpu_budget import CPUBudget
+from utils.excel_converter import ExcelConverter, excel_sheet_names
 from config import config
 
 app = Flask(__name__)
@@ -38,6 +55,24 @@ os.makedirs('static/plots', exist_ok=True)
 
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 
+# Cores of this worker process (its share of the host among WEB_CONCURRENCY
+# workers), reserved by requests and training jobs while they run
+cpu_budget = CPUBudget(threads=app.config['CPU_THREADS'])
+cpu_budget.limit_native_threads()
+
+# Parsed uploads shared by all routes of this worker process
+dataset_cache = DatasetCache(max_bytes=app.config['DATASET_CACHE_MAX_BYTES'])
+
+# Fitted models, shared with the other worker processes through the disk
+model_registry = ModelRegistry(app.config['MODEL_REGISTRY_FOLDER'], max_bytes=app.config['MODEL_REGISTRY_MAX_BYTES'])
+
+# Background model training, run by this worker's own thread pool
+training_queue = JobQueue(app.config['JOBS_FOLDER'], max_workers=app.config['TRAINING_WORKERS'],
+                          max_pending=app.config['TRAINING_MAX_PENDING'])
+
+# Background Excel-to-columnar conversion
+excel_converter = ExcelConverter(max_workers=app.config['EXCEL_CONVERSION_WORKERS'])
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -50,6 +85,120 @@ def create_plot_base64(fig):
     plt.close(fig)
     return plot_url
 
+def request_threads(requested):
+    """
+    Threads the current request may use, reserved from the CPU budget until it ends.
+    
+    Args:
+        requested: default thread count, overridden by the request's
+            ``n_jobs`` parameter; -1 asks for every free thread
+    """
+    if 'cpu_threads' not in g:
+        g.cpu_threads = cpu_budget.reserve(request.values.get('n_jobs', requested, type=int))
+    return g.cpu_threads
+
+@app.teardown_request
+def release_threads(exc):
+    threads = g.pop('cpu_threads', None)
+    if threads is not None:
+        cpu_budget.release(threads)
+
+def load_dataset(filename, columns=None):
+    """
+    Load an uploaded dataset through the shared parsed-dataset cache.
+    
+    Args:
+        filename: name of the file in the upload folder
+        columns: optional list of columns to load from the columnar copy
+    """
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if columns is None:
+        return dataset_cache.get_or_load(filepath)
+    return dataset_cache.get_or_load(
+        filepath,
+        loader=lambda path: read_dataset(path, columns=columns),
+        namespace=('data',) + tuple(columns)
+    )
+
+def load_analysis_state(filename, data, track_correlations=True):
+    """
+    Return the mergeable analysis state of a dataset, shared through the cache.
+    
+    On a cache miss the state stored next to the upload is reused; if the
+    upload appended rows to the dataset it describes, only those rows are
+    analyzed.
+    
+    Args:
+        filename: name of the file in the upload folder
+        data: the parsed dataset
+        track_correlations: keep the Pearson sums (not for very wide tables)
+    """
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    return dataset_cache.get_or_load(
+        filepath,
+        loader=lambda path: update_analysis_state(path, data, track_correlations=track_correlations),
+        namespace=('analysis_state', track_correlations),
+        size_of=lambda state: state.nbytes
+    )
+
+def load_sample(filename, stratify_by=None):
+    """
+    Return a random sample of a dataset for fast previews, shared through the cache.
+    
+    The sample is drawn in one pass over chunks of the file, so the full
+    dataset is never held in memory.
+    
+    Args:
+        filename: name of the file in the upload folder
+        stratify_by: optional categorical column to stratify the sample on
+    """
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if stratify_by:
+        size = app.config['PREVIEW_ROWS_PER_STRATUM']
+    else:
+        size = app.config['PREVIEW_SAMPLE_ROWS']
+    return dataset_cache.get_or_load(
+        filepath,
+        loader=lambda path: draw_sample(iter_dataset_chunks(path), size, stratify_by=stratify_by),
+        namespace=('sample', size, stratify_by),
+        size_of=lambda sample: dataframe_nbytes(sample.data)
+    )
+
+def load_out_of_core_analyzer(filename):
+    """
+    Return the out-of-core analyzer of a dataset, shared through the cache.
+    
+    The memory-mapped column files are written on first use; the analyzer
+    keeps its one-pass results, so later requests do not scan the rows again.
+    """
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    def open_analyzer(path):
+        store = ColumnStore.open_or_build(path)
+        if store is None:
+            raise ValueError(f"Could not write the column files of {filename}")
+        return OutOfCoreAnalyzer(store)
+    
+    return dataset_cache.get_or_load(filepath, loader=open_analyzer, namespace='out_of_core',
+                                     size_of=lambda analyzer: analyzer.nbytes)
+
+def load_group_index(filename, column, data):
+    """
+    Return the factorized group index of a key column, shared through the cache.
+    
+    The key column is hashed once per dataset; later aggregations by it, of
+    any measure or function, only reuse its group codes.
+    """
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    return dataset_cache.get_or_load(filepath, loader=lambda path: GroupIndex.from_column(data[column]),
+                                     namespace=('group_index', column), size_of=lambda index: index.nbytes)
+
+def ingest_dataset(filename):
+    """Parse a new upload once, write its columnar copy and cache it."""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    dataset_cache.invalidate(filepath)
+    return dataset_cache.get_or_load(filepath, loader=ingest_upload)
+
 @app.route('/')
 def index():
     """Main dashboard page."""
@@ -73,12 +222,20 @@ def upload_file():
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
             file.save(filepath)
             
+            if not filename.endswith('.csv'):
+                # Workbooks are converted in the background; single-sheet
+                # files start right away, others go to the sheet picker
+                try:
+                    if len(excel_sheet_names(filepath)) == 1:
+                        excel_converter.submit(filepath)
+                    return redirect(url_for('convert_excel', filename=filename))
+                except Exception as e:
+                    flash(f'Error processing file: {str(e)}')
+                    return redirect(url_for('upload_file'))
+            
             try:
-                # Load the data
-                if filename.endswith('.csv'):
-                    data = pd.read_csv(filepath)
-                else:
-                    data = pd.read_excel(filepath)
+                # Load the data and convert it to the columnar format
+                data = ingest_dataset(filename)
                 
                 # Store basic info in session (simplified for demo)
                 session_data = {
@@ -87,7 +244,8 @@ def upload_file():
                     'columns': data.columns.tolist(),
                     'dtypes': data.dtypes.astype(str).to_dict(),
                     'head': data.head().to_dict(),
-                    'missing': data.isnull().sum().to_dict()
+                    'missing': data.isnull().sum().to_dict(),
+                    'memory': data.attrs.get('memory_report')
                 }
                 
                 return render_template('analysis.html', 
@@ -101,7 +259,111 @@ def upload_file():
             flash('Invalid file type. Please upload CSV or Excel files.')
             return redirect(request.url)
     
-    return render_template('upload.html')
+    return render_template('upload.html',
+                         max_content_length=app.config['MAX_CONTENT_LENGTH'],
+                         stream_chunk_size=app.config['STREAM_CHUNK_SIZE'])
+
+@app.route('/api/upload_stream/<filename>', methods=['GET', 'POST'])
+def api_upload_stream(filename):
+    """
+    Receive a large CSV as a sequence of chunks.
+    
+    Each POST carries one raw chunk with its byte ``offset`` in the file,
+    the ``size`` of the whole file and ``final=1`` on the last one; the
+    response is the running profile. A GET returns the current progress so
+    an interrupted upload can be resumed from ``received_bytes``; a chunk
+    at offset 0 starts the upload over.
+    """
+    filename = secure_filename(filename)
+    if not filename.endswith('.csv'):
+        return jsonify({'error': 'Streaming uploads are only supported for CSV files'}), 400
+    
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    upload = StreamingUpload(filepath,
+                             block_size=app.config['STREAM_BLOCK_SIZE'],
+                             max_bytes=app.config['MAX_STREAM_UPLOAD_LENGTH'])
+    
+    if request.method == 'GET':
+        summary = upload.summary()
+        summary['conversion'] = excel_converter.status(filepath)
+        return jsonify(summary)
+    
+    try:
+        offset = request.args.get('offset', 0, type=int)
+        final = request.args.get('final', '0') == '1'
+        summary = upload.append(request.stream, offset, final=final,
+                                total_bytes=request.args.get('size', type=int))
+    except ValueError as ve:
+        return jsonify({'error': str(ve), 'received_bytes': upload.received_bytes}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if final:
+        # The columnar copy and row index read the whole file, so they are
+        # built in the background; the summary page follows their progress
+        dataset_cache.invalidate(filepath)
+        excel_converter.submit_csv(filepath, dtypes=summary['dtypes'], missing=summary['missing'])
+        summary['conversion'] = excel_converter.status(filepath)
+        summary['redirect'] = url_for('uploaded_summary', filename=filename)
+    
+    summary['filename'] = filename
+    return jsonify(summary)
+
+@app.route('/convert_excel/<filename>', methods=['GET', 'POST'])
+def convert_excel(filename):
+    """Pick the sheet of a workbook and follow its background conversion."""
+    filename = secure_filename(filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(filepath):
+        flash('File not found.')
+        return redirect(url_for('upload_file'))
+    
+    if request.method == 'POST':
+        excel_converter.submit(filepath,
+                               sheet=request.form.get('sheet', 0),
+                               all_sheets=request.form.get('all_sheets') == 'on')
+        return redirect(url_for('convert_excel', filename=filename))
+    
+    status = excel_converter.status(filepath)
+    if status is not None and status['status'] == 'done':
+        return redirect(url_for('uploaded_summary', filename=filename))
+    if status is not None and status['status'] == 'error':
+        flash(f"Error converting workbook: {status['error']}")
+    
+    return render_template('convert_excel.html',
+                         filename=filename,
+                         sheets=excel_sheet_names(filepath),
+                         status=status)
+
+@app.route('/api/conversion_status/<filename>')
+def api_conversion_status(filename):
+    """API endpoint to poll the background conversion of a workbook."""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    return jsonify(excel_converter.status(filepath) or {'status': 'not_started'})
+
+@app.route('/uploaded/<filename>')
+def uploaded_summary(filename):
+    """Show the summary of an upload that was profiled or converted off the request."""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    session_data = load_upload_profile(filepath)
+    if session_data is None:
+        index = RowIndex.load(filepath)
+        if index is None:
+            flash('Upload not found or not finished yet.')
+            return redirect(url_for('upload_file'))
+        session_data = {
+            'shape': index.shape,
+            'columns': index.columns,
+            'dtypes': index.dtypes,
+            'head': index.read_rows(0, 5).to_dict(),
+            'missing': index.missing
+        }
+    
+    session_data['filename'] = filename
+    return render_template('analysis.html',
+                         data_info=session_data,
+                         filename=filename,
+                         conversion=excel_converter.status(filepath))
 
 @app.route('/generate_sample')
 def generate_sample():
@@ -109,7 +371,8 @@ def generate_sample():
     try:
         # Generate sample data
         sample_file = os.path.join(app.config['UPLOAD_FOLDER'], 'sample_data.csv')
-        data = generate_sample_data(sample_file, n_samples=500)
+        generate_sample_data(sample_file, n_samples=500)
+        data = ingest_dataset('sample_data.csv')
         
         session_data = {
             'filename': 'sample_data.csv',
@@ -117,7 +380,8 @@ def generate_sample():
             'columns': data.columns.tolist(),
             'dtypes': data.dtypes.astype(str).to_dict(),
             'head': data.head().to_dict(),
-            'missing': data.isnull().sum().to_dict()
+            'missing': data.isnull().sum().to_dict(),
+            'memory': data.attrs.get('memory_report')
         }
         
         flash('Sample data generated successfully!')
@@ -131,23 +395,60 @@ def generate_sample():
 
 @app.route('/analyze/<filename>')
 def analyze_data(filename):
-    """Perform comprehensive data analysis."""
+    """
+    Perform comprehensive data analysis.
+    
+    With ?preview=1 only a random sample is analyzed (stratified on the
+    column given as ?stratify=<column>), and every estimate is reported
+    with its confidence margin. Files of at least OUT_OF_CORE_MIN_BYTES, or
+    any file with ?out_of_core=1, are analyzed in chunks over memory-mapped
+    column files instead of being loaded.
+    """
     try:
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        if filename.endswith('.csv'):
-            data = pd.read_csv(filepath)
+        preview = request.args.get('preview', '0') == '1'
+        out_of_core = not preview and (request.args.get('out_of_core', '0') == '1' or
+                                       os.path.getsize(filepath) >= app.config['OUT_OF_CORE_MIN_BYTES'])
+        n_jobs = request_threads(app.config['PROFILING_WORKERS'])
+        
+        if out_of_core:
+            analyzer = load_out_of_core_analyzer(filename)
+            analyzer.n_jobs = n_jobs
+            columns = analyzer.columns
+            numeric_columns = pd.Index(analyzer.numeric_columns)
         else:
-            data = pd.read_excel(filepath)
-        
-        # Initialize analyzer
-        analyzer = DataAnalyzer(data)
-        
-        # Basic statistics
-        stats = analyzer.basic_stats()
+            if preview:
+                sample = load_sample(filename, stratify_by=request.args.get('stratify') or None)
+                data = sample.data
+            else:
+                data = load_dataset(filename)
+            columns = data.columns.tolist()
+            numeric_columns = data.select_dtypes(include=[np.number]).columns
+        
+        # Wide tables only get their strongest pairs; narrower ones share one
+        # matrix between the analysis and the heatmap
+        wide = len(numeric_columns) > app.config['CORRELATION_MAX_DENSE_COLUMNS']
+        
+        if preview:
+            analyzer = DataAnalyzer.from_sample(sample, confidence=app.config['PREVIEW_CONFIDENCE'], n_jobs=n_jobs)
+        elif not out_of_core:
+            # Initialize analyzer from the dataset's mergeable analysis state, so
+            # appended uploads only analyze their new rows
+            analyzer = DataAnalyzer(data, quantile_sketches=load_quantile_sketches(filepath), n_jobs=n_jobs,
+                                    analysis_state=load_analysis_state(filename, data, track_correlations=not wide))
+        
+        # Basic statistics; categorical summaries are sketched unless ?exact=1
+        stats = analyzer.basic_stats(exact_categorical=request.args.get('exact', '0') == '1')
         
         # Correlation analysis
-        corr_matrix = analyzer.correlation_analysis()
+        corr_matrix = None
+        if wide and out_of_core:
+            flash(f'Correlation analysis was skipped: this large file has more than '
+                  f'{app.config["CORRELATION_MAX_DENSE_COLUMNS"]} numeric columns.')
+        elif wide:
+            analyzer.correlation_analysis(top_k=app.config['CORRELATION_TOP_K'], dtype=np.float32)
+        else:
+            corr_matrix = analyzer.correlation_analysis()
         
         # Data quality report
         quality_report = analyzer.data_quality_report()
@@ -156,14 +457,17 @@ def analyze_data(filename):
         plots = {}
         
         # Distribution plots for numeric columns
-        numeric_columns = data.select_dtypes(include=[np.number]).columns
         if len(numeric_columns) > 0:
             fig, axes = plt.subplots(2, 2, figsize=(15, 12))
             fig.suptitle('Data Distributions', fontsize=16)
             
             for i, col in enumerate(numeric_columns[:4]):
                 row, col_idx = divmod(i, 2)
-                data[col].hist(bins=30, ax=axes[row, col_idx], alpha=0.7)
+                if out_of_core:
+                    counts, edges = analyzer.histogram(col, bins=30)
+                    axes[row, col_idx].stairs(counts, edges, fill=True, alpha=0.7)
+                else:
+                    data[col].hist(bins=30, ax=axes[row, col_idx], alpha=0.7)
                 axes[row, col_idx].set_title(f'Distribution of {col}')
                 axes[row, col_idx].set_xlabel(col)
                 axes[row, col_idx].set_ylabel('Frequency')
@@ -177,9 +481,9 @@ def analyze_data(filename):
             plots['distributions'] = create_plot_base64(fig)
         
         # Correlation heatmap
-        if len(numeric_columns) > 1:
+        if corr_matrix is not None:
             fig, ax = plt.subplots(figsize=(10, 8))
-            sns.heatmap(data[numeric_columns].corr(), 
+            sns.heatmap(corr_matrix, 
                        annot=True, cmap='coolwarm', center=0,
                        square=True, fmt='.2f', ax=ax)
             ax.set_title('Correlation Heatmap')
@@ -191,7 +495,7 @@ def analyze_data(filename):
                              stats=stats,
                              quality_report=quality_report,
                              plots=plots,
-                             columns=data.columns.tolist(),
+                             columns=columns,
                              numeric_columns=numeric_columns.tolist())
     
     except Exception as e:
@@ -202,26 +506,116 @@ def analyze_data(filename):
 def predict_page(filename):
     """Show prediction interface."""
     try:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        if filename.endswith('.csv'):
-            data = pd.read_csv(filepath)
-        else:
-            data = pd.read_excel(filepath)
+        data = load_dataset(filename)
         
         numeric_columns = data.select_dtypes(include=[np.number]).columns.tolist()
-        categorical_columns = data.select_dtypes(include=['object']).columns.tolist()
+        categorical_columns = data.select_dtypes(include=['object', 'category']).columns.tolist()
+        datetime_columns = data.select_dtypes(include=['datetime', 'datetimetz']).columns.tolist()
         
         return render_template('predict.html',
                              filename=filename,
                              numeric_columns=numeric_columns,
                              categorical_columns=categorical_columns,
+                             datetime_columns=datetime_columns,
                              all_columns=data.columns.tolist())
     
     except Exception as e:
         flash(f'Error loading prediction page: {str(e)}')
         return redirect(url_for('index'))
 
+def render_prediction_results(filename, predictor, model_type, key, cached=False):
+    """
+    Render the results page of a fitted Predictor: metrics and plots.
+    
+    Args:
+        filename: name of the dataset the model was trained on
+        predictor: fitted Predictor, freshly trained or from the registry
+        model_type: model type selected on the prediction form
+        key: registry key of the model
+        cached: whether the model was loaded from the registry
+    """
+    feature_columns = predictor.feature_columns
+    target_column = predictor.target_column
+    performance = predictor.performance
+    
+    # Generate prediction plots
+    plots = {}
+    
+    # Only create regression plots for regression models
+    if performance['model_type'] == 'regression':
+        # Actual vs Predicted plot
+        fig, axes = plt.subplots(1, 2, figsize=(15, 6))
+        
+        # Actual vs Predicted scatter
+        axes[0].scatter(predictor.y_test, predictor.y_pred, alpha=0.6)
+        min_val = min(min(predictor.y_test), min(predictor.y_pred))
+        max_val = max(max(predictor.y_test), max(predictor.y_pred))
+        axes[0].plot([min_val, max_val], [min_val, max_val], 'r--', lw=2)
+        axes[0].set_xlabel('Actual Values')
+        axes[0].set_ylabel('Predicted Values')
+        axes[0].set_title('Actual vs Predicted')
+        axes[0].grid(True, alpha=0.3)
+        
+        # Residuals plot
+        residuals = predictor.y_test - predictor.y_pred
+        axes[1].scatter(predictor.y_pred, residuals, alpha=0.6, color='red')
+        axes[1].axhline(y=0, color='black', linestyle='-')
+        axes[1].set_xlabel('Predicted Values')
+        axes[1].set_ylabel('Residuals')
+        axes[1].set_title('Residuals Plot')
+        axes[1].grid(True, alpha=0.3)
+        
+        plt.tight_layout()
+        plots['predictions'] = create_plot_base64(fig)
+    else:
+        # For classification, create confusion matrix-style plot
+        from sklearn.metrics import confusion_matrix
+        import seaborn as sns
+        
+        # Get unique labels
+        unique_labels = np.unique(np.concatenate([predictor.y_test, predictor.y_pred]))
+        cm = confusion_matrix(predictor.y_test, predictor.y_pred, labels=unique_labels)
+        
+        fig, ax = plt.subplots(figsize=(8, 6))
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax)
+        ax.set_xlabel('Predicted')
+        ax.set_ylabel('Actual')
+        ax.set_title('Confusion Matrix')
+        
+        plt.tight_layout()
+        plots['predictions'] = create_plot_base64(fig)
+    
+    # Feature importance (if available)
+    importance_df = predictor.get_feature_importance()
+    if importance_df is not None and len(importance_df) > 0:
+        try:
+            fig, ax = plt.subplots(figsize=(10, max(6, len(importance_df) * 0.4)))
+            bars = ax.barh(importance_df['feature'], importance_df['importance'])
+            ax.set_xlabel('Importance')
+            ax.set_title('Feature Importance')
+            ax.invert_yaxis()
+            
+            # Add value labels
+            for bar, importance in zip(bars, importance_df['importance']):
+                ax.text(bar.get_width() + 0.001, bar.get_y() + bar.get_height()/2, 
+                       f'{importance:.3f}', ha='left', va='center')
+            
+            plt.tight_layout()
+            plots['feature_importance'] = create_plot_base64(fig)
+        except Exception as e:
+            print(f"Warning: Could not create feature importance plot: {e}")
+            # Continue without feature importance plot
+    
+    return render_template('prediction_results.html',
+                         filename=filename,
+                         performance=performance,
+                         plots=plots,
+                         feature_columns=feature_columns,
+                         target_column=target_column,
+                         model_type=model_type,
+                         model_key=key,
+                         cached_model=cached)
+
 @app.route('/run_prediction', methods=['POST'])
 def run_prediction():
     """Execute machine learning prediction."""
@@ -245,110 +639,73 @@ def run_prediction():
             return redirect(url_for('predict_page', filename=filename))
         
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        if filename.endswith('.csv'):
-            data = pd.read_csv(filepath)
-        else:
-            data = pd.read_excel(filepath)
+        available_columns = dataset_columns(filepath)
         
         # Check if selected columns exist
         missing_columns = []
         for col in feature_columns + [target_column]:
-            if col not in data.columns:
+            if col not in available_columns:
                 missing_columns.append(col)
         
         if missing_columns:
             flash(f'Missing columns in dataset: {", ".join(missing_columns)}')
             return redirect(url_for('predict_page', filename=filename))
         
-        # Check if we have enough data
-        if len(data) < 10:
-            flash('Dataset too small. Need at least 10 rows for training.')
-            return redirect(url_for('predict_page', filename=filename))
-        
-        # Initialize predictor
-        predictor = Predictor()
-        
-        # Train model
-        performance = predictor.train_model(
-            data, feature_columns, target_column, model_type=model_type
-        )
-        
-        # Generate prediction plots
-        plots = {}
-        
-        # Only create regression plots for regression models
-        if performance['model_type'] == 'regression':
-            # Actual vs Predicted plot
-            fig, axes = plt.subplots(1, 2, figsize=(15, 6))
-            
-            # Actual vs Predicted scatter
-            axes[0].scatter(predictor.y_test, predictor.y_pred, alpha=0.6)
-            min_val = min(min(predictor.y_test), min(predictor.y_pred))
-            max_val = max(max(predictor.y_test), max(predictor.y_pred))
-            axes[0].plot([min_val, max_val], [min_val, max_val], 'r--', lw=2)
-            axes[0].set_xlabel('Actual Values')
-            axes[0].set_ylabel('Predicted Values')
-            axes[0].set_title('Actual vs Predicted')
-            axes[0].grid(True, alpha=0.3)
+        # Identical data and settings reuse the model fitted by any worker
+        training_config = {'features': feature_columns, 'target': target_column, 'model_type': model_type}
+        if not filename.endswith('.csv'):
+            # Every sheet of a workbook is a different dataset with the same file bytes
+            conversion = excel_converter.status(filepath)
+            training_config['sheet'] = conversion['sheet'] if conversion is not None else 0
+        time_budget = None
+        if model_type == 'auto':
+            # The search budget changes the model found, so it is part of the key
+            time_budget = request.form.get('time_budget', app.config['AUTO_SEARCH_SECONDS'], type=float)
+            training_config['time_budget'] = time_budget
+        
+        # Hashing reads the whole upload, so only a fingerprint computed
+        # earlier is used here; otherwise the job computes it
+        fingerprint = stored_fingerprint(filepath)
+        if fingerprint is not None:
+            key = model_key(fingerprint, training_config)
+            predictor = model_registry.get(key)
+            if predictor is not None:
+                print(f"📦 Loaded model {key} from the registry")
+                return render_prediction_results(filename, predictor, model_type, key, cached=True)
+        
+        requested_threads = request.form.get('n_jobs', app.config['TRAINING_THREADS'], type=int)
+        
+        def train(progress):
+            progress(0.0, 'Fingerprinting the dataset')
+            key = model_key(dataset_fingerprint(filepath), training_config)
             
-            # Residuals plot
-            residuals = predictor.y_test - predictor.y_pred
-            axes[1].scatter(predictor.y_pred, residuals, alpha=0.6, color='red')
-            axes[1].axhline(y=0, color='black', linestyle='-')
-            axes[1].set_xlabel('Predicted Values')
-            axes[1].set_ylabel('Residuals')
-            axes[1].set_title('Residuals Plot')
-            axes[1].grid(True, alpha=0.3)
-            
-            plt.tight_layout()
-            plots['predictions'] = create_plot_base64(fig)
-        else:
-            # For classification, create confusion matrix-style plot
-            from sklearn.metrics import confusion_matrix
-            import seaborn as sns
-            
-            # Get unique labels
-            unique_labels = np.unique(np.concatenate([predictor.y_test, predictor.y_pred]))
-            cm = confusion_matrix(predictor.y_test, predictor.y_pred, labels=unique_labels)
-            
-            fig, ax = plt.subplots(figsize=(8, 6))
-            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax)
-            ax.set_xlabel('Predicted')
-            ax.set_ylabel('Actual')
-            ax.set_title('Confusion Matrix')
-            
-            plt.tight_layout()
-            plots['predictions'] = create_plot_base64(fig)
-        
-        # Feature importance (if available)
-        importance_df = predictor.get_feature_importance()
-        if importance_df is not None and len(importance_df) > 0:
-            try:
-                fig, ax = plt.subplots(figsize=(10, max(6, len(importance_df) * 0.4)))
-                bars = ax.barh(importance_df['feature'], importance_df['importance'])
-                ax.set_xlabel('Importance')
-                ax.set_title('Feature Importance')
-                ax.invert_yaxis()
+            def fit():
+                # Only the selected columns are read from the columnar copy
+                data = load_dataset(filename, columns=feature_columns + [target_column])
                 
-                # Add value labels
-                for bar, importance in zip(bars, importance_df['importance']):
-                    ax.text(bar.get_width() + 0.001, bar.get_y() + bar.get_height()/2, 
-                           f'{importance:.3f}', ha='left', va='center')
+                # Check if we have enough data
+                if len(data) < 10:
+                    raise ValueError('Dataset too small. Need at least 10 rows for training.')
                 
-                plt.tight_layout()
-                plots['feature_importance'] = create_plot_base64(fig)
-            except Exception as e:
-                print(f"Warning: Could not create feature importance plot: {e}")
-                # Continue without feature importance plot
-        
-        return render_template('prediction_results.html',
-                             filename=filename,
-                             performance=performance,
-                             plots=plots,
-                             feature_columns=feature_columns,
-                             target_column=target_column,
-                             model_type=model_type)
+                # Threads are reserved while the job trains, not while it waits
+                predictor = Predictor()
+                with cpu_budget.reserved(requested_threads) as n_jobs:
+                    predictor.train_model(data, feature_columns, target_column, model_type=model_type,
+                                          progress=progress, n_jobs=n_jobs, time_budget=time_budget)
+                return predictor
+            
+            model_registry.get_or_train(key, fit, metadata=dict(training_config, filename=filename))
+            return {'model_key': key}
+        
+        # Train in the background; the job page follows it and shows the results.
+        # Resubmitting the same version of the upload joins the running job.
+        stat = os.stat(filepath)
+        job_key = model_key([filepath, stat.st_mtime_ns, stat.st_size], training_config)
+        job_id = training_queue.submit(train, key=job_key, filename=filename, model_type=model_type,
+                                       target=target_column, features=feature_columns)
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'job_id': job_id, 'status_url': url_for('api_job_status', job_id=job_id)}), 202
+        return redirect(url_for('training_job', job_id=job_id))
     
     except ValueError as ve:
         flash(f'Data validation error: {str(ve)}')
@@ -358,30 +715,184 @@ def run_prediction():
         flash(f'Error running prediction: {str(e)}')
         return redirect(url_for('predict_page', filename=filename))
 
+@app.route('/jobs/<job_id>')
+def training_job(job_id):
+    """Follow a background training job; shows its results once it is done."""
+    status = training_queue.status(job_id)
+    if status is None:
+        flash('Training job not found.')
+        return redirect(url_for('index'))
+    
+    if status['status'] == 'done':
+        key = status['result']['model_key']
+        predictor = model_registry.get(key)
+        if predictor is not None:
+            return render_prediction_results(status['filename'], predictor, status['model_type'], key)
+        flash('The trained model is no longer in the registry. Please train it again.')
+        return redirect(url_for('predict_page', filename=status['filename']))
+    if status['status'] == 'error':
+        flash(f"Error running prediction: {status['error']}")
+        return redirect(url_for('predict_page', filename=status['filename']))
+    
+    return render_template('training_job.html', job=status)
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """API endpoint to get the status and progress of a training job."""
+    status = training_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    """API endpoint to cancel a queued or running training job."""
+    if not training_queue.cancel(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 409
+    return jsonify(training_queue.status(job_id))
+
 @app.route('/api/data_preview/<filename>')
 def api_data_preview(filename):
-    """API endpoint to get data preview."""
+    """
+    API endpoint to get data preview.
+    
+    Accepts ``offset`` and ``limit`` query parameters to page through the
+    rows. Answered from the upload's row index when one exists, so only the
+    requested rows are parsed.
+    """
     try:
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', 10, type=int)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        if filename.endswith('.csv'):
-            data = pd.read_csv(filepath)
+        index = RowIndex.load(filepath)
+        
+        if index is not None and index.row_count is not None:
+            preview = {
+                'shape': index.shape,
+                'columns': index.columns,
+                'head': index.read_rows(offset, limit).to_dict('records'),
+                'dtypes': index.dtypes,
+                'missing': index.missing
+            }
         else:
-            data = pd.read_excel(filepath)
-        
-        preview = {
-            'shape': data.shape,
-            'columns': data.columns.tolist(),
-            'head': data.head(10).to_dict('records'),
-            'dtypes': data.dtypes.astype(str).to_dict(),
-            'missing': data.isnull().sum().to_dict()
-        }
+            data = load_dataset(filename)
+            preview = {
+                'shape': data.shape,
+                'columns': data.columns.tolist(),
+                'head': data.iloc[offset:offset + limit].to_dict('records'),
+                'dtypes': data.dtypes.astype(str).to_dict(),
+                'missing': data.isnull().sum().to_dict()
+            }
+        preview['offset'] = offset
+        preview['limit'] = limit
         
         return jsonify(preview)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/aggregate/<filename>')
+def api_aggregate(filename):
+    """
+    API endpoint to aggregate measures by categorical columns.
+    
+    Accepts comma-separated ``by`` (key columns), ``values`` (measures,
+    every numeric column by default), ``agg`` (functions, mean by default)
+    and ``pivot`` (key columns spread across the result's columns) query
+    parameters.
+    """
+    try:
+        def column_list(name, default=''):
+            return [col for col in request.args.get(name, default).split(',') if col]
+        
+        by = column_list('by')
+        if not by:
+            return jsonify({'error': 'No group-by column given'}), 400
+        pivot = column_list('pivot')
+        agg = column_list('agg', 'mean')
+        
+        data = load_dataset(filename)
+        keys = [col for col in by + pivot if col in data.columns]
+        analyzer = DataAnalyzer(data, n_jobs=request_threads(app.config['PROFILING_WORKERS']),
+                                group_indexes={col: load_group_index(filename, col, data) for col in keys})
+        result = analyzer.aggregate(by, values=column_list('values') or None, agg=agg, pivot=pivot or None)
+        
+        # Flatten (measure, function) and pivoted column labels for JSON
+        result.columns = ['_'.join(map(str, col)) if isinstance(col, tuple) else str(col)
+                          for col in result.columns]
+        result = result.reset_index()
+        result = result.astype(object).where(result.notna(), None)
+        return jsonify({
+            'by': by,
+            'pivot': pivot,
+            'agg': agg,
+            'n_groups': len(result),
+            'columns': result.columns.tolist(),
+            'rows': result.to_dict('records')
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/models')
+def api_models():
+    """API endpoint to list the fitted models of the registry."""
+    return jsonify({'models': model_registry.entries(), 'stats': model_registry.stats()})
+
+@app.route('/api/score/<key>', methods=['POST'])
+def api_score(key):
+    """
+    API endpoint to score a CSV with a registered model.
+    
+    The rows come from an uploaded ``file`` or from the upload named by
+    ``filename``, and are scored chunk by chunk. The scored CSV is streamed
+    back as a download, or written to the outputs folder with
+    ``output=file``. ``columns`` (comma-separated) limits the input columns
+    copied next to the predictions.
+    """
+    try:
+        predictor = model_registry.get(key)
+        if predictor is None:
+            return jsonify({'error': f"Model '{key}' not found"}), 404
+        
+        chunk_rows = app.config['SCORING_CHUNK_ROWS']
+        upload = request.files.get('file')
+        if upload is not None and upload.filename:
+            name = secure_filename(upload.filename)
+            chunks = pd.read_csv(upload.stream, chunksize=chunk_rows)
+        else:
+            name = secure_filename(request.values.get('filename', ''))
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], name)
+            if not name or not os.path.exists(filepath):
+                return jsonify({'error': 'No file to score'}), 400
+            chunks = iter_dataset_chunks(filepath, chunk_size=chunk_rows)
+        
+        columns = [col for col in request.values.get('columns', '').split(',') if col] or None
+        options = {'n_jobs': request_threads(app.config['SCORING_WORKERS']), 'columns': columns}
+        output_name = f"{os.path.splitext(name)[0]}_scored_{key[:8]}.csv"
+        
+        if request.values.get('output') == 'file':
+            destination = os.path.join('outputs', output_name)
+            rows = score_to_csv(predictor, chunks, destination, **options)
+            return jsonify({'model': key, 'rows': rows, 'output': destination})
+        
+        return Response(stream_with_context(iter_scored_csv(predictor, chunks, **options)),
+                        mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={output_name}'})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/cpu_budget')
+def api_cpu_budget():
+    """API endpoint to inspect the CPU budget of this worker and its training jobs."""
+    return jsonify(dict(cpu_budget.stats(), training_jobs=training_queue.stats()))
+
+@app.route('/api/cache_stats')
+def api_cache_stats():
+    """API endpoint to inspect the parsed-dataset cache of this worker."""
+    return jsonify(dataset_cache.stats())
+
 @app.route('/download_sample')
 def download_sample():
     """Download sample dataset."""
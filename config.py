@@ -5,6 +5,40 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # Chunked streaming uploads: each chunk request stays under MAX_CONTENT_LENGTH
+    STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+    STREAM_BLOCK_SIZE = 4 * 1024 * 1024
+    MAX_STREAM_UPLOAD_LENGTH = int(os.environ.get('MAX_STREAM_UPLOAD_LENGTH', 20 * 1024 * 1024 * 1024))
+    EXCEL_CONVERSION_WORKERS = int(os.environ.get('EXCEL_CONVERSION_WORKERS', 2))
+    # Memory budget for parsed datasets cached per worker process
+    DATASET_CACHE_MAX_BYTES = int(os.environ.get('DATASET_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    # Threads used to profile the columns of a dataset, -1 for one per core
+    PROFILING_WORKERS = int(os.environ.get('PROFILING_WORKERS', -1))
+    # Wider tables only get their CORRELATION_TOP_K strongest pairs
+    CORRELATION_MAX_DENSE_COLUMNS = int(os.environ.get('CORRELATION_MAX_DENSE_COLUMNS', 1000))
+    CORRELATION_TOP_K = int(os.environ.get('CORRELATION_TOP_K', 100))
+    # Fast preview (?preview=1): analysis of a random sample with confidence intervals
+    PREVIEW_SAMPLE_ROWS = int(os.environ.get('PREVIEW_SAMPLE_ROWS', 100_000))
+    PREVIEW_ROWS_PER_STRATUM = int(os.environ.get('PREVIEW_ROWS_PER_STRATUM', 10_000))
+    PREVIEW_CONFIDENCE = float(os.environ.get('PREVIEW_CONFIDENCE', 0.95))
+    # Files at least this large are analyzed out of core over memory-mapped columns
+    OUT_OF_CORE_MIN_BYTES = int(os.environ.get('OUT_OF_CORE_MIN_BYTES', 1024 * 1024 * 1024))
+    # Fitted models shared by all worker processes, with a disk budget
+    MODEL_REGISTRY_FOLDER = os.environ.get('MODEL_REGISTRY_FOLDER', os.path.join('outputs', 'models'))
+    MODEL_REGISTRY_MAX_BYTES = int(os.environ.get('MODEL_REGISTRY_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+    # Batch scoring: rows per chunk and chunks scored in parallel (-1 for one per core)
+    SCORING_CHUNK_ROWS = int(os.environ.get('SCORING_CHUNK_ROWS', 100_000))
+    SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', -1))
+    # Threads of each worker process; by default its share of the cores among
+    # the WEB_CONCURRENCY gunicorn workers. Requests and jobs reserve threads from it
+    CPU_THREADS = int(os.environ['CPU_THREADS']) if os.environ.get('CPU_THREADS') else None
+    TRAINING_THREADS = int(os.environ.get('TRAINING_THREADS', -1))
+    # Seconds the 'auto' model search may start new fits for
+    AUTO_SEARCH_SECONDS = float(os.environ.get('AUTO_SEARCH_SECONDS', 60))
+    # Background training jobs: status folder, jobs run at once and jobs waiting, per worker process
+    JOBS_FOLDER = os.environ.get('JOBS_FOLDER', os.path.join('outputs', 'jobs'))
+    TRAINING_WORKERS = int(os.environ.get('TRAINING_WORKERS', 1))
+    TRAINING_MAX_PENDING = int(os.environ.get('TRAINING_MAX_PENDING', 4))
     
 class DevelopmentConfig(Config):
     DEBUG = True
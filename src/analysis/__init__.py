@@ -1,5 +1,14 @@
 """Analysis module for data exploration and statistical analysis."""
 
 from .data_analyzer import DataAnalyzer
+from .streaming_stats import StreamingStats
+from .sketches import KLLSketch, HyperLogLog, SpaceSaving
+from .duplicates import DuplicateTracker
+from .sampling import ReservoirSampler, StratifiedSampler, SampleEstimator, draw_sample
+from .out_of_core import OutOfCoreAnalyzer
+from .missing_patterns import MissingPatterns
+from .aggregation import GroupIndex
 
-__all__ = ['DataAnalyzer']
+__all__ = ['DataAnalyzer', 'StreamingStats', 'KLLSketch', 'HyperLogLog', 'SpaceSaving', 'DuplicateTracker',
+           'ReservoirSampler', 'StratifiedSampler', 'SampleEstimator', 'draw_sample',
+           'OutOfCoreAnalyzer', 'MissingPatterns', 'GroupIndex']
@@ -0,0 +1,171 @@
+"""
+Group-by aggregation over factorized group indexes.
+
+A GroupIndex holds the group code of every row, found by hashing the key
+column once with pd.factorize. Aggregating a measure is then a bincount or
+a reduction over the rows sorted by group code, so repeated aggregations of
+different measures or functions reuse the index instead of hashing the key
+column again. Indexes of several key columns are combined arithmetically
+from the codes of the single-column indexes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .parallel import map_columns
+
+AGGREGATIONS = ('size', 'count', 'sum', 'mean', 'std', 'var', 'min', 'max', 'median')
+
+class GroupIndex:
+    """Group code of every row of a dataset, for one or more key columns."""
+    
+    def __init__(self, codes, levels, level_codes, names):
+        """
+        Initialize the GroupIndex.
+        
+        Args:
+            codes: int64 array with the group of every row, -1 where a key is missing
+            levels: list of pandas Index with the sorted distinct values of every key column
+            level_codes: int64 array of shape (key columns, groups), the
+                position of every group's key in each level
+            names: names of the key columns
+        """
+        self.codes = codes
+        self.levels = levels
+        self.level_codes = level_codes
+        self.names = list(names)
+        self.n_groups = level_codes.shape[1]
+        self._order = None
+        self._sizes = None
+    
+    @classmethod
+    def from_column(cls, values):
+        """Factorize a pandas Series into sorted groups, leaving out missing keys."""
+        codes, uniques = pd.factorize(values, sort=True)
+        return cls(codes.astype(np.int64, copy=False), [pd.Index(uniques)],
+                   np.arange(len(uniques), dtype=np.int64)[None, :], [values.name])
+    
+    def combine(self, other):
+        """
+        Index of the key combinations of this index and another one over the same rows.
+        
+        Only combinations that occur are kept, in lexicographic order of the keys.
+        """
+        if len(other.codes) != len(self.codes):
+            raise ValueError("Cannot combine group indexes of different lengths")
+        grouped = (self.codes >= 0) & (other.codes >= 0)
+        pairs = self.codes[grouped] * other.n_groups + other.codes[grouped]
+        combinations, inverse = np.unique(pairs, return_inverse=True)
+        codes = np.full(len(self.codes), -1, dtype=np.int64)
+        codes[grouped] = inverse
+        level_codes = np.vstack([self.level_codes[:, combinations // other.n_groups],
+                                 other.level_codes[:, combinations % other.n_groups]])
+        return GroupIndex(codes, self.levels + other.levels, level_codes, self.names + other.names)
+    
+    @property
+    def keys(self):
+        """Key of every group: an Index for one key column, a MultiIndex otherwise."""
+        if len(self.levels) == 1:
+            return self.levels[0][self.level_codes[0]].rename(self.names[0])
+        return pd.MultiIndex(levels=self.levels, codes=self.level_codes, names=self.names)
+    
+    @property
+    def sizes(self):
+        """Number of rows in every group."""
+        if self._sizes is None:
+            self._sizes = np.bincount(self.codes[self.codes >= 0], minlength=self.n_groups)
+        return self._sizes
+    
+    @property
+    def order(self):
+        """Positions of the grouped rows, sorted by group; computed once, on first use."""
+        if self._order is None:
+            order = np.argsort(self.codes, kind='stable')
+            self._order = order[np.count_nonzero(self.codes < 0):]
+        return self._order
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index, counting the sort order it builds on demand."""
+        return (self.codes.nbytes + 8 * len(self.codes) + self.level_codes.nbytes +
+                sum(int(level.memory_usage(deep=True)) for level in self.levels))
+    
+    def reduce(self, values, func):
+        """
+        Aggregate a column over the groups.
+        
+        Args:
+            values: pandas Series aligned with the rows of the index
+            func: one of AGGREGATIONS; missing values are skipped, like pandas
+        
+        Returns:
+            Array with one result per group
+        """
+        if func == 'size':
+            return self.sizes
+        grouped = self.codes >= 0
+        if func == 'count':
+            return np.bincount(self.codes[grouped & values.notna().to_numpy()], minlength=self.n_groups)
+        if func not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{func}'")
+        if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            raise ValueError(f"Cannot compute the {func} of non-numeric column '{values.name}'")
+        
+        x = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = grouped & ~np.isnan(x)
+        codes = self.codes[valid]
+        count = np.bincount(codes, minlength=self.n_groups)
+        empty = count == 0
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if func in ('sum', 'mean', 'var', 'std'):
+                total = np.bincount(codes, weights=x[valid], minlength=self.n_groups)
+                if func == 'sum':
+                    return total
+                mean = total / count
+                if func == 'mean':
+                    return mean
+                # Two-pass variance, from deviations to the group means
+                squares = np.bincount(codes, weights=(x[valid] - mean[codes]) ** 2, minlength=self.n_groups)
+                var = np.where(count > 1, squares / (count - 1), np.nan)
+                return var if func == 'var' else np.sqrt(var)
+        
+        sorted_x = x[self.order]
+        starts = np.cumsum(self.sizes) - self.sizes
+        result = np.full(self.n_groups, np.nan)
+        if func == 'median':
+            # Sort the values within every group, missing values last
+            sorted_x = sorted_x[np.lexsort((sorted_x, self.codes[self.order]))]
+            lower = starts + (count - 1) // 2
+            upper = starts + count // 2
+            result[~empty] = (sorted_x[lower[~empty]] + sorted_x[upper[~empty]]) / 2
+            return result
+        
+        fill, reducer = (np.inf, np.minimum) if func == 'min' else (-np.inf, np.maximum)
+        sorted_x[np.isnan(sorted_x)] = fill
+        nonempty = self.sizes > 0
+        result[nonempty] = reducer.reduceat(sorted_x, starts[nonempty])
+        result[empty] = np.nan
+        return result
+    
+    def aggregate(self, data, values, funcs, n_jobs=1):
+        """
+        Aggregate columns of a DataFrame over the groups.
+        
+        Args:
+            data: pandas DataFrame with the rows of the index
+            values: columns to aggregate
+            funcs: list of functions from AGGREGATIONS
+            n_jobs: number of threads aggregating columns in parallel
+        
+        Returns:
+            DataFrame indexed by the group keys, with a column per measure, or
+            a (measure, function) column per pair when several functions are given
+        """
+        pairs = [(col, func) for col in values for func in funcs]
+        results = map_columns(lambda pair: self.reduce(data[pair[0]], pair[1]), pairs, n_jobs)
+        if len(funcs) == 1:
+            columns = pd.Index(list(values))
+        else:
+            columns = pd.MultiIndex.from_tuples(pairs)
+        return pd.DataFrame(dict(enumerate(results)), index=self.keys).set_axis(columns, axis=1)
@@ -0,0 +1,268 @@
+"""
+Correlation matrices computed in column-block tiles.
+
+Each tile of the matrix is a handful of matrix products over two blocks of
+columns, so tiles can be computed by parallel threads while BLAS releases
+the GIL. Missing values are handled pairwise, like DataFrame.corr().
+
+Tiles can be computed in float32, which halves memory and roughly doubles
+BLAS throughput, and for very wide tables top_correlations() keeps only the
+strongest pairs of each tile instead of assembling the dense matrix.
+
+Spearman correlation is Pearson correlation of ranks, each column being
+ranked once; Kendall's tau-b is computed per column pair with the
+O(n log n) algorithm of Knight (1966), pairs running in parallel.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .parallel import map_columns, map_column_shards
+
+CORRELATION_METHODS = ('pearson', 'spearman', 'kendall')
+
+class _CenteredColumns:
+    """Mean-centered numeric columns, their norms and missing-value mask."""
+    
+    def __init__(self, data, dtype=np.float64):
+        numeric = data.select_dtypes(include=[np.number])
+        self.columns = numeric.columns
+        values = numeric.to_numpy(dtype=dtype, na_value=np.nan)
+        present = ~np.isnan(values)
+        
+        # Centering first keeps the sums of products well conditioned;
+        # means are accumulated in float64 even for float32 tiles
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.nansum(values, axis=0, dtype=np.float64) / present.sum(axis=0)
+        self.centered = np.where(present, values - means.astype(dtype), 0).astype(dtype, copy=False)
+        del values
+        self.norms = np.sqrt(np.einsum('ij,ij->j', self.centered, self.centered, dtype=np.float64))
+        self.present = None if present.all() else present.astype(dtype)
+    
+    def blocks(self, block_size):
+        """Return the column blocks and the (i, j) block pairs of the upper triangle."""
+        n = len(self.columns)
+        blocks = [np.arange(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+        pairs = [(i, j) for i in range(len(blocks)) for j in range(i, len(blocks))]
+        return blocks, pairs
+    
+    def tile(self, rows, cols):
+        """
+        Correlation tile between two blocks of columns, as float64.
+        
+        Without missing values a tile is a single product of centered
+        columns scaled by their norms.
+        """
+        x, y = self.centered[:, rows], self.centered[:, cols]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.present is None:
+                return (x.T @ y) / np.outer(self.norms[rows], self.norms[cols])
+            
+            mx, my = self.present[:, rows], self.present[:, cols]
+            n = (mx.T @ my).astype(np.float64)
+            sx, sy = (x.T @ my).astype(np.float64), (mx.T @ y).astype(np.float64)
+            sxx, syy = (x * x).T @ my, mx.T @ (y * y)
+            cov = x.T @ y - sx * sy / n
+            var = (sxx - sx * sx / n) * (syy - sy * sy / n)
+            return np.where(n >= 2, cov / np.sqrt(var), np.nan)
+
+def rank_columns(data, n_jobs=1):
+    """
+    Average ranks of every numeric column, NaN where values are missing.
+    
+    Missing values are left out of each column's ranking, so with missing
+    data Spearman coefficients can differ slightly from pandas, which
+    re-ranks every pair over its complete rows.
+    """
+    numeric = data.select_dtypes(include=[np.number])
+    return pd.concat(map_column_shards(lambda shard: shard.rank(method='average'), numeric, n_jobs), axis=1)
+
+def kendall_matrix(data, n_jobs=1):
+    """
+    Kendall tau-b matrix of the numeric columns of a DataFrame.
+    
+    Each column is replaced by integer codes of its sorted distinct values
+    once, so every pairwise tau-b sorts integers. Missing values are
+    handled pairwise.
+    
+    Args:
+        data: pandas DataFrame
+        n_jobs: number of threads evaluating column pairs in parallel
+    
+    Returns:
+        pandas DataFrame, like data.select_dtypes(include=[np.number]).corr(method='kendall')
+    """
+    numeric = data.select_dtypes(include=[np.number])
+    columns = numeric.columns
+    codes = map_columns(lambda col: pd.factorize(numeric[col], sort=True)[0], list(columns), n_jobs)
+    
+    def tau(pair):
+        x, y = codes[pair[0]], codes[pair[1]]
+        both = (x >= 0) & (y >= 0)
+        if not both.all():
+            x, y = x[both], y[both]
+        if len(x) < 2 or x.min() == x.max() or y.min() == y.max():
+            return np.nan
+        return stats.kendalltau(x, y).statistic
+    
+    pairs = [(i, j) for i in range(len(columns)) for j in range(i + 1, len(columns))]
+    matrix = np.eye(len(columns))
+    for (i, j), value in zip(pairs, map_columns(tau, pairs, n_jobs)):
+        matrix[i, j] = matrix[j, i] = value
+    return pd.DataFrame(matrix, index=columns, columns=columns)
+
+def correlation_matrix(data, method='pearson', n_jobs=1, block_size=256, dtype=np.float64):
+    """
+    Correlation matrix of the numeric columns of a DataFrame.
+    
+    Args:
+        data: pandas DataFrame
+        method: 'pearson', 'spearman' or 'kendall'
+        n_jobs: number of threads computing tiles or pairs in parallel
+        block_size: number of columns per tile side
+        dtype: np.float64, or np.float32 for half the memory
+    
+    Returns:
+        pandas DataFrame, like data.select_dtypes(include=[np.number]).corr(method)
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unknown correlation method '{method}'")
+    if method == 'kendall':
+        return kendall_matrix(data, n_jobs=n_jobs)
+    if method == 'spearman':
+        data = rank_columns(data, n_jobs=n_jobs)
+    
+    prepared = _CenteredColumns(data, dtype)
+    blocks, pairs = prepared.blocks(block_size)
+    tiles = map_columns(lambda pair: prepared.tile(blocks[pair[0]], blocks[pair[1]]), pairs, n_jobs)
+    
+    n = len(prepared.columns)
+    matrix = np.empty((n, n), dtype=dtype)
+    for (i, j), tile in zip(pairs, tiles):
+        matrix[np.ix_(blocks[i], blocks[j])] = tile
+        matrix[np.ix_(blocks[j], blocks[i])] = tile.T
+    np.clip(matrix, -1, 1, out=matrix)
+    return pd.DataFrame(matrix, index=prepared.columns, columns=prepared.columns)
+
+def _strongest(rows, cols, values, k):
+    """Keep the k entries with the largest absolute value."""
+    if len(values) > k:
+        keep = np.argpartition(-np.abs(values), k - 1)[:k]
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+    return rows, cols, values
+
+def top_correlations(data, k=100, threshold=None, method='pearson', n_jobs=1, block_size=256,
+                     dtype=np.float32):
+    """
+    Strongest correlated pairs of numeric columns, without the dense matrix.
+    
+    Each tile is reduced to its own k strongest pairs as soon as it is
+    computed, so memory stays at one tile per worker plus k candidates
+    per tile.
+    
+    Args:
+        data: pandas DataFrame
+        k: maximum number of pairs to return
+        threshold: only return pairs whose absolute correlation exceeds it
+        method: 'pearson' or 'spearman'
+        n_jobs: number of threads computing tiles in parallel
+        block_size: number of columns per tile side
+        dtype: precision of the tile products
+    
+    Returns:
+        List of dicts with var1, var2 and correlation, strongest first
+    """
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f"Top-k mode does not support the '{method}' method")
+    if method == 'spearman':
+        data = rank_columns(data, n_jobs=n_jobs)
+    
+    prepared = _CenteredColumns(data, dtype)
+    blocks, pairs = prepared.blocks(block_size)
+    
+    def reduce_tile(pair):
+        i, j = pair
+        tile = np.clip(prepared.tile(blocks[i], blocks[j]), -1, 1)
+        mask = ~np.isnan(tile)
+        if i == j:
+            mask &= np.triu(np.ones(tile.shape, dtype=bool), k=1)
+        if threshold is not None:
+            mask &= np.abs(np.nan_to_num(tile)) > threshold
+        local_rows, local_cols = np.nonzero(mask)
+        return _strongest(blocks[i][local_rows], blocks[j][local_cols], tile[mask], k)
+    
+    candidates = map_columns(reduce_tile, pairs, n_jobs)
+    if not candidates:
+        return []
+    rows, cols, values = _strongest(*(np.concatenate(parts) for parts in zip(*candidates)), k)
+    order = np.argsort(-np.abs(values), kind='stable')
+    return [{'var1': prepared.columns[rows[o]], 'var2': prepared.columns[cols[o]], 'correlation': float(values[o])}
+            for o in order]
+
+def strong_correlations(corr_matrix, threshold=0.7):
+    """
+    List the variable pairs whose absolute correlation exceeds threshold.
+    
+    Returns:
+        List of dicts with var1, var2 and correlation, in matrix order
+    """
+    values = corr_matrix.to_numpy()
+    upper = np.triu(np.ones(values.shape, dtype=bool), k=1)
+    rows, cols = np.nonzero(upper & (np.abs(np.nan_to_num(values)) > threshold))
+    return [{'var1': corr_matrix.columns[i], 'var2': corr_matrix.columns[j], 'correlation': float(values[i, j])}
+            for i, j in zip(rows, cols)]
+
+class CorrelationState:
+    """
+    Mergeable sufficient statistics for a pairwise-complete Pearson matrix.
+    
+    Holds, for every pair of columns, the number of rows where both are
+    present and the sums of x, x² and x·y over those rows. Values are shifted
+    by the means of the first chunk to keep the sums well conditioned.
+    """
+    
+    def __init__(self, columns):
+        """
+        Initialize an empty CorrelationState.
+        
+        Args:
+            columns: names of the numeric columns, in matrix order
+        """
+        self.columns = list(columns)
+        self.shift = None
+        p = len(self.columns)
+        self.n = np.zeros((p, p))
+        self.sx = np.zeros((p, p))
+        self.sxx = np.zeros((p, p))
+        self.sxy = np.zeros((p, p))
+    
+    def update(self, chunk):
+        """Add the rows of a DataFrame chunk holding the state's columns."""
+        values = chunk[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        if self.shift is None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.shift = np.nan_to_num(np.nansum(values, axis=0) / present.sum(axis=0))
+        x = np.where(present, values - self.shift, 0.0)
+        mask = present.astype(np.float64)
+        self.n += mask.T @ mask
+        self.sx += x.T @ mask
+        self.sxx += (x * x).T @ mask
+        self.sxy += x.T @ x
+        return self
+    
+    def matrix(self):
+        """Return the correlation matrix as a DataFrame, like DataFrame.corr()."""
+        n, sx, sy = self.n, self.sx, self.sx.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self.sxy - sx * sy / n
+            var = (self.sxx - sx * sx / n) * (self.sxx.T - sy * sy / n)
+            matrix = np.where(n >= 2, cov / np.sqrt(var), np.nan)
+        np.clip(matrix, -1, 1, out=matrix)
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+    
+    @property
+    def nbytes(self):
+        """Memory held by the sums."""
+        return self.n.nbytes + self.sx.nbytes + self.sxx.nbytes + self.sxy.nbytes
@@ -2,42 +2,317 @@
 Data analysis utilities for statistical analysis and exploratory data analysis.
 """
 
+import copy
 import pandas as pd
 import numpy as np
 from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+from .streaming_stats import StreamingStats, exact_quantiles
+from .sketches import KLLSketch, summarize_categorical
+from .parallel import map_columns, map_column_shards
+from .correlation import correlation_matrix, strong_correlations, top_correlations
+from .duplicates import find_duplicates
+from .sampling import SampleEstimator
+from .missing_patterns import MissingPatterns, print_missing_patterns
+from .aggregation import GroupIndex
+
+# The analyzer and the dataset cache share column buffers through shallow
+# copies, which is only safe with copy-on-write, the default from pandas 3
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
 class DataAnalyzer:
-    """Class for performing comprehensive data analysis."""
+    """
+    Class for performing comprehensive data analysis.
+    
+    The analyzer wraps the frame without copying its data and memoizes the
+    intermediates its methods share (null mask, column lists, summary
+    statistics, correlation matrices). They are dropped when self.data is
+    replaced or its columns or dtypes change; call invalidate() after
+    modifying values in place.
     
-    def __init__(self, data):
+    An analyzer built with from_sample() analyzes a sample of a larger
+    dataset: its reports describe the full dataset, with a confidence
+    interval for every estimated number.
+    """
+    
+    def __init__(self, data, quantile_sketches=None, n_jobs=1, corr_matrix=None, analysis_state=None,
+                 group_indexes=None):
         """
         Initialize the DataAnalyzer.
         
         Args:
             data: pandas DataFrame or file path to CSV
+            quantile_sketches: optional dict of column name to KLLSketch,
+                e.g. built at ingest, used by approximate outlier detection
+            n_jobs: number of threads used to profile columns in parallel,
+                -1 for one per CPU core
+            corr_matrix: optional precomputed Pearson correlation matrix,
+                e.g. cached per dataset, reused by correlation_analysis()
+            analysis_state: optional AnalysisState covering every row of data;
+                summary statistics, categorical sketches, duplicates and the
+                Pearson matrix are then taken from it instead of the rows
+            group_indexes: optional dict of column name to GroupIndex, e.g.
+                cached per dataset, reused by aggregate()
         """
         if isinstance(data, str):
-            self.data = pd.read_csv(data)
-        else:
-            self.data = data.copy()
+            data = pd.read_csv(data)
+        self.n_jobs = n_jobs
+        self.estimator = None
+        # A shallow copy shares the column buffers; with copy-on-write a later
+        # write through either frame copies only the columns it touches
+        self.data = data.copy(deep=False)
+        self.quantile_sketches = dict(quantile_sketches or {})
+        if corr_matrix is not None:
+            self._cache[('correlation', 'pearson')] = corr_matrix
+        for column, index in (group_indexes or {}).items():
+            self._cache[('group_index', (column,))] = index
+        if analysis_state is not None:
+            self._use_analysis_state(analysis_state)
+    
+    @classmethod
+    def from_sample(cls, sample, confidence=0.95, **kwargs):
+        """
+        Build an analyzer of a sampled dataset.
+        
+        Args:
+            sample: DataSample, e.g. from draw_sample()
+            confidence: confidence level of the reported intervals
+            **kwargs: passed to DataAnalyzer()
+        """
+        analyzer = cls(sample.data, **kwargs)
+        analyzer.estimator = SampleEstimator(sample, confidence=confidence)
+        return analyzer
+    
+    @property
+    def sampled(self):
+        """Whether the analyzer works on a sample of the dataset."""
+        return self.estimator is not None
+    
+    def _use_analysis_state(self, state):
+        """Seed the memoized intermediates from a mergeable AnalysisState."""
+        if state.rows != len(self.data) or state.columns != list(self.data.columns):
+            raise ValueError("Analysis state does not match the data")
+        # Moments and null counts merge exactly across chunks, quartiles do
+        # not: with every row in memory they are computed exactly, as describe() does
+        summary_stats = state.stats
+        if summary_stats.quantiles is None and summary_stats.numeric_columns:
+            summary_stats = copy.copy(summary_stats)
+            summary_stats.quantiles = np.concatenate(map_column_shards(
+                self._exact_quantiles, self.data[summary_stats.numeric_columns], self.n_jobs), axis=1)
+        self._cache['summary_stats'] = summary_stats
+        self._cache['categorical_sketches'] = state.categorical
+        self._cache[('duplicates', None)] = state.duplicates.report()
+        self._cache['missing_patterns'] = state.missing_patterns
+        if state.correlations is not None:
+            self._cache[('correlation', 'pearson')] = state.correlations.matrix()
+        if state.stats.sketches is not None and not self.quantile_sketches:
+            self.quantile_sketches = dict(zip(state.stats.numeric_columns, state.stats.sketches))
+    
+    @staticmethod
+    def _exact_quantiles(data):
+        values = data.to_numpy(dtype=np.float64, na_value=np.nan)
+        return exact_quantiles(values, ~np.isnan(values))
+    
+    @property
+    def data(self):
+        """The analyzed DataFrame."""
+        return self._data
+    
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self.invalidate()
+    
+    def invalidate(self):
+        """
+        Drop every memoized result, e.g. after modifying self.data in place.
+        
+        The quantile sketches passed by the caller are kept.
+        """
+        self._cache = {}
+        self._structure = self._current_structure()
     
-    def basic_stats(self):
-        """Calculate basic statistical measures."""
+    def _current_structure(self):
+        return (id(self._data), self._data.shape, tuple(self._data.columns),
+                tuple(self._data.dtypes.astype(str)))
+    
+    def _check_structure(self):
+        """Invalidate memoized results if columns, dtypes or row count changed."""
+        if self._current_structure() != self._structure:
+            self.invalidate()
+    
+    def _memoized(self, key, compute):
+        """Return the cached result for key, computing it on first use."""
+        self._check_structure()
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+    
+    @property
+    def numeric_columns(self):
+        """Names of the numeric columns."""
+        return self._memoized('numeric_columns',
+                              lambda: list(self.data.select_dtypes(include=[np.number]).columns))
+    
+    @property
+    def categorical_columns(self):
+        """Names of the object and category columns."""
+        return self._memoized('categorical_columns',
+                              lambda: list(self.data.select_dtypes(include=['object', 'category']).columns))
+    
+    @property
+    def null_mask(self):
+        """Boolean DataFrame marking missing values, built per column shard."""
+        return self._memoized('null_mask', lambda: pd.concat(
+            map_column_shards(lambda shard: shard.isnull(), self.data, self.n_jobs), axis=1))
+    
+    @property
+    def summary_stats(self):
+        """StreamingStats of the data: null counts, moments and quartiles in one pass."""
+        return self._memoized('summary_stats',
+                              lambda: StreamingStats.from_frame(self.data, n_jobs=self.n_jobs))
+    
+    @property
+    def null_counts(self):
+        """Missing values per column, as an int64 Series; estimated for a sample."""
+        if self.sampled:
+            return self._memoized('null_counts', lambda: pd.Series(
+                {col: round(value['estimate']) for col, value in self.missing_intervals().items()}, dtype='int64'))
+        return self._memoized('null_counts',
+                              lambda: pd.Series(self.summary_stats.missing_values(), dtype='int64'))
+    
+    @property
+    def total_rows(self):
+        """Rows of the analyzed dataset, which a sample was drawn from."""
+        return self.estimator.population_rows if self.sampled else len(self.data)
+    
+    @property
+    def categorical_sketches(self):
+        """Dict of categorical column to its (HyperLogLog, SpaceSaving) pair."""
+        return self._memoized('categorical_sketches', lambda: dict(zip(
+            self.categorical_columns,
+            map_columns(lambda col: summarize_categorical(self.data[col]), self.categorical_columns, self.n_jobs))))
+    
+    def missing_patterns(self, top=10, chunk_size=1_000_000):
+        """
+        Joint missing-value patterns: which columns are missing together, and how often.
+        
+        Args:
+            top: number of most frequent patterns to report
+            chunk_size: rows of the null mask packed at a time
+        
+        Returns:
+            Dict in the layout of MissingPatterns.report()
+        """
+        def count_patterns():
+            mask = self.null_mask.to_numpy()
+            patterns = MissingPatterns(self.data.columns)
+            for start in range(0, len(mask), chunk_size):
+                patterns.update(mask[start:start + chunk_size])
+            return patterns
+        
+        return self._memoized('missing_patterns', count_patterns).report(top)
+    
+    def group_index(self, columns):
+        """
+        Factorized group index of one or more key columns, built once per column.
+        
+        Indexes of several columns are combined from the single-column ones,
+        so every key column is hashed at most once.
+        """
+        columns = tuple([columns] if isinstance(columns, str) else columns)
+        if len(columns) == 1:
+            return self._memoized(('group_index', columns), lambda: GroupIndex.from_column(self.data[columns[0]]))
+        return self._memoized(('group_index', columns),
+                              lambda: self.group_index(columns[:-1]).combine(self.group_index(columns[-1:])))
+    
+    def aggregate(self, by, values=None, agg='mean', pivot=None):
+        """
+        Aggregate measures by one or more key columns, like DataFrame.groupby().agg().
+        
+        Args:
+            by: key column, or list of key columns
+            values: column or list of columns to aggregate, every numeric
+                column that is not a key by default
+            agg: aggregation, or list of aggregations: 'size', 'count', 'sum',
+                'mean', 'std', 'var', 'min', 'max' or 'median'
+            pivot: optional key column (or list) whose values become the
+                result's columns, like DataFrame.pivot_table()
+        
+        Returns:
+            DataFrame indexed by the keys of every group with rows; rows with a
+            missing key are left out
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        pivot = [] if pivot is None else [pivot] if isinstance(pivot, str) else list(pivot)
+        funcs = [agg] if isinstance(agg, str) else list(agg)
+        if values is None:
+            values = [col for col in self.numeric_columns if col not in by + pivot]
+        elif isinstance(values, str):
+            values = [values]
+        for col in by + pivot + list(values):
+            if col not in self.data.columns:
+                raise ValueError(f"Column '{col}' not found")
+        if not values:
+            raise ValueError("No columns to aggregate")
+        
+        result = self.group_index(by + pivot).aggregate(self.data, values, funcs, n_jobs=self.n_jobs)
+        if pivot:
+            if len(result.columns) == 1:
+                result = result.iloc[:, 0]
+            result = result.unstack(pivot)
+        return result
+    
+    def describe(self):
+        """Numeric summary in the layout of DataFrame.describe().to_dict()."""
+        if self.sampled:
+            return {col: {stat: value['estimate'] for stat, value in summary.items()}
+                    for col, summary in self.describe_intervals().items()}
+        return self._memoized('describe', self.summary_stats.describe)
+    
+    def describe_intervals(self):
+        """Numeric summary estimated from the sample, with an interval dict per number."""
+        return self._memoized('describe_intervals', lambda: self.estimator.describe(self.numeric_columns))
+    
+    def missing_intervals(self):
+        """Missing values per column estimated from the sample, as interval dicts."""
+        return self._memoized('missing_intervals', self.estimator.missing_values)
+    
+    def correlation_matrix(self, method='pearson', dtype=np.float64):
+        """Correlation matrix of the numeric columns, computed once per method."""
+        return self._memoized(('correlation', method), lambda: correlation_matrix(
+            self.data[self.numeric_columns], method=method, n_jobs=self.n_jobs, dtype=dtype))
+    
+    def basic_stats(self, exact_categorical=False, top_k=20):
+        """
+        Calculate basic statistical measures.
+        
+        Args:
+            exact_categorical: count every categorical value exactly instead of
+                using HyperLogLog and Space-Saving sketches
+            top_k: number of most frequent values reported per categorical column
+        """
         print("\n📊 Basic Statistics")
         print("-" * 30)
         
         # Dataset info
-        print(f"Dataset shape: {self.data.shape}")
-        print(f"Memory usage: {self.data.memory_usage(deep=True).sum() / 1024:.2f} KB")
+        shape = (self.total_rows, self.data.shape[1])
+        print(f"Dataset shape: {shape}")
+        if self.sampled:
+            print(f"Estimated from a sample of {len(self.data)} rows "
+                  f"({self.estimator.confidence:.0%} confidence intervals)")
+        memory = self._memoized('memory_usage', lambda: self.data.memory_usage(deep=True).sum())
+        print(f"Memory usage: {memory / 1024:.2f} KB")
         
         # Data types
         print("\nData types:")
         print(self.data.dtypes.value_counts())
         
-        # Missing values
-        missing = self.data.isnull().sum()
+        # Missing values, counted in the same pass as the numeric moments
+        missing = self.null_counts
         if missing.sum() > 0:
             print("\nMissing values:")
             print(missing[missing > 0])
@@ -45,78 +320,144 @@ class DataAnalyzer:
             print("\n✅ No missing values found")
         
         # Descriptive statistics for numeric columns
-        numeric_data = self.data.select_dtypes(include=[np.number])
-        if not numeric_data.empty:
+        numeric_summary = self.describe()
+        if numeric_summary:
             print("\nDescriptive Statistics (Numeric):")
-            print(numeric_data.describe())
+            print(pd.DataFrame(numeric_summary))
+        
+        # Categorical column summary: distinct counts and top values, bounded
+        # in size even for ID-like columns
+        categorical_columns = self.categorical_columns
+        categorical_summary = {}
+        categorical_cardinality = {}
+        
+        def summarize(col):
+            if self.sampled:
+                # Distinct values seen in the sample are a lower bound
+                counts = self.estimator.value_counts(col, top_k)
+                return int(self.data[col].nunique()), {value: round(count['estimate'])
+                                                        for value, count in counts.items()}
+            if exact_categorical:
+                counts = self.data[col].value_counts()
+                return len(counts), {value: int(count) for value, count in counts.items()}
+            distinct, heavy_hitters = self.categorical_sketches[col]
+            return distinct.count(), heavy_hitters.top(top_k)
         
-        # Categorical column summary
-        categorical_data = self.data.select_dtypes(include=['object'])
-        if not categorical_data.empty:
+        if categorical_columns:
             print("\nCategorical Variables Summary:")
-            for col in categorical_data.columns:
-                unique_count = self.data[col].nunique()
-                print(f"{col}: {unique_count} unique values")
+            if exact_categorical:
+                summaries = map_columns(summarize, categorical_columns, self.n_jobs)
+            else:
+                summaries = [summarize(col) for col in categorical_columns]
+            for col, (unique_count, top_values) in zip(categorical_columns, summaries):
+                categorical_summary[col] = top_values
+                categorical_cardinality[col] = unique_count
+                
+                approx = '≥' if self.sampled else '' if exact_categorical else '~'
+                print(f"{col}: {approx}{unique_count} unique values")
                 if unique_count <= 10:
-                    print(f"  Values: {list(self.data[col].unique())}")
+                    print(f"  Values: {list(top_values)}")
         
-        return {
-            'shape': self.data.shape,
+        result = {
+            'shape': shape,
             'missing_values': missing.to_dict(),
-            'numeric_summary': numeric_data.describe().to_dict() if not numeric_data.empty else {},
-            'categorical_summary': {col: self.data[col].value_counts().to_dict() 
-                                  for col in categorical_data.columns}
+            'numeric_summary': numeric_summary,
+            'categorical_summary': categorical_summary,
+            'categorical_cardinality': categorical_cardinality
+        }
+        if self.sampled:
+            result['sample'] = self.sample_info()
+            result['confidence_intervals'] = {
+                'missing_values': self.missing_intervals(),
+                'missing_total': self.estimator.missing_total(),
+                'numeric_summary': self.describe_intervals(),
+                'categorical_summary': {col: self.estimator.value_counts(col, top_k) for col in categorical_columns}
+            }
+        return result
+    
+    def sample_info(self):
+        """Describe the sample behind the estimates, or None for a full analysis."""
+        if not self.sampled:
+            return None
+        return {
+            'rows': len(self.data),
+            'population_rows': self.total_rows,
+            'confidence': self.estimator.confidence,
+            'stratified_by': self.estimator.sample.strata_column
         }
     
-    def correlation_analysis(self):
-        """Analyze correlations between numeric variables."""
-        numeric_data = self.data.select_dtypes(include=[np.number])
+    def correlation_analysis(self, method='pearson', top_k=None, dtype=np.float64):
+        """
+        Analyze correlations between numeric variables.
+        
+        Args:
+            method: 'pearson', 'spearman' (Pearson on ranks, each column
+                ranked once) or 'kendall' (tau-b, O(n log n) per pair)
+            top_k: if set, only find the top_k most strongly correlated pairs
+                without building the dense matrix, for very wide tables
+            dtype: precision of the computation, np.float32 halves memory
         
-        if numeric_data.shape[1] < 2:
+        Returns:
+            The correlation matrix, or the list of strongest pairs in top-k mode
+        """
+        if len(self.numeric_columns) < 2:
             print("⚠️ Need at least 2 numeric columns for correlation analysis")
             return None
         
-        print("\n🔗 Correlation Analysis")
+        print(f"\n🔗 Correlation Analysis ({method.title()})")
         print("-" * 30)
         
-        # Calculate correlation matrix
-        corr_matrix = numeric_data.corr()
-        
-        # Find strong correlations (>0.7 or <-0.7)
-        strong_correlations = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                corr_value = corr_matrix.iloc[i, j]
-                if abs(corr_value) > 0.7:
-                    strong_correlations.append({
-                        'var1': corr_matrix.columns[i],
-                        'var2': corr_matrix.columns[j],
-                        'correlation': corr_value
-                    })
-        
-        if strong_correlations:
+        if top_k is not None:
+            top_pairs = top_correlations(self.data[self.numeric_columns], k=top_k, method=method,
+                                         n_jobs=self.n_jobs, dtype=dtype)
+            strong_pairs = [pair for pair in top_pairs if abs(pair['correlation']) > 0.7]
+        else:
+            # Find strong correlations (>0.7 or <-0.7)
+            strong_pairs = strong_correlations(self.correlation_matrix(method, dtype), threshold=0.7)
+        
+        if strong_pairs:
             print("Strong correlations found:")
-            for corr in strong_correlations:
-                print(f"  {corr['var1']} ↔ {corr['var2']}: {corr['correlation']:.3f}")
+            for corr in strong_pairs:
+                if self.sampled:
+                    corr['interval'] = self.estimator.correlation_interval(corr['correlation'])
+                    error = corr['interval']['error']
+                    print(f"  {corr['var1']} ↔ {corr['var2']}: {corr['correlation']:.3f} ± {error:.3f}")
+                else:
+                    print(f"  {corr['var1']} ↔ {corr['var2']}: {corr['correlation']:.3f}")
         else:
             print("No strong correlations (>0.7) found")
         
-        return corr_matrix
+        return top_pairs if top_k is not None else self.correlation_matrix(method, dtype)
+    
+    def quantile_sketch(self, column, error=0.01):
+        """Return the KLL sketch of a column, building and keeping it on first use."""
+        self._check_structure()
+        sketch = self.quantile_sketches.get(column)
+        if sketch is None or sketch.error > error:
+            sketch = KLLSketch.from_error(error).update(
+                self.data[column].to_numpy(dtype=np.float64, na_value=np.nan))
+            self.quantile_sketches[column] = sketch
+        return sketch
     
-    def detect_outliers(self, column, method='iqr'):
+    def detect_outliers(self, column, method='iqr', approximate=False, error=0.01):
         """
         Detect outliers in a numeric column.
         
         Args:
             column: Column name
             method: 'iqr' or 'zscore'
+            approximate: take Q1/Q3 from a KLL sketch instead of an exact quantile
+            error: normalized rank error allowed in approximate mode
         """
         if column not in self.data.columns:
             raise ValueError(f"Column '{column}' not found")
         
         if method == 'iqr':
-            Q1 = self.data[column].quantile(0.25)
-            Q3 = self.data[column].quantile(0.75)
+            if approximate:
+                Q1, Q3 = self.quantile_sketch(column, error).quantiles([0.25, 0.75])
+            else:
+                Q1 = self.data[column].quantile(0.25)
+                Q3 = self.data[column].quantile(0.75)
             IQR = Q3 - Q1
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
@@ -134,30 +475,58 @@ class DataAnalyzer:
         
         return outliers
     
-    def data_quality_report(self):
-        """Generate a comprehensive data quality report."""
+    def data_quality_report(self, duplicate_subset=None):
+        """
+        Generate a comprehensive data quality report.
+        
+        Args:
+            duplicate_subset: optional list of columns that define a duplicate row
+        """
         print("\n📋 Data Quality Report")
         print("=" * 40)
         
-        # Completeness
-        completeness = (1 - self.data.isnull().sum() / len(self.data)) * 100
+        # Completeness, from the null counts shared with basic_stats
+        completeness = (1 - self.null_counts / self.total_rows) * 100
+        completeness_error = {}
+        if self.sampled:
+            completeness_error = {col: value['error'] / self.total_rows * 100
+                                  for col, value in self.missing_intervals().items()}
         print("\n1. Data Completeness:")
         for col in completeness.index:
             status = "✅" if completeness[col] == 100 else "⚠️" if completeness[col] > 90 else "❌"
-            print(f"   {status} {col}: {completeness[col]:.1f}%")
+            error = f" ± {completeness_error[col]:.1f}" if col in completeness_error else ""
+            print(f"   {status} {col}: {completeness[col]:.1f}%{error}")
         
-        # Duplicates
-        duplicates = self.data.duplicated().sum()
-        print(f"\n2. Duplicate Rows: {duplicates}")
+        # Duplicates, found by hashing rows chunk by chunk
+        subset = tuple(duplicate_subset) if duplicate_subset is not None else None
+        duplicate_report = self._memoized(('duplicates', subset),
+                                          lambda: find_duplicates(self.data, columns=duplicate_subset))
+        duplicates = duplicate_report['duplicates']
+        # Duplicates across the whole dataset cannot be scaled up from a sample
+        print(f"\n2. Duplicate Rows{' (in sample)' if self.sampled else ''}: {duplicates}")
+        if duplicates:
+            print(f"   {duplicate_report['n_groups']} groups, largest: "
+                  f"{[group['size'] for group in duplicate_report['groups'][:5]]}")
         
         # Data types consistency
         print("\n3. Data Types:")
-        for dtype in self.data.dtypes.unique():
-            cols = list(self.data.select_dtypes(include=[dtype]).columns)
-            print(f"   {dtype}: {len(cols)} columns")
+        for dtype, count in self.data.dtypes.astype(str).value_counts().items():
+            print(f"   {dtype}: {count} columns")
         
-        return {
+        # Columns missing together, from bit-packed row null masks
+        pattern_report = self.missing_patterns()
+        print_missing_patterns(pattern_report, in_sample=self.sampled)
+        
+        result = {
             'completeness': completeness.to_dict(),
             'duplicates': duplicates,
-            'total_rows': len(self.data)
+            'duplicate_groups': duplicate_report['groups'],
+            'missing_patterns': pattern_report['top_patterns'],
+            'n_missing_patterns': pattern_report['n_patterns'],
+            'co_missingness': pattern_report['co_missingness'].to_dict(),
+            'total_rows': self.total_rows
         }
+        if self.sampled:
+            result['completeness_error'] = completeness_error
+            result['sample'] = self.sample_info()
+        return result
@@ -0,0 +1,147 @@
+"""
+Duplicate row detection on 64-bit row hashes.
+
+Every row is reduced to one vectorized 64-bit hash, so the state kept per
+distinct row is a hash, a count and the position of its first occurrence,
+whatever the width of the table. Chunks of rows can be added one at a time,
+e.g. while reading a large CSV or when rows are appended to an upload.
+"""
+
+import numpy as np
+import pandas as pd
+
+def row_hashes(data, columns=None):
+    """
+    Hash every row of a DataFrame to a uint64.
+    
+    Columns are normalized first so that the same values hash the same in
+    every chunk, even when a chunk infers float instead of int because it
+    holds missing values, or a different datetime resolution.
+    
+    Args:
+        data: pandas DataFrame
+        columns: optional subset of columns that define a duplicate
+    """
+    if columns is not None:
+        data = data[list(columns)]
+    normalized = {}
+    for col in data.columns:
+        values = data[col]
+        if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+            values = values.astype(np.float64)
+        elif pd.api.types.is_datetime64_any_dtype(values) and not isinstance(values.dtype, pd.DatetimeTZDtype):
+            values = values.astype('datetime64[ns]')
+        normalized[col] = values
+    frame = pd.DataFrame(normalized, index=data.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+class DuplicateTracker:
+    """Counts of distinct row hashes accumulated over chunks of rows."""
+    
+    def __init__(self, columns=None):
+        """
+        Initialize the DuplicateTracker.
+        
+        Args:
+            columns: optional subset of columns that define a duplicate
+        """
+        self.columns = list(columns) if columns is not None else None
+        self.rows = 0
+        # Sorted distinct hashes, with their counts and first row positions
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.first_rows = np.empty(0, dtype=np.int64)
+    
+    def update(self, chunk):
+        """
+        Add the next rows of the dataset.
+        
+        Args:
+            chunk: pandas DataFrame with the rows that follow earlier chunks
+        
+        Returns:
+            uint64 array with the hash of every row in the chunk
+        """
+        hashes = row_hashes(chunk, self.columns)
+        unique, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+        first = first + self.rows
+        self.rows += len(hashes)
+        
+        positions = np.searchsorted(self.hashes, unique)
+        seen = positions < len(self.hashes)
+        seen[seen] = self.hashes[positions[seen]] == unique[seen]
+        self.counts[positions[seen]] += counts[seen]
+        
+        new = ~seen
+        self.hashes = np.insert(self.hashes, positions[new], unique[new])
+        self.counts = np.insert(self.counts, positions[new], counts[new])
+        self.first_rows = np.insert(self.first_rows, positions[new], first[new])
+        return hashes
+    
+    @property
+    def duplicates(self):
+        """Number of rows that repeat an earlier row, like duplicated().sum()."""
+        return self.rows - len(self.hashes)
+    
+    @property
+    def n_groups(self):
+        """Number of distinct rows that occur more than once."""
+        return int(np.count_nonzero(self.counts > 1))
+    
+    def groups(self, top=10):
+        """
+        Return the largest duplicate groups.
+        
+        Args:
+            top: maximum number of groups
+        
+        Returns:
+            List of dicts with the group's row hash, first row position and
+            size, largest first
+        """
+        repeated = np.flatnonzero(self.counts > 1)
+        order = np.lexsort((self.first_rows[repeated], -self.counts[repeated]))[:top]
+        return [{'hash': int(self.hashes[i]), 'first_row': int(self.first_rows[i]), 'size': int(self.counts[i])}
+                for i in repeated[order]]
+    
+    def report(self, top=10, hashes=None, max_rows_per_group=20):
+        """
+        Summarize the duplicates seen so far.
+        
+        Args:
+            top: number of groups to report
+            hashes: optional hashes of every row seen, to list the rows of
+                each group; otherwise only its first row is listed
+            max_rows_per_group: row positions listed per group
+        
+        Returns:
+            Dict with the duplicate count, number of groups and the top groups,
+            each with its size and the positions of its rows
+        """
+        groups = []
+        for group in self.groups(top):
+            if hashes is None:
+                rows = [group['first_row']]
+            else:
+                rows = np.flatnonzero(hashes == np.uint64(group['hash']))[:max_rows_per_group].tolist()
+            groups.append({'size': group['size'], 'rows': rows})
+        return {'duplicates': self.duplicates, 'n_groups': self.n_groups, 'groups': groups}
+
+def find_duplicates(data, columns=None, top=10, max_rows_per_group=20, chunk_size=100_000):
+    """
+    Count duplicate rows of a DataFrame and report the largest groups.
+    
+    Args:
+        data: pandas DataFrame
+        columns: optional subset of columns that define a duplicate
+        top: number of groups to report
+        max_rows_per_group: row positions listed per group
+        chunk_size: rows hashed at a time
+    
+    Returns:
+        Dict in the layout of DuplicateTracker.report()
+    """
+    tracker = DuplicateTracker(columns)
+    hashes = np.concatenate([tracker.update(data.iloc[start:start + chunk_size])
+                             for start in range(0, len(data), chunk_size)] or [np.empty(0, dtype=np.uint64)])
+    return tracker.report(top, hashes=hashes, max_rows_per_group=max_rows_per_group)
@@ -0,0 +1,160 @@
+"""
+Persisted, mergeable analysis state for datasets that grow by appending rows.
+
+Every part of the report that can be merged is kept per dataset: numeric
+moments and quantile sketches, null counts, categorical sketches, duplicate
+row hashes, missing-value patterns and correlation sums. When a new upload of the same dataset
+starts with the rows already analyzed, only the appended rows are processed.
+"""
+
+import os
+import pickle
+import numpy as np
+
+from .streaming_stats import StreamingStats
+from .sketches import HyperLogLog, SpaceSaving, summarize_categorical
+from .duplicates import DuplicateTracker, row_hashes
+from .correlation import CorrelationState
+from .missing_patterns import MissingPatterns
+
+STATE_SUFFIX = '.analysis.pkl'
+
+class AnalysisState:
+    """Mergeable analysis state of a dataset, updated chunk by chunk."""
+    
+    # Rows hashed at the start and end of the analyzed prefix to recognize it
+    FINGERPRINT_ROWS = 256
+    
+    def __init__(self, data, track_correlations=True, sketch_error=0.01):
+        """
+        Initialize an empty AnalysisState for the columns of data.
+        
+        Args:
+            data: pandas DataFrame whose columns and dtypes define the state
+            track_correlations: keep the Pearson sums, which grow with the
+                square of the number of numeric columns
+            sketch_error: rank error of the quantile sketches
+        """
+        self.columns = list(data.columns)
+        self.numeric_columns = list(data.select_dtypes(include=[np.number]).columns)
+        self.categorical_columns = list(data.select_dtypes(include=['object', 'category']).columns)
+        self.rows = 0
+        self.stats = StreamingStats(sketch_error=sketch_error)
+        self.categorical = {col: (HyperLogLog(), SpaceSaving(capacity=1000)) for col in self.categorical_columns}
+        self.duplicates = DuplicateTracker()
+        self.missing_patterns = MissingPatterns(self.columns)
+        self.correlations = CorrelationState(self.numeric_columns) if track_correlations else None
+        self.head_hashes = np.empty(0, dtype=np.uint64)
+        self.tail_hashes = np.empty(0, dtype=np.uint64)
+    
+    @classmethod
+    def build(cls, data, track_correlations=True, sketch_error=0.01, chunk_size=1_000_000):
+        """Analyze every row of data from scratch."""
+        state = cls(data, track_correlations=track_correlations, sketch_error=sketch_error)
+        return state.update(data, chunk_size=chunk_size)
+    
+    def update(self, new_rows, chunk_size=1_000_000):
+        """
+        Fold rows appended after the ones already analyzed into the state.
+        
+        Args:
+            new_rows: pandas DataFrame with the same columns as the dataset
+            chunk_size: rows processed at a time
+        """
+        for start in range(0, len(new_rows), chunk_size):
+            chunk = new_rows.iloc[start:start + chunk_size]
+            self.stats.update(chunk)
+            for col, (distinct, heavy_hitters) in self.categorical.items():
+                chunk_distinct, chunk_heavy_hitters = summarize_categorical(chunk[col])
+                distinct.merge(chunk_distinct)
+                heavy_hitters.merge(chunk_heavy_hitters)
+            self.duplicates.update(chunk)
+            self.missing_patterns.update(chunk)
+            if self.correlations is not None:
+                self.correlations.update(chunk)
+            self.rows += len(chunk)
+        
+        if len(new_rows):
+            missing_head = self.FINGERPRINT_ROWS - len(self.head_hashes)
+            if missing_head > 0:
+                self.head_hashes = np.concatenate([self.head_hashes, row_hashes(new_rows.iloc[:missing_head])])
+            tail_rows = min(self.rows, self.FINGERPRINT_ROWS)
+            self.tail_hashes = np.concatenate([self.tail_hashes, row_hashes(new_rows.iloc[-tail_rows:])])[-tail_rows:]
+        return self
+    
+    def extends(self, data, track_correlations=True):
+        """
+        Check whether data starts with the rows this state has analyzed.
+        
+        Columns, column kinds and the hashes of the first and last analyzed
+        rows must match; only those few rows are hashed.
+        """
+        if (list(data.columns) != self.columns or len(data) < self.rows or
+                track_correlations != (self.correlations is not None)):
+            return False
+        if (list(data.select_dtypes(include=[np.number]).columns) != self.numeric_columns or
+                list(data.select_dtypes(include=['object', 'category']).columns) != self.categorical_columns):
+            return False
+        head = row_hashes(data.iloc[:len(self.head_hashes)])
+        tail = row_hashes(data.iloc[self.rows - len(self.tail_hashes):self.rows])
+        return np.array_equal(head, self.head_hashes) and np.array_equal(tail, self.tail_hashes)
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the state."""
+        nbytes = self.duplicates.hashes.nbytes + self.duplicates.counts.nbytes + self.duplicates.first_rows.nbytes
+        nbytes += self.missing_patterns.patterns.nbytes + self.missing_patterns.counts.nbytes
+        nbytes += sum(distinct.registers.nbytes + 64 * len(heavy_hitters.counts)
+                      for distinct, heavy_hitters in self.categorical.values())
+        if self.correlations is not None:
+            nbytes += self.correlations.nbytes
+        return nbytes
+    
+    def save(self, filepath):
+        """Store the state next to the dataset it describes."""
+        path = filepath + STATE_SUFFIX
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def load(filepath):
+        """Load the stored state of a dataset, or None if there is none."""
+        path = filepath + STATE_SUFFIX
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        # States stored before missing patterns were tracked are rebuilt
+        return state if hasattr(state, 'missing_patterns') else None
+
+def update_analysis_state(filepath, data, track_correlations=True):
+    """
+    Bring the stored analysis state of a dataset up to date with data.
+    
+    If the stored state covers a prefix of data, only the appended rows are
+    processed; otherwise the state is rebuilt from all rows. The result is
+    saved for the next upload.
+    
+    Args:
+        filepath: path of the dataset on disk
+        data: the dataset as currently loaded
+        track_correlations: keep the Pearson sums, see AnalysisState
+    
+    Returns:
+        AnalysisState covering every row of data
+    """
+    state = AnalysisState.load(filepath)
+    if state is not None and state.extends(data, track_correlations=track_correlations):
+        if len(data) == state.rows:
+            return state
+        print(f"🔁 Analyzing {len(data) - state.rows} appended rows of {os.path.basename(filepath)}")
+        state.update(data.iloc[state.rows:])
+    else:
+        state = AnalysisState.build(data, track_correlations=track_correlations)
+    state.save(filepath)
+    return state
@@ -0,0 +1,246 @@
+"""
+Joint missing-value patterns from bit-packed null masks.
+
+The null mask of every row is packed into bits, eight columns per byte,
+padded to whole 64-bit words. Rows are then counted per distinct pattern
+with one vectorized unique pass over a single uint64 per row: the packed
+mask itself for up to 64 columns, or a hash of its words for wider tables,
+checked for collisions. Rows without missing values, usually the majority,
+are only counted.
+
+The co-missingness matrix follows from the distinct patterns and their
+counts, so its cost depends on the number of patterns rather than rows; it
+is accumulated over blocks of patterns with sparse products when few values
+are missing per pattern.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+def _mix(x):
+    """The splitmix64 finalizer, applied elementwise to a uint64 array."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def pack_null_mask(mask):
+    """
+    Pack a boolean null mask into 64-bit words, one row per pattern.
+    
+    Args:
+        mask: boolean array of shape (rows, columns)
+    
+    Returns:
+        uint8 array of shape (rows, 8 * words), column i being bit i % 8 of
+        byte i // 8
+    """
+    packed = np.packbits(mask, axis=1, bitorder='little')
+    padding = -packed.shape[1] % 8
+    if padding or packed.shape[1] == 0:
+        packed = np.pad(packed, ((0, 0), (0, padding or 8)))
+    return np.ascontiguousarray(packed)
+
+def unique_patterns(packed, counts=None):
+    """
+    Distinct rows of a packed mask and how often each occurs.
+    
+    Args:
+        packed: uint8 array from pack_null_mask()
+        counts: optional weight of every row, 1 by default
+    
+    Returns:
+        Tuple of (distinct packed rows, their counts)
+    """
+    words = packed.view(np.uint64)
+    keys = words[:, 0]
+    if words.shape[1] > 1:
+        keys = _mix(keys)
+        for k in range(1, words.shape[1]):
+            keys = _mix(keys ^ _mix(words[:, k] + np.uint64(0x9E3779B97F4A7C15 * k % 2 ** 64)))
+    first, inverse = _group(keys)
+    if words.shape[1] > 1 and not np.array_equal(words[first][inverse], words):
+        # Hash collision: fall back to comparing the packed bytes themselves
+        _, first, inverse = np.unique(packed.view(np.dtype((np.void, packed.shape[1]))).ravel(),
+                                      return_index=True, return_inverse=True)
+    totals = np.bincount(inverse, weights=counts, minlength=len(first))
+    return packed[first], totals.astype(np.int64)
+
+def _group(keys):
+    """Position of one occurrence of every distinct key, and the group of every key."""
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    starts = np.empty(len(keys), dtype=bool)
+    starts[:1] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=starts[1:])
+    inverse = np.empty(len(keys), dtype=np.int64)
+    inverse[order] = np.cumsum(starts) - 1
+    return order[starts], inverse
+
+class MissingPatterns:
+    """Counts of joint missing-value patterns, accumulated over chunks of rows."""
+    
+    def __init__(self, columns):
+        """
+        Initialize an empty MissingPatterns.
+        
+        Args:
+            columns: names of the columns, in mask order
+        """
+        self.columns = list(columns)
+        self.rows = 0
+        self.complete_rows = 0
+        width = 8 * max(1, -(-len(self.columns) // 64))
+        # Distinct patterns of rows with at least one missing value
+        self.patterns = np.empty((0, width), dtype=np.uint8)
+        self.counts = np.empty(0, dtype=np.int64)
+    
+    @classmethod
+    def from_frame(cls, data, chunk_size=1_000_000):
+        """Count the missing-value patterns of a DataFrame, chunk by chunk."""
+        patterns = cls(data.columns)
+        for start in range(0, len(data), chunk_size):
+            patterns.update(data.iloc[start:start + chunk_size])
+        return patterns
+    
+    def update(self, chunk):
+        """
+        Add the null mask of the next rows.
+        
+        Args:
+            chunk: pandas DataFrame with the same columns, or its boolean null mask
+        """
+        if isinstance(chunk, pd.DataFrame):
+            chunk = chunk.isnull().to_numpy()
+        mask = np.asarray(chunk, dtype=bool)
+        incomplete = mask.any(axis=1)
+        self.rows += len(mask)
+        self.complete_rows += int(len(mask) - incomplete.sum())
+        if incomplete.any():
+            patterns, counts = unique_patterns(pack_null_mask(mask[incomplete]))
+            self._add(patterns, counts)
+        return self
+    
+    def _add(self, patterns, counts):
+        if len(self.counts):
+            patterns = np.concatenate([self.patterns, patterns])
+            counts = np.concatenate([self.counts, counts])
+            patterns, counts = unique_patterns(patterns, counts)
+        self.patterns, self.counts = patterns, counts
+    
+    def merge(self, other):
+        """Merge the counts of another MissingPatterns over the same columns."""
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge missing patterns over different columns")
+        self.rows += other.rows
+        self.complete_rows += other.complete_rows
+        if len(other.counts):
+            self._add(other.patterns, other.counts)
+        return self
+    
+    @property
+    def n_patterns(self):
+        """Number of distinct patterns, counting complete rows as one."""
+        return len(self.counts) + (self.complete_rows > 0)
+    
+    def unpacked(self, rows=None):
+        """Boolean matrix of the distinct patterns (or a selection of them), one row per pattern."""
+        patterns = self.patterns if rows is None else self.patterns[rows]
+        bits = np.unpackbits(patterns, axis=1, bitorder='little', count=len(self.columns))
+        return bits.view(bool)
+    
+    def top(self, k=10):
+        """
+        Most frequent patterns, including the pattern of complete rows.
+        
+        Returns:
+            List of dicts with the missing columns of the pattern, its row
+            count and its percentage of rows, most frequent first
+        """
+        # Complete rows are the last candidate, with an empty mask
+        counts = np.append(self.counts, self.complete_rows)
+        if len(counts) > k:
+            candidates = np.argpartition(-counts, k - 1)[:k]
+        else:
+            candidates = np.arange(len(counts))
+        candidates = candidates[counts[candidates] > 0]
+        order = candidates[np.lexsort((candidates, -counts[candidates]))]
+        masks = iter(self.unpacked(order[order < len(self.counts)]))
+        columns = np.asarray(self.columns, dtype=object)
+        return [{'columns': columns[next(masks)].tolist() if i < len(self.counts) else [],
+                 'count': int(counts[i]), 'percent': float(counts[i] / self.rows * 100)}
+                for i in order]
+    
+    def co_missingness(self, kind='count', block_size=65536):
+        """
+        Co-missingness matrix of the columns with missing values.
+        
+        Args:
+            kind: 'count' for the rows where both columns are missing,
+                'conditional' for the share of rows missing the row's column
+                that also miss the other one, or 'correlation' for the phi
+                coefficient of the two null indicators
+            block_size: distinct patterns multiplied at a time
+        
+        Returns:
+            pandas DataFrame indexed by the columns with missing values
+        """
+        counts = np.zeros((len(self.columns), len(self.columns)))
+        for start in range(0, len(self.counts), block_size):
+            masks = self.unpacked(slice(start, start + block_size))
+            weights = self.counts[start:start + block_size].astype(np.float64)
+            if masks.mean() < 0.1:
+                block = sparse.csr_matrix(masks, dtype=np.float64)
+                counts += (block.T.multiply(weights) @ block).toarray()
+            else:
+                block = masks.astype(np.float64)
+                counts += (block.T * weights) @ block
+        present = np.flatnonzero(np.diag(counts) > 0)
+        counts = counts[np.ix_(present, present)]
+        missing = np.diag(counts)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if kind == 'count':
+                matrix = counts.astype(np.int64)
+            elif kind == 'conditional':
+                matrix = counts / missing[:, None]
+            elif kind == 'correlation':
+                n = self.rows
+                spread = np.sqrt(missing * (n - missing))
+                matrix = (n * counts - np.outer(missing, missing)) / np.outer(spread, spread)
+            else:
+                raise ValueError(f"Unknown co-missingness kind '{kind}'")
+        columns = [self.columns[i] for i in present]
+        return pd.DataFrame(matrix, index=columns, columns=columns)
+    
+    def report(self, top=10):
+        """
+        Summarize the patterns seen so far.
+        
+        Returns:
+            Dict with row counts, the number of distinct patterns, the top
+            patterns and the co-missingness count matrix
+        """
+        return {
+            'rows': self.rows,
+            'complete_rows': self.complete_rows,
+            'n_patterns': self.n_patterns,
+            'top_patterns': self.top(top),
+            'co_missingness': self.co_missingness()
+        }
+
+def print_missing_patterns(report, top=5, in_sample=False):
+    """Print the most frequent patterns of a MissingPatterns.report()."""
+    print(f"\n4. Missing-Value Patterns{' (in sample)' if in_sample else ''}: {report['n_patterns']} distinct")
+    for pattern in report['top_patterns'][:top]:
+        columns = ' + '.join(map(str, pattern['columns'])) or 'no missing values'
+        print(f"   {pattern['count']} rows ({pattern['percent']:.1f}%): {columns}")
+
+    co_missing = report['co_missingness']
+    if len(co_missing) > 1:
+        # Off-diagonal pairs, most rows missing both first
+        pairs = co_missing.where(np.triu(np.ones(co_missing.shape, dtype=bool), k=1)).stack()
+        pairs = pairs[pairs > 0].sort_values(ascending=False)
+        print("   Columns missing together:")
+        for (first, second), count in pairs.head(top).items():
+            print(f"   {int(count)} rows: {first} + {second}")
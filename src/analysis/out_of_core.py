@@ -0,0 +1,318 @@
+"""
+Out-of-core analysis of datasets stored as memory-mapped column files.
+
+OutOfCoreAnalyzer offers the reports of DataAnalyzer for a ColumnStore,
+reading it in row chunks: memory stays at a few chunks however many rows
+the dataset has, and the mapped pages are shared by every worker process
+analyzing the same upload.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .streaming_stats import StreamingStats
+from .correlation import CorrelationState, strong_correlations
+from .duplicates import DuplicateTracker
+from .parallel import map_columns
+from .missing_patterns import MissingPatterns, print_missing_patterns
+
+class OutOfCoreAnalyzer:
+    """DataAnalyzer reports computed chunk by chunk over a ColumnStore."""
+    
+    def __init__(self, store, chunk_size=1_000_000, sketch_error=0.01, n_jobs=1):
+        """
+        Initialize the OutOfCoreAnalyzer.
+        
+        Args:
+            store: ColumnStore of the dataset
+            chunk_size: rows read per chunk
+            sketch_error: rank error of the KLL sketches giving quartiles
+            n_jobs: number of threads profiling row chunks in parallel,
+                -1 for one per CPU core; each holds one chunk in memory
+        """
+        self.store = store
+        self.chunk_size = chunk_size
+        self.sketch_error = sketch_error
+        self.n_jobs = n_jobs
+        self._cache = {}
+    
+    @property
+    def columns(self):
+        return list(self.store.columns)
+    
+    @property
+    def numeric_columns(self):
+        """Names of the numeric columns."""
+        return self.store.columns_of_kind('numeric')
+    
+    @property
+    def categorical_columns(self):
+        """Names of the text and categorical columns."""
+        return self.store.columns_of_kind('categorical')
+    
+    @property
+    def total_rows(self):
+        return self.store.rows
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the memoized results; the rows stay on disk."""
+        nbytes = 0
+        if 'profile' in self._cache:
+            stats, counts, patterns = self._cache['profile']
+            nbytes += sum(count.nbytes for count in counts.values())
+            nbytes += patterns.patterns.nbytes + patterns.counts.nbytes
+            nbytes += 64 * 1024 * len(stats.sketches or [])
+        if 'correlation' in self._cache:
+            nbytes += self._cache['correlation'].to_numpy().nbytes
+        return nbytes
+    
+    def _ranges(self):
+        return [(start, min(start + self.chunk_size, self.store.rows))
+                for start in range(0, self.store.rows, self.chunk_size)]
+    
+    def chunks(self, columns=None, codes=False):
+        """Yield the rows of the dataset as DataFrame chunks, see ColumnStore.chunk()."""
+        for start, stop in self._ranges():
+            yield self.store.chunk(start, stop, columns=columns, codes=codes)
+    
+    def _profile(self):
+        """
+        One pass over all rows: StreamingStats of every column, exact value
+        counts of every categorical column from its codes, and the joint
+        missing-value patterns.
+        """
+        if 'profile' in self._cache:
+            return self._cache['profile']
+        categorical = self.categorical_columns
+        
+        def profile(bounds):
+            chunk = self.store.chunk(*bounds)
+            stats = StreamingStats(sketch_error=self.sketch_error)
+            stats.update(chunk)
+            counts = {}
+            for col in categorical:
+                codes = chunk[col].cat.codes.to_numpy()
+                counts[col] = np.bincount(codes[codes >= 0], minlength=len(self.store.categories(col)))
+            return stats, counts, MissingPatterns(self.columns).update(chunk)
+        
+        stats = StreamingStats(sketch_error=self.sketch_error)
+        counts = {col: np.zeros(len(self.store.categories(col)), dtype=np.int64) for col in categorical}
+        patterns = MissingPatterns(self.columns)
+        for part_stats, part_counts, part_patterns in map_columns(profile, self._ranges(), self.n_jobs):
+            stats.merge(part_stats)
+            for col in categorical:
+                counts[col] += part_counts[col]
+            patterns.merge(part_patterns)
+        if stats.columns is None:
+            stats.update(self.store.chunk(0, 0))
+        self._cache['profile'] = stats, counts, patterns
+        return self._cache['profile']
+    
+    @property
+    def summary_stats(self):
+        """StreamingStats of every column, with KLL sketches for the quartiles."""
+        return self._profile()[0]
+    
+    @property
+    def null_counts(self):
+        """Missing values per column, as an int64 Series."""
+        return pd.Series(self.summary_stats.missing_values(), dtype='int64')
+    
+    def value_counts(self, column):
+        """Exact counts of the values of a categorical column, most frequent first."""
+        counts = pd.Series(self._profile()[1][column], index=self.store.categories(column))
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+    
+    def missing_patterns(self, top=10):
+        """Joint missing-value patterns, in the layout of MissingPatterns.report()."""
+        return self._profile()[2].report(top)
+    
+    def basic_stats(self, exact_categorical=True, top_k=20):
+        """
+        Calculate basic statistical measures, like DataAnalyzer.basic_stats().
+        
+        Categorical counts are always exact, from the stored codes; quartiles
+        come from KLL sketches.
+        
+        Args:
+            exact_categorical: accepted for compatibility with DataAnalyzer
+            top_k: number of most frequent values reported per categorical column
+        """
+        print("\n📊 Basic Statistics (out-of-core)")
+        print("-" * 30)
+        
+        shape = (self.store.rows, len(self.store.columns))
+        print(f"Dataset shape: {shape}")
+        print("\nColumn kinds:")
+        print(pd.Series(self.store.kinds).value_counts())
+        
+        missing = self.null_counts
+        if missing.sum() > 0:
+            print("\nMissing values:")
+            print(missing[missing > 0])
+        else:
+            print("\n✅ No missing values found")
+        
+        numeric_summary = self.summary_stats.describe()
+        if numeric_summary:
+            print("\nDescriptive Statistics (Numeric):")
+            print(pd.DataFrame(numeric_summary))
+        
+        categorical_summary = {}
+        categorical_cardinality = {}
+        if self.categorical_columns:
+            print("\nCategorical Variables Summary:")
+        for col in self.categorical_columns:
+            counts = self.value_counts(col)
+            categorical_summary[col] = {value: int(count) for value, count in counts.iloc[:top_k].items()}
+            categorical_cardinality[col] = len(counts)
+            print(f"{col}: {len(counts)} unique values")
+            if len(counts) <= 10:
+                print(f"  Values: {list(categorical_summary[col])}")
+        
+        return {
+            'shape': shape,
+            'missing_values': missing.to_dict(),
+            'numeric_summary': numeric_summary,
+            'categorical_summary': categorical_summary,
+            'categorical_cardinality': categorical_cardinality
+        }
+    
+    def correlation_matrix(self, method='pearson'):
+        """Pairwise-complete Pearson matrix from sums accumulated over chunks."""
+        if method != 'pearson':
+            raise ValueError(f"Out-of-core analysis does not support the '{method}' method")
+        if 'correlation' not in self._cache:
+            state = CorrelationState(self.numeric_columns)
+            for chunk in self.chunks(columns=self.numeric_columns):
+                state.update(chunk)
+            self._cache['correlation'] = state.matrix()
+        return self._cache['correlation']
+    
+    def correlation_analysis(self, method='pearson'):
+        """
+        Analyze correlations between numeric variables.
+        
+        Returns:
+            The correlation matrix, or None with fewer than 2 numeric columns
+        """
+        if len(self.numeric_columns) < 2:
+            print("⚠️ Need at least 2 numeric columns for correlation analysis")
+            return None
+        
+        print(f"\n🔗 Correlation Analysis ({method.title()}, out-of-core)")
+        print("-" * 30)
+        corr_matrix = self.correlation_matrix(method)
+        strong_pairs = strong_correlations(corr_matrix, threshold=0.7)
+        if strong_pairs:
+            print("Strong correlations found:")
+            for corr in strong_pairs:
+                print(f"  {corr['var1']} ↔ {corr['var2']}: {corr['correlation']:.3f}")
+        else:
+            print("No strong correlations (>0.7) found")
+        return corr_matrix
+    
+    def detect_outliers(self, column, method='iqr'):
+        """
+        Detect outliers in a numeric column.
+        
+        Bounds come from the one-pass statistics (KLL quartiles for 'iqr');
+        a second pass over the column finds the rows outside them.
+        
+        Args:
+            column: Column name
+            method: 'iqr' or 'zscore'
+        
+        Returns:
+            DataFrame of the outlier rows, indexed by row position
+        """
+        if column not in self.numeric_columns:
+            raise ValueError(f"Column '{column}' not found")
+        summary = self.summary_stats.describe()[column]
+        
+        if method == 'iqr':
+            IQR = summary['75%'] - summary['25%']
+            lower_bound = summary['25%'] - 1.5 * IQR
+            upper_bound = summary['75%'] + 1.5 * IQR
+        elif method == 'zscore':
+            # stats.zscore uses the population standard deviation
+            count = summary['count']
+            std = summary['std'] * np.sqrt((count - 1) / count) if count > 1 else np.nan
+            lower_bound = summary['mean'] - 3 * std
+            upper_bound = summary['mean'] + 3 * std
+        else:
+            raise ValueError(f"Unknown outlier method '{method}'")
+        
+        values = self.store.column(column)
+        positions = []
+        for start, stop in self._ranges():
+            chunk = values[start:stop]
+            positions.append(np.flatnonzero((chunk < lower_bound) | (chunk > upper_bound)) + start)
+        outliers = self.store.take(np.concatenate(positions) if positions else [])
+        
+        print(f"\n🎯 Outlier Detection ({method.upper()}) for '{column}'")
+        print("-" * 40)
+        print(f"Total outliers found: {len(outliers)}")
+        print(f"Percentage of data: {len(outliers)/max(self.store.rows, 1)*100:.2f}%")
+        return outliers
+    
+    def histogram(self, column, bins=30):
+        """Histogram of a numeric column accumulated over chunks, like np.histogram()."""
+        summary = self.summary_stats.describe()[column]
+        value_range = (summary['min'], summary['max']) if summary['count'] else (0.0, 1.0)
+        counts = np.zeros(bins, dtype=np.int64)
+        values = self.store.column(column)
+        for start, stop in self._ranges():
+            chunk = values[start:stop]
+            counts += np.histogram(chunk[~np.isnan(chunk)], bins=bins, range=value_range)[0]
+        return counts, np.histogram_bin_edges([], bins=bins, range=value_range)
+    
+    def data_quality_report(self, duplicate_subset=None):
+        """
+        Generate a data quality report, like DataAnalyzer.data_quality_report().
+        
+        Duplicates are found by hashing rows chunk by chunk, with categorical
+        columns hashed as their codes.
+        
+        Args:
+            duplicate_subset: optional list of columns that define a duplicate row
+        """
+        print("\n📋 Data Quality Report (out-of-core)")
+        print("=" * 40)
+        
+        completeness = (1 - self.null_counts / max(self.store.rows, 1)) * 100
+        print("\n1. Data Completeness:")
+        for col in completeness.index:
+            status = "✅" if completeness[col] == 100 else "⚠️" if completeness[col] > 90 else "❌"
+            print(f"   {status} {col}: {completeness[col]:.1f}%")
+        
+        subset = tuple(duplicate_subset) if duplicate_subset is not None else None
+        if ('duplicates', subset) not in self._cache:
+            tracker = DuplicateTracker()
+            for chunk in self.chunks(columns=list(subset) if subset else None, codes=True):
+                tracker.update(chunk)
+            self._cache[('duplicates', subset)] = tracker.report()
+        duplicate_report = self._cache[('duplicates', subset)]
+        duplicates = duplicate_report['duplicates']
+        print(f"\n2. Duplicate Rows: {duplicates}")
+        if duplicates:
+            print(f"   {duplicate_report['n_groups']} groups, largest: "
+                  f"{[group['size'] for group in duplicate_report['groups'][:5]]}")
+        
+        print("\n3. Column Kinds:")
+        for kind, count in pd.Series(self.store.kinds).value_counts().items():
+            print(f"   {kind}: {count} columns")
+        
+        pattern_report = self.missing_patterns()
+        print_missing_patterns(pattern_report)
+        
+        return {
+            'completeness': completeness.to_dict(),
+            'duplicates': duplicates,
+            'duplicate_groups': duplicate_report['groups'],
+            'missing_patterns': pattern_report['top_patterns'],
+            'n_missing_patterns': pattern_report['n_patterns'],
+            'co_missingness': pattern_report['co_missingness'].to_dict(),
+            'total_rows': self.store.rows
+        }
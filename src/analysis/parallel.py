@@ -0,0 +1,93 @@
+"""
+Column-parallel execution helpers for profiling wide datasets.
+
+Profiling work is independent per column, so a DataFrame is split into
+contiguous column shards that are processed by a thread pool. Threads share
+the data without copying it, and the NumPy reductions and pandas hashing
+that dominate the work release the GIL.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    from threadpoolctl import threadpool_limits
+    HAS_THREADPOOLCTL = True
+except ImportError:
+    HAS_THREADPOOLCTL = False
+
+def resolve_workers(n_jobs):
+    """
+    Turn an n_jobs setting into a worker count.
+    
+    Args:
+        n_jobs: number of workers; None or 1 runs serially, -1 uses every core
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, int(n_jobs))
+
+@contextmanager
+def native_thread_limit(threads):
+    """
+    Cap the BLAS and OpenMP thread pools while the block runs.
+    
+    Estimators such as HistGradientBoosting open an OpenMP pool per fit;
+    when several fits run in parallel threads, each pool must get only its
+    share of the threads reserved for all of them.
+    
+    Args:
+        threads: threads per native pool, at least 1
+    """
+    if not HAS_THREADPOOLCTL:
+        yield
+        return
+    with threadpool_limits(limits=max(1, int(threads))):
+        yield
+
+def column_shards(columns, n_shards):
+    """Split a list of columns into at most n_shards contiguous, non-empty shards."""
+    columns = list(columns)
+    if not columns:
+        return []
+    bounds = np.linspace(0, len(columns), max(1, min(n_shards, len(columns))) + 1).astype(int)
+    return [columns[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+def map_columns(func, items, n_jobs=1):
+    """
+    Apply func to every item, in a thread pool when more than one worker is requested.
+    
+    Args:
+        func: callable taking one item
+        items: list of items, e.g. column names or shards
+        n_jobs: worker count, see resolve_workers()
+    
+    Returns:
+        List of results in the order of items
+    """
+    workers = min(resolve_workers(n_jobs), len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='profile') as pool:
+        return list(pool.map(func, items))
+
+def map_column_shards(func, data, n_jobs=1):
+    """
+    Apply func to column shards of a DataFrame, one shard per worker.
+    
+    Args:
+        func: callable taking a DataFrame holding a subset of the columns
+        data: pandas DataFrame
+        n_jobs: worker count, see resolve_workers()
+    
+    Returns:
+        List of results, ordered like the columns of data
+    """
+    shards = column_shards(range(data.shape[1]), resolve_workers(n_jobs))
+    if len(shards) <= 1:
+        return [func(data)]
+    return map_columns(lambda positions: func(data.iloc[:, positions]), shards, n_jobs)
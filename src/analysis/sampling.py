@@ -0,0 +1,290 @@
+"""
+Sampling layer for fast, approximate analysis of very large datasets.
+
+Samples are drawn in one pass over a stream of chunks: uniformly with
+reservoir sampling, or stratified on a categorical column with one reservoir
+per stratum. SampleEstimator turns a sample into population estimates that
+each carry a confidence interval, using the stratified (or simple random)
+sampling variance with finite population correction. Ratios such as means
+over non-missing values are linearized, and quantile intervals use
+Woodruff's method.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+class DataSample:
+    """A sample of rows with the population sizes needed to weight it."""
+    
+    def __init__(self, data, population_rows, strata=None, strata_sizes=None, strata_column=None):
+        """
+        Initialize the DataSample.
+        
+        Args:
+            data: pandas DataFrame of sampled rows
+            population_rows: number of rows the sample was drawn from
+            strata: optional integer stratum of every sampled row
+            strata_sizes: population rows of every stratum
+            strata_column: name of the column the sample is stratified on
+        """
+        self.data = data.reset_index(drop=True)
+        self.population_rows = int(population_rows)
+        if strata is None:
+            strata = np.zeros(len(data), dtype=np.int64)
+            strata_sizes = [population_rows]
+        self.strata = np.asarray(strata, dtype=np.int64)
+        self.strata_sizes = np.asarray(strata_sizes, dtype=np.float64)
+        self.strata_column = strata_column
+    
+    @property
+    def weights(self):
+        """Population rows represented by every sampled row."""
+        sample_sizes = np.bincount(self.strata, minlength=len(self.strata_sizes))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self.strata_sizes / sample_sizes)[self.strata]
+
+class ReservoirSampler:
+    """Uniform sample of fixed size over a stream of DataFrame chunks (Algorithm R)."""
+    
+    def __init__(self, size, seed=42):
+        """
+        Initialize the ReservoirSampler.
+        
+        Args:
+            size: number of rows to keep
+            seed: random seed
+        """
+        self.size = size
+        self.rows_seen = 0
+        self.sample = None
+        self._rng = np.random.default_rng(seed)
+    
+    def update(self, chunk):
+        """
+        Offer the rows of a chunk to the reservoir.
+        
+        Row t (1-based) replaces a uniformly chosen slot with probability
+        size / t. Within a chunk this is vectorized: every row draws its slot
+        at once and, where several rows pick the same slot, the last one wins,
+        as it would when processed one row at a time.
+        """
+        if self.sample is None:
+            self.sample = chunk.iloc[:0]
+        need = self.size - len(self.sample)
+        if need > 0:
+            self.sample = pd.concat([self.sample, chunk.iloc[:need]], ignore_index=True)
+            self.rows_seen += min(need, len(chunk))
+            chunk = chunk.iloc[need:]
+        if len(chunk) == 0:
+            return self
+        
+        positions = self.rows_seen + np.arange(1, len(chunk) + 1)
+        slots = self._rng.integers(0, positions)
+        accepted = np.flatnonzero(slots < self.size)[::-1]
+        replaced, last = np.unique(slots[accepted], return_index=True)
+        keep = np.ones(len(self.sample), dtype=bool)
+        keep[replaced] = False
+        # Slots are exchangeable, so replaced rows can move to the end
+        self.sample = pd.concat([self.sample.iloc[keep], chunk.iloc[accepted[last]]], ignore_index=True)
+        self.rows_seen += len(chunk)
+        return self
+    
+    def result(self):
+        """Return the sample as a DataSample."""
+        return DataSample(self.sample if self.sample is not None else pd.DataFrame(), self.rows_seen)
+
+class StratifiedSampler:
+    """Stratified sample over a stream: one reservoir per value of a column."""
+    
+    def __init__(self, column, size_per_stratum, seed=42, max_strata=1000):
+        """
+        Initialize the StratifiedSampler.
+        
+        Args:
+            column: categorical column to stratify on; missing values form
+                their own stratum
+            size_per_stratum: rows kept per stratum
+            seed: random seed
+            max_strata: raise ValueError beyond this many distinct values
+        """
+        self.column = column
+        self.size_per_stratum = size_per_stratum
+        self.seed = seed
+        self.max_strata = max_strata
+        self.samplers = {}
+    
+    def update(self, chunk):
+        """Route the rows of a chunk to the reservoir of their stratum."""
+        if self.column not in chunk.columns:
+            raise ValueError(f"Column '{self.column}' not found")
+        for value, group in chunk.groupby(chunk[self.column].astype(object), dropna=False, sort=False):
+            key = None if pd.isna(value) else value
+            if key not in self.samplers:
+                if len(self.samplers) >= self.max_strata:
+                    raise ValueError(f"Column '{self.column}' has more than {self.max_strata} values to stratify on")
+                self.samplers[key] = ReservoirSampler(self.size_per_stratum, seed=self.seed + len(self.samplers))
+            self.samplers[key].update(group)
+        return self
+    
+    def result(self):
+        """Return the combined sample as a DataSample."""
+        samplers = list(self.samplers.values())
+        if not samplers:
+            return DataSample(pd.DataFrame(), 0)
+        return DataSample(
+            pd.concat([sampler.sample for sampler in samplers], ignore_index=True),
+            sum(sampler.rows_seen for sampler in samplers),
+            strata=np.repeat(np.arange(len(samplers)), [len(sampler.sample) for sampler in samplers]),
+            strata_sizes=[sampler.rows_seen for sampler in samplers],
+            strata_column=self.column
+        )
+
+def draw_sample(chunks, size, stratify_by=None, seed=42):
+    """
+    Draw a sample in one pass over a DataFrame or an iterable of chunks.
+    
+    Args:
+        chunks: pandas DataFrame, or iterable of DataFrames
+        size: sample rows, per stratum when stratify_by is set
+        stratify_by: optional categorical column to stratify on
+        seed: random seed
+    
+    Returns:
+        DataSample
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    sampler = StratifiedSampler(stratify_by, size, seed) if stratify_by else ReservoirSampler(size, seed)
+    for chunk in chunks:
+        sampler.update(chunk)
+    return sampler.result()
+
+def interval(estimate, error, lower=None, upper=None):
+    """Build the dict describing an estimate and its confidence interval."""
+    if error is not None:
+        lower = estimate - error if lower is None else lower
+        upper = estimate + error if upper is None else upper
+    return {'estimate': estimate, 'lower': lower, 'upper': upper, 'error': error}
+
+class SampleEstimator:
+    """Population estimates with confidence intervals from a DataSample."""
+    
+    def __init__(self, sample, confidence=0.95):
+        """
+        Initialize the SampleEstimator.
+        
+        Args:
+            sample: DataSample
+            confidence: confidence level of the intervals
+        """
+        self.sample = sample
+        self.confidence = confidence
+        self.z = stats.norm.ppf(0.5 + confidence / 2)
+        self.weights = sample.weights
+        n_strata = len(sample.strata_sizes)
+        self._sample_sizes = np.bincount(sample.strata, minlength=n_strata).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = sample.strata_sizes / sample.strata_sizes.sum()
+            # Per-stratum factor of the variance of the mean: W_h² (1 - f_h) / n_h
+            factors = shares ** 2 * (1 - self._sample_sizes / sample.strata_sizes) / self._sample_sizes
+        self._variance_factors = np.nan_to_num(factors)
+    
+    @property
+    def population_rows(self):
+        return self.sample.population_rows
+    
+    def _mean(self, values):
+        """Estimated population mean of a per-row variable and its standard error."""
+        strata = self.sample.strata
+        n_h = self._sample_sizes
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.bincount(strata, weights=values, minlength=len(n_h)) / n_h
+            squares = np.bincount(strata, weights=(values - means[strata]) ** 2, minlength=len(n_h))
+            variances = np.where(n_h > 1, squares / (n_h - 1), 0.0)
+        shares = self.sample.strata_sizes / self.sample.strata_sizes.sum()
+        estimate = float(np.nansum(shares * means))
+        return estimate, float(np.sqrt(np.sum(self._variance_factors * variances)))
+    
+    def _weighted_quantile(self, values, weights, q):
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, np.clip(q, 0, 1) * cumulative[-1], side='left')
+        return float(values[order][min(position, len(values) - 1)])
+    
+    def describe(self, columns):
+        """
+        Numeric summary in the layout of DataFrame.describe().to_dict(),
+        with an interval dict in place of every number.
+        """
+        summary = {}
+        n = self.population_rows
+        for col in columns:
+            values = self.sample.data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            present = ~np.isnan(values)
+            share, share_se = self._mean(present.astype(np.float64))
+            result = {'count': interval(n * share, self.z * n * share_se)}
+            if not present.any():
+                summary[col] = {**result, **{stat: interval(np.nan, None)
+                                             for stat in ['mean', 'std', 'min', '25%', '50%', '75%', 'max']}}
+                continue
+            
+            y, w = values[present], self.weights[present]
+            mean = float(np.average(y, weights=w))
+            centered = np.where(present, values - mean, 0.0)
+            _, mean_se = self._mean(centered / share)
+            variance = float(np.average((y - mean) ** 2, weights=w))
+            _, variance_se = self._mean(np.where(present, centered ** 2 - variance, 0.0) / share)
+            std = np.sqrt(variance)
+            result['mean'] = interval(mean, self.z * mean_se)
+            result['std'] = interval(std, self.z * variance_se / (2 * std) if std > 0 else 0.0)
+            
+            # The sample extremes only bound the population extremes
+            result['min'] = interval(float(y.min()), None, upper=float(y.min()))
+            for q, name in [(0.25, '25%'), (0.5, '50%'), (0.75, '75%')]:
+                estimate = self._weighted_quantile(y, w, q)
+                # Woodruff: interval of the CDF at the estimate, mapped back through the quantile function
+                _, cdf_se = self._mean(np.where(present, (values <= estimate) - q, 0.0) / share)
+                lower = self._weighted_quantile(y, w, q - self.z * cdf_se)
+                upper = self._weighted_quantile(y, w, q + self.z * cdf_se)
+                result[name] = interval(estimate, (upper - lower) / 2, lower=lower, upper=upper)
+            result['max'] = interval(float(y.max()), None, lower=float(y.max()))
+            summary[col] = result
+        return summary
+    
+    def missing_values(self):
+        """Estimated missing values per column, as interval dicts of counts."""
+        n = self.population_rows
+        missing = self.sample.data.isnull().to_numpy()
+        result = {}
+        for i, col in enumerate(self.sample.data.columns):
+            share, share_se = self._mean(missing[:, i].astype(np.float64))
+            result[col] = interval(n * share, self.z * n * share_se, lower=max(0.0, n * (share - self.z * share_se)))
+        return result
+    
+    def missing_total(self):
+        """Estimated missing values over all columns, as an interval dict."""
+        n = self.population_rows
+        share, share_se = self._mean(self.sample.data.isnull().sum(axis=1).to_numpy(dtype=np.float64))
+        return interval(n * share, self.z * n * share_se, lower=max(0.0, n * (share - self.z * share_se)))
+    
+    def value_counts(self, column, top_k=20):
+        """Estimated counts of the top_k most frequent values of a column, as interval dicts."""
+        values = self.sample.data[column]
+        weighted = pd.Series(self.weights, index=values.index).groupby(values.astype(object), sort=False).sum()
+        result = {}
+        for value in weighted.sort_values(ascending=False).index[:top_k]:
+            share, share_se = self._mean((values.astype(object) == value).to_numpy(dtype=np.float64))
+            n = self.population_rows
+            result[value] = interval(n * share, self.z * n * share_se)
+        return result
+    
+    def correlation_interval(self, r):
+        """Interval of a correlation coefficient from the Fisher z-transform."""
+        n = len(self.sample.data)
+        if n <= 3 or not np.isfinite(r):
+            return interval(r, None)
+        spread = self.z / np.sqrt(n - 3)
+        center = np.arctanh(np.clip(r, -0.999999, 0.999999))
+        lower, upper = float(np.tanh(center - spread)), float(np.tanh(center + spread))
+        return interval(float(r), (upper - lower) / 2, lower=lower, upper=upper)
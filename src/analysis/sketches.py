@@ -0,0 +1,383 @@
+"""
+Mergeable sketches for approximate statistics over large columns.
+
+A sketch summarizes a column in a few KB of state, can be built chunk by
+chunk during ingest or streaming, and sketches of different chunks, files
+or processes can be merged.
+"""
+
+import base64
+import json
+import math
+import os
+import numpy as np
+import pandas as pd
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang and Liberty, 2016).
+    
+    Items are kept in a stack of compactors; an item at level h stands for
+    2**h input values. Quantile queries have a normalized rank error of
+    about 1.65 / k with high probability.
+    """
+    
+    def __init__(self, k=200, seed=42):
+        """
+        Initialize the KLLSketch.
+        
+        Args:
+            k: size parameter, larger values are more accurate
+            seed: random seed for reproducible compaction
+        """
+        self.k = max(8, int(k))
+        self.n = 0
+        self.min = np.nan
+        self.max = np.nan
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+    
+    @classmethod
+    def from_error(cls, error=0.01, seed=42):
+        """Create a sketch whose normalized rank error is about error."""
+        return cls(k=math.ceil(1.65 / error), seed=seed)
+    
+    @property
+    def error(self):
+        """Approximate normalized rank error of quantile queries."""
+        return 1.65 / self.k
+    
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+    
+    def update(self, values):
+        """
+        Add an array of values to the sketch; NaNs are ignored.
+        
+        Large batches are sorted once and halved down to a level where they
+        fit, so a chunk of millions of values costs one sort.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        
+        self.n += len(values)
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        
+        level = 0
+        if len(values) > self.k:
+            values = np.sort(values)
+            while len(values) > self.k:
+                values = values[self._rng.integers(2)::2]
+                level += 1
+        self._add(level, values)
+        self._compress()
+        return self
+    
+    def _add(self, level, values):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], values])
+    
+    def _compress(self):
+        """Compact the lowest over-full level until every level fits."""
+        while True:
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) > self._capacity(level):
+                    self._compact(level)
+                    break
+            else:
+                return
+    
+    def _compact(self, level):
+        items = np.sort(self.levels[level])
+        keep = items[-1:] if len(items) % 2 else items[:0]
+        paired = items[:len(items) - len(keep)]
+        self.levels[level] = keep
+        self._add(level + 1, paired[self._rng.integers(2)::2])
+    
+    def merge(self, other):
+        """Merge another KLLSketch into this one."""
+        if other.n == 0:
+            return self
+        self.n += other.n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self.k = min(self.k, other.k)
+        for level, items in enumerate(other.levels):
+            self._add(level, items)
+        self._compress()
+        return self
+    
+    def quantiles(self, percentiles):
+        """
+        Return approximate quantiles.
+        
+        Args:
+            percentiles: iterable of quantiles between 0 and 1
+        
+        Returns:
+            numpy array of the same length, NaN if the sketch is empty
+        """
+        percentiles = np.asarray(percentiles, dtype=np.float64)
+        if self.n == 0:
+            return np.full(len(percentiles), np.nan)
+        
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_at), 2.0 ** level)
+                                  for level, items_at in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        ranks = percentiles * cumulative[-1]
+        result = items[np.minimum(np.searchsorted(cumulative, ranks, side='left'), len(items) - 1)]
+        # The extremes are tracked exactly
+        result = np.where(percentiles <= 0, self.min, result)
+        return np.where(percentiles >= 1, self.max, result)
+    
+    def quantile(self, q):
+        """Return a single approximate quantile."""
+        return float(self.quantiles([q])[0])
+    
+    def to_dict(self):
+        """Return a JSON-serializable snapshot of the sketch."""
+        return {
+            'k': self.k,
+            'n': self.n,
+            'min': None if np.isnan(self.min) else float(self.min),
+            'max': None if np.isnan(self.max) else float(self.max),
+            'levels': [items.tolist() for items in self.levels]
+        }
+    
+    @classmethod
+    def from_dict(cls, state, seed=42):
+        """Rebuild a sketch from a snapshot created by to_dict()."""
+        sketch = cls(k=state['k'], seed=seed)
+        sketch.n = state['n']
+        sketch.min = np.nan if state['min'] is None else state['min']
+        sketch.max = np.nan if state['max'] is None else state['max']
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in state['levels']]
+        return sketch
+
+def bit_length(values):
+    """
+    Exact bit length of every uint64 value, like int.bit_length().
+    
+    Values wider than the 53-bit float mantissa would round up to the next
+    power of two, so each 32-bit half is converted on its own, exactly.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    high = np.frexp((values >> np.uint64(32)).astype(np.float64))[1]
+    low = np.frexp((values & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+    return np.where(high > 0, high + 32, low)
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch (Flajolet et al., 2007).
+    
+    Uses 2**p one-byte registers; the relative standard error of the
+    estimate is about 1.04 / sqrt(2**p), 1.6% for the default p=12.
+    """
+    
+    def __init__(self, p=12):
+        """
+        Initialize the HyperLogLog.
+        
+        Args:
+            p: number of index bits, between 4 and 18
+        """
+        if not 4 <= p <= 18:
+            raise ValueError("p must be between 4 and 18")
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+    
+    def update(self, values):
+        """Add an array of values to the sketch; missing values are ignored."""
+        values = np.asarray(values)
+        values = values[~pd.isna(values)]
+        if len(values) == 0:
+            return self
+        
+        # Duplicates do not change the registers, so callers may pass distinct values only
+        hashes = pd.util.hash_array(values, categorize=False)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rank = ((64 - self.p) - bit_length(remainder) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+    
+    def merge(self, other):
+        """Merge another HyperLogLog with the same p into this one."""
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different p")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+    
+    def count(self):
+        """Return the estimated number of distinct values."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros > 0:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+    
+    def to_dict(self):
+        """Return a JSON-serializable snapshot of the sketch."""
+        return {'p': self.p, 'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')}
+    
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild a sketch from a snapshot created by to_dict()."""
+        sketch = cls(p=state['p'])
+        sketch.registers = np.frombuffer(base64.b64decode(state['registers']), dtype=np.uint8).copy()
+        return sketch
+
+class SpaceSaving:
+    """
+    Mergeable Space-Saving heavy-hitter summary (Metwally et al., 2005).
+    
+    At most ``capacity`` values are monitored. Reported counts never
+    underestimate and overestimate by at most the stored error; while fewer
+    than ``capacity`` distinct values were seen the counts are exact.
+    """
+    
+    def __init__(self, capacity=100):
+        """
+        Initialize the SpaceSaving summary.
+        
+        Args:
+            capacity: number of monitored values
+        """
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+    
+    def _floor(self):
+        """Largest count an unmonitored value can have."""
+        return int(self.counts.min()) if len(self.counts) >= self.capacity else 0
+    
+    def _combine(self, counts, errors, floor):
+        own_floor = self._floor()
+        keys = self.counts.index.union(counts.index)
+        combined = (self.counts.reindex(keys, fill_value=own_floor) +
+                    counts.reindex(keys, fill_value=floor))
+        combined_errors = (self.errors.reindex(keys, fill_value=own_floor) +
+                           errors.reindex(keys, fill_value=floor))
+        top = combined.sort_values(ascending=False, kind='stable').iloc[:self.capacity]
+        self.counts = top.astype(np.int64)
+        self.errors = combined_errors.reindex(top.index).astype(np.int64)
+    
+    def update(self, values):
+        """Add an array of values to the summary; missing values are ignored."""
+        return self.update_counts(pd.Series(values).value_counts(dropna=True))
+    
+    def update_counts(self, counts):
+        """Add a Series of value counts, e.g. the value_counts() of a chunk."""
+        counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+        if counts.empty:
+            return self
+        # The chunk's own top values form a summary whose unmonitored values
+        # occur at most as often as the first one left out
+        floor = int(counts.iloc[self.capacity]) if len(counts) > self.capacity else 0
+        counts = counts.iloc[:self.capacity]
+        self._combine(counts, pd.Series(0, index=counts.index, dtype=np.int64), floor)
+        return self
+    
+    def merge(self, other):
+        """Merge another SpaceSaving summary into this one."""
+        self._combine(other.counts, other.errors, other._floor())
+        return self
+    
+    def top(self, k=10):
+        """Return the k most frequent values as a dict of value to estimated count."""
+        return {value: int(count) for value, count in self.counts.iloc[:k].items()}
+    
+    @property
+    def is_exact(self):
+        """Whether the counts are exact because the summary never filled up."""
+        return len(self.counts) < self.capacity or not self.errors.any()
+
+def summarize_categorical(values, capacity=1000, chunk_size=500_000, hll_p=12):
+    """
+    Approximate distinct count and top values of a categorical column.
+    
+    The column is processed in slices, so memory stays bounded even when
+    almost every value is distinct, and each slice is counted once; only its
+    distinct values are hashed into the HyperLogLog.
+    
+    Args:
+        values: pandas Series
+        capacity: number of values monitored by the Space-Saving summary;
+            counts are exact for columns with fewer distinct values
+        chunk_size: rows hashed and counted at a time
+        hll_p: HyperLogLog precision
+    
+    Returns:
+        Tuple of (HyperLogLog, SpaceSaving)
+    """
+    distinct = HyperLogLog(p=hll_p)
+    heavy_hitters = SpaceSaving(capacity=capacity)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Category codes give exact counts in a single bincount
+        codes = values.cat.codes.to_numpy()
+        counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(values.cat.categories)),
+                           index=values.cat.categories)
+        counts = counts[counts > 0]
+        distinct.update(counts.index)
+        heavy_hitters.update_counts(counts)
+        return distinct, heavy_hitters
+    
+    for start in range(0, len(values), chunk_size):
+        counts = values.iloc[start:start + chunk_size].value_counts(dropna=True, sort=False)
+        distinct.update(counts.index)
+        heavy_hitters.update_counts(counts)
+    return distinct, heavy_hitters
+
+def build_quantile_sketches(data, error=0.01):
+    """
+    Build a KLL sketch for every numeric column of a DataFrame.
+    
+    Args:
+        data: pandas DataFrame
+        error: target normalized rank error of each sketch
+    
+    Returns:
+        dict of column name to KLLSketch
+    """
+    sketches = {}
+    for col in data.select_dtypes(include=[np.number]).columns:
+        sketches[str(col)] = KLLSketch.from_error(error).update(data[col].to_numpy(dtype=np.float64, na_value=np.nan))
+    return sketches
+
+SKETCH_SUFFIX = '.sketch.json'
+
+def save_quantile_sketches(filepath, sketches):
+    """Store the quantile sketches of an upload in a sidecar file."""
+    stat = os.stat(filepath)
+    payload = {
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_size': stat.st_size,
+        'sketches': {col: sketch.to_dict() for col, sketch in sketches.items()}
+    }
+    path = filepath + SKETCH_SUFFIX
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+def load_quantile_sketches(filepath):
+    """Load the quantile sketches of an upload, or None if missing or stale."""
+    path = filepath + SKETCH_SUFFIX
+    if not os.path.exists(path) or not os.path.exists(filepath):
+        return None
+    with open(path) as f:
+        payload = json.load(f)
+    stat = os.stat(filepath)
+    if payload['source_mtime_ns'] != stat.st_mtime_ns or payload['source_size'] != stat.st_size:
+        return None
+    return {col: KLLSketch.from_dict(state) for col, state in payload['sketches'].items()}
@@ -0,0 +1,278 @@
+"""
+One-pass, mergeable summary statistics for numeric columns.
+
+Moments are accumulated per chunk and combined with the pairwise update of
+Chan et al., so partial states computed over chunks, processes or files can
+be merged into the same result as a single pass over all rows.
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+
+from .sketches import KLLSketch
+from .parallel import map_column_shards
+
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+def exact_quantiles(values, present, percentiles=DESCRIBE_PERCENTILES):
+    """
+    Exact per-column quantiles with linear interpolation, like DataFrame.quantile().
+    
+    Each column is partitioned once for all requested percentiles instead of
+    being sorted.
+    
+    Args:
+        values: 2D float array, one column per variable
+        present: boolean mask of non-missing entries in values
+        percentiles: quantiles to compute, between 0 and 1
+    
+    Returns:
+        Array of shape (len(percentiles), n_columns)
+    """
+    percentiles = np.asarray(percentiles, dtype=np.float64)
+    result = np.full((len(percentiles), values.shape[1]), np.nan)
+    for i in range(values.shape[1]):
+        column = values[:, i]
+        if not present[:, i].all():
+            column = column[present[:, i]]
+        if len(column) == 0:
+            continue
+        positions = percentiles * (len(column) - 1)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.ceil(positions).astype(np.int64)
+        partitioned = np.partition(column, np.unique(np.concatenate([lower, upper])))
+        result[:, i] = partitioned[lower] + (partitioned[upper] - partitioned[lower]) * (positions - lower)
+    return result
+
+class StreamingStats:
+    """Count, mean, variance, min, max and null counts accumulated over chunks."""
+    
+    def __init__(self, sketch_error=None):
+        """
+        Initialize an empty StreamingStats.
+        
+        Args:
+            sketch_error: if set, also keep a KLL quantile sketch per numeric
+                column with this normalized rank error, so quartiles stay
+                available after chunks are merged
+        """
+        self.sketch_error = sketch_error
+        self.sketches = None
+        self.rows = 0
+        self.columns = None
+        self.numeric_columns = None
+        self.nulls = None
+        self.count = None
+        self.mean = None
+        self.m2 = None
+        self.min = None
+        self.max = None
+        # Exact quantiles are only known when the whole column was seen at once
+        self.quantiles = None
+    
+    @classmethod
+    def from_frame(cls, data, sketch_error=None, n_jobs=1):
+        """
+        Summarize an in-memory DataFrame, including exact quartiles.
+        
+        Args:
+            data: pandas DataFrame
+            sketch_error: see __init__()
+            n_jobs: number of threads summarizing column shards in parallel
+        """
+        def summarize(shard):
+            stats = cls(sketch_error=sketch_error)
+            values, present = stats.update(shard)
+            stats.quantiles = exact_quantiles(values, present)
+            return stats
+        
+        return cls.concat(map_column_shards(summarize, data, n_jobs))
+    
+    @classmethod
+    def concat(cls, parts):
+        """
+        Join statistics computed over disjoint column sets of the same rows.
+        
+        Args:
+            parts: list of StreamingStats, in column order
+        """
+        parts = [part for part in parts if part.columns is not None]
+        if len(parts) == 1:
+            return parts[0]
+        stats = cls(sketch_error=parts[0].sketch_error if parts else None)
+        if not parts:
+            return stats
+        if len({part.rows for part in parts}) > 1:
+            raise ValueError("Cannot concatenate statistics over different rows")
+        
+        stats.rows = parts[0].rows
+        stats.columns = [col for part in parts for col in part.columns]
+        stats.numeric_columns = [col for part in parts for col in part.numeric_columns]
+        for name in ['nulls', 'count', 'mean', 'm2', 'min', 'max']:
+            setattr(stats, name, np.concatenate([getattr(part, name) for part in parts]))
+        if all(part.quantiles is not None for part in parts):
+            stats.quantiles = np.concatenate([part.quantiles for part in parts], axis=1)
+        if all(part.sketches is not None for part in parts):
+            stats.sketches = [sketch for part in parts for sketch in part.sketches]
+        return stats
+    
+    @classmethod
+    def from_chunks(cls, chunks, sketch_error=0.01):
+        """
+        Summarize an iterator of DataFrame chunks without holding them all.
+        
+        Args:
+            chunks: iterable of DataFrames, e.g. pd.read_csv(..., chunksize=n)
+            sketch_error: rank error of the quartile sketches, None to skip them
+        """
+        stats = cls(sketch_error=sketch_error)
+        for chunk in chunks:
+            stats.update(chunk)
+        return stats
+    
+    def update(self, chunk):
+        """
+        Fold a DataFrame chunk into the running statistics.
+        
+        Args:
+            chunk: pandas DataFrame with the same columns as earlier chunks
+        
+        Returns:
+            Tuple of (numeric block as a float64 array, its non-missing mask)
+        """
+        numeric = chunk.select_dtypes(include=[np.number])
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.numeric_columns = list(numeric.columns)
+            self.nulls = np.zeros(len(self.columns), dtype=np.int64)
+            if self.sketch_error is not None:
+                self.sketches = [KLLSketch.from_error(self.sketch_error) for _ in self.numeric_columns]
+        elif list(chunk.columns) != self.columns:
+            raise ValueError("Chunk columns do not match earlier chunks")
+        
+        n = len(chunk)
+        values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        
+        # Numeric null counts come from the mask; only other columns are scanned
+        is_numeric = np.isin(np.arange(len(self.columns)), chunk.columns.get_indexer(numeric.columns))
+        nulls = np.zeros(len(self.columns), dtype=np.int64)
+        nulls[is_numeric] = n - count
+        if (~is_numeric).any():
+            nulls[~is_numeric] = chunk.iloc[:, ~is_numeric].isnull().to_numpy().sum(axis=0)
+        self.nulls += nulls
+        self.rows += n
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if (count == n).all():
+                mean = values.sum(axis=0) / count
+                deviations = values - mean
+            else:
+                mean = np.where(present, values, 0.0).sum(axis=0) / count
+                deviations = np.where(present, values - mean, 0.0)
+            m2 = np.einsum('ij,ij->j', deviations, deviations)
+        del deviations
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            minimum = np.nanmin(values, axis=0) if n else np.full(len(count), np.nan)
+            maximum = np.nanmax(values, axis=0) if n else np.full(len(count), np.nan)
+        
+        self._combine(count, np.nan_to_num(mean), m2, minimum, maximum)
+        if self.sketches is not None:
+            for i, sketch in enumerate(self.sketches):
+                sketch.update(values[:, i])
+        self.quantiles = None
+        return values, present
+    
+    def _combine(self, count, mean, m2, minimum, maximum):
+        """Merge another set of per-column moments into this one (Chan et al.)."""
+        if self.count is None:
+            self.count, self.mean, self.m2 = count.astype(np.int64), mean, m2
+            self.min, self.max = minimum, maximum
+            return
+        
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            weight = np.where(total > 0, count / total, 0.0)
+            self.mean = self.mean + delta * weight
+            self.m2 = self.m2 + m2 + delta ** 2 * np.where(total > 0, self.count * weight, 0.0)
+        self.count = total
+        self.min = np.fmin(self.min, minimum)
+        self.max = np.fmax(self.max, maximum)
+    
+    def merge(self, other):
+        """
+        Merge the state of another StreamingStats into this one.
+        
+        Both must have been built from data with the same columns.
+        """
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update({k: (v.copy() if isinstance(v, np.ndarray) else v)
+                                  for k, v in other.__dict__.items()})
+            if other.sketches is not None:
+                self.sketches = [KLLSketch(sketch.k).merge(sketch) for sketch in other.sketches]
+            self.quantiles = None
+            return self
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge statistics over different columns")
+        
+        self.rows += other.rows
+        self.nulls = self.nulls + other.nulls
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        if self.sketches is not None and other.sketches is not None:
+            for sketch, other_sketch in zip(self.sketches, other.sketches):
+                sketch.merge(other_sketch)
+        else:
+            self.sketches = None
+        self.quantiles = None
+        return self
+    
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1) of each numeric column."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(np.where(self.count > 1, self.m2 / (self.count - 1), np.nan))
+    
+    def missing_values(self):
+        """Return null counts per column, like DataFrame.isnull().sum()."""
+        if self.columns is None:
+            return {}
+        return {col: int(n) for col, n in zip(self.columns, self.nulls)}
+    
+    def describe(self):
+        """
+        Return the numeric summary in the layout of DataFrame.describe().to_dict().
+        
+        Exact quantiles cannot be combined, so after chunks are merged the
+        quartiles come from the KLL sketches, or are NaN without sketches.
+        """
+        if not self.numeric_columns:
+            return {}
+        
+        quantiles = self.quantiles
+        if quantiles is None and self.sketches is not None:
+            quantiles = np.column_stack([sketch.quantiles(DESCRIBE_PERCENTILES) for sketch in self.sketches])
+        if quantiles is None:
+            quantiles = np.full((len(DESCRIBE_PERCENTILES), len(self.numeric_columns)), np.nan)
+        
+        std = self.std
+        summary = {}
+        for i, col in enumerate(self.numeric_columns):
+            has_values = self.count[i] > 0
+            summary[col] = {
+                'count': float(self.count[i]),
+                'mean': float(self.mean[i]) if has_values else np.nan,
+                'std': float(std[i]),
+                'min': float(self.min[i]),
+                '25%': float(quantiles[0, i]),
+                '50%': float(quantiles[1, i]),
+                '75%': float(quantiles[2, i]),
+                'max': float(self.max[i])
+            }
+        return summary
@@ -1,5 +1,13 @@
 """Models module for machine learning and prediction."""
 
 from .predictor import Predictor
+from .registry import ModelRegistry, dataset_fingerprint, stored_fingerprint, model_key
+from .scoring import score_chunks, iter_scored_csv, score_to_csv
+from .jobs import JobQueue, JobCancelled
+from .validation import preprocessing_pipeline, fold_splits, cross_validate_folds
+from .search import search_candidates, successive_halving
 
-__all__ = ['Predictor']
+__all__ = ['Predictor', 'ModelRegistry', 'dataset_fingerprint', 'stored_fingerprint', 'model_key',
+           'score_chunks', 'iter_scored_csv', 'score_to_csv', 'JobQueue', 'JobCancelled',
+           'preprocessing_pipeline', 'fold_splits', 'cross_validate_folds',
+           'search_candidates', 'successive_halving']
@@ -0,0 +1,217 @@
+"""
+Local background job queue for model training.
+
+Jobs run in a thread pool of the web worker process, so no external broker
+is needed and requests return as soon as a job is queued. The status of
+every job (state, progress, result or error) is kept in a JSON file, and
+cancellation is requested with a marker file, so any worker process can
+report on or cancel a job that another one runs. The process owning a job
+touches its status file periodically; a queued or running job whose file
+stops being touched belonged to a worker that died, and is reported failed.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ACTIVE_STATES = ('queued', 'running')
+
+class JobCancelled(Exception):
+    """Raised inside a job when its cancellation was requested."""
+
+class JobQueue:
+    """Background jobs run by a bounded thread pool, with status files shared by all workers."""
+    
+    STATUS_SUFFIX = '.json'
+    CANCEL_SUFFIX = '.cancel'
+    
+    def __init__(self, root, max_workers=1, max_pending=8, max_age=24 * 3600, heartbeat_interval=10,
+                 stale_after=120):
+        """
+        Initialize the JobQueue.
+        
+        Args:
+            root: directory holding the status files, shared by all workers
+            max_workers: number of jobs run at the same time by this process
+            max_pending: number of jobs that may wait for a free worker;
+                submitting more raises RuntimeError
+            max_age: seconds the status of a finished job is kept
+            heartbeat_interval: seconds between two touches of the status
+                files of the jobs of this process
+            stale_after: seconds without a touch after which a queued or
+                running job is reported failed
+        """
+        self.root = root
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        os.makedirs(root, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        # Jobs of this process that have not finished, and the job of every dedupe key
+        self._futures = {}
+        self._keys = {}
+        threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True).start()
+    
+    def _path(self, job_id, suffix=STATUS_SUFFIX):
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+            raise ValueError(f"Invalid job id '{job_id}'")
+        return os.path.join(self.root, job_id + suffix)
+    
+    def status(self, job_id):
+        """
+        Return the status dict of a job, or None if it is unknown.
+        
+        A queued or running job whose status file was not touched for
+        stale_after seconds is marked failed, since its worker process died.
+        """
+        try:
+            path = self._path(job_id)
+            with open(path) as f:
+                status = json.load(f)
+            heartbeat = os.path.getmtime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        stale = time.time() - heartbeat > self.stale_after and job_id not in self._futures
+        if status['status'] in ACTIVE_STATES and stale:
+            status.update(status='error', message='Failed', finished=time.time(),
+                          error=f"The worker process {status.get('pid')} running this job stopped")
+            self._write_status(job_id, status)
+        return status
+    
+    def _heartbeat(self):
+        """Touch the status files of the jobs of this process, so others know it is alive."""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                job_ids = list(self._futures)
+            for job_id in job_ids:
+                try:
+                    os.utime(self._path(job_id))
+                except FileNotFoundError:
+                    pass
+    
+    def _write_status(self, job_id, status):
+        path = self._path(job_id)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f, default=str)
+        os.replace(tmp_path, path)
+    
+    def submit(self, func, key=None, **metadata):
+        """
+        Queue a job.
+        
+        Args:
+            func: callable taking a progress(fraction, message=None)
+                callback and returning a JSON-serializable result; the
+                callback raises JobCancelled once cancellation is requested
+            key: optional dedupe key; while a job with the same key is
+                queued or running in this process, its id is returned instead
+            **metadata: JSON-serializable fields stored in the status
+        
+        Returns:
+            The job id
+        """
+        self.prune()
+        with self._lock:
+            if key is not None and self._keys.get(key) in self._futures:
+                return self._keys[key]
+            if len(self._futures) >= self.max_workers + self.max_pending:
+                raise RuntimeError("Too many jobs queued, please try again later")
+            job_id = uuid.uuid4().hex
+            self._write_status(job_id, dict(metadata, id=job_id, status='queued', progress=0.0,
+                                            message='Waiting for a free worker', created=time.time(),
+                                            pid=os.getpid()))
+            self._futures[job_id] = self._executor.submit(self._run, job_id, func)
+            if key is not None:
+                self._keys[key] = job_id
+        return job_id
+    
+    def cancel(self, job_id):
+        """
+        Request the cancellation of a queued or running job, from any process.
+        
+        Returns:
+            False if the job is unknown or already finished
+        """
+        status = self.status(job_id)
+        if status is None or status['status'] not in ACTIVE_STATES:
+            return False
+        with open(self._path(job_id, self.CANCEL_SUFFIX), 'w'):
+            pass
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            self._finish(job_id, dict(status, status='cancelled', message='Cancelled', finished=time.time()))
+        return True
+    
+    def _cancel_requested(self, job_id):
+        return os.path.exists(self._path(job_id, self.CANCEL_SUFFIX))
+    
+    def _run(self, job_id, func):
+        status = self.status(job_id)
+        
+        def progress(fraction, message=None):
+            if self._cancel_requested(job_id):
+                raise JobCancelled()
+            status.update(progress=float(fraction), message=message or status['message'])
+            self._write_status(job_id, status)
+        
+        try:
+            status.update(status='running', started=time.time())
+            progress(0.0, 'Starting')
+            result = func(progress)
+            status.update(status='done', progress=1.0, message='Done', result=result)
+        except JobCancelled:
+            status.update(status='cancelled', message='Cancelled')
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            status.update(status='error', message='Failed', error=str(e))
+        status['finished'] = time.time()
+        self._finish(job_id, status)
+    
+    def _finish(self, job_id, status):
+        # The slot is freed first, so whoever sees the final status can submit again
+        with self._lock:
+            self._futures.pop(job_id, None)
+            for key in [key for key, value in self._keys.items() if value == job_id]:
+                del self._keys[key]
+        self._write_status(job_id, status)
+        try:
+            os.remove(self._path(job_id, self.CANCEL_SUFFIX))
+        except FileNotFoundError:
+            pass
+    
+    def prune(self):
+        """Delete the status files of jobs that finished more than max_age seconds ago."""
+        cutoff = time.time() - self.max_age
+        for name in os.listdir(self.root):
+            if not name.endswith(self.STATUS_SUFFIX):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                with open(path) as f:
+                    finished = json.load(f)['status'] not in ACTIVE_STATES
+            except (FileNotFoundError, ValueError, KeyError):
+                continue
+            if finished:
+                os.remove(path)
+    
+    def stats(self):
+        """Return the number of active jobs of this process and the limits."""
+        with self._lock:
+            active = len(self._futures)
+        return {
+            'active': active,
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending
+        }
@@ -4,11 +4,16 @@ Machine learning models for prediction and classification tasks.
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, classification_report
 from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.base import clone
+from joblib import effective_n_jobs
+from .validation import preprocessing_pipeline, fold_splits, cross_validate_folds
+from .search import search_candidates, successive_halving
+from analysis.parallel import native_thread_limit
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -21,16 +26,39 @@ class Predictor:
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
         self.categorical_encoders = {}
+        # Date columns, fed to the model as days since the epoch
+        self.datetime_columns = []
         self.is_classification = False
         self.feature_columns = None
         self.target_column = None
         self.X_train = None
         self.X_test = None
+        self.X_raw = None
+        self.y_all = None
         self.y_train = None
         self.y_test = None
         self.y_pred = None
+        self.performance = None
+        self.leaderboard = None
+        # Training values that fill missing features, so every batch is filled alike
+        self.fill_values = {}
     
-    def train_model(self, data, feature_columns, target_column, model_type='auto', test_size=0.2):
+    # Training splits are not part of a stored model; the test targets and
+    # predictions are kept for the result plots
+    TRAINING_STATE = ('X_train', 'X_test', 'y_train', 'X_train_scaled', 'X_test_scaled', 'X_raw', 'y_all')
+    
+    def __getstate__(self):
+        """Pickle the fitted model, encoders and scaler without the training splits."""
+        return {name: value for name, value in self.__dict__.items() if name not in self.TRAINING_STATE}
+    
+    def __setstate__(self, state):
+        self.__dict__.update({name: None for name in self.TRAINING_STATE})
+        self.fill_values = {}
+        self.datetime_columns = []
+        self.__dict__.update(state)
+    
+    def train_model(self, data, feature_columns, target_column, model_type='auto', test_size=0.2,
+                    progress=None, n_jobs=1, time_budget=60):
         """
         Train a machine learning model.
         
@@ -38,34 +66,50 @@ class Predictor:
             data: pandas DataFrame
             feature_columns: list of feature column names
             target_column: target column name
-            model_type: 'auto', 'linear', 'random_forest', 'logistic'
+            model_type: 'auto', 'linear', 'random_forest', 'logistic'; 'auto'
+                searches model families and hyperparameters by successive
+                halving and refits the best one on the training split; the
+                search is reported as performance['leaderboard']
             test_size: proportion of data for testing
+            progress: optional callable(fraction, message) reporting progress;
+                random forests are then grown in stages of trees, which
+                gives the same forest
+            n_jobs: threads used to grow random forests or boosted trees,
+                e.g. reserved from a CPUBudget, and by the 'auto' search; the
+                most threads used at once are reported as performance['n_jobs']
+            time_budget: seconds after which the 'auto' search starts no new fit
         """
+        staged = progress is not None
+        progress = progress or (lambda fraction, message=None: None)
+        progress(0.0, 'Preparing data')
         self.feature_columns = feature_columns
         self.target_column = target_column
+        self.leaderboard = None
         
-        # Prepare features and target
-        X = data[feature_columns].copy()
+        # Prepare features and target; the raw features are kept for
+        # cross_validate_pipeline(), which fits the preprocessing per fold
+        self.datetime_columns = data[feature_columns].select_dtypes(include=['datetime', 'datetimetz']).columns.tolist()
+        self.X_raw = self._encode_dates(data[feature_columns])
+        X = self.X_raw.copy()
         y = data[target_column].copy()
         
         # Handle missing values more robustly
         # For numeric columns, use mean
         numeric_columns = X.select_dtypes(include=[np.number]).columns
-        X[numeric_columns] = X[numeric_columns].fillna(X[numeric_columns].mean())
+        self.fill_values = X[numeric_columns].mean().to_dict()
+        X[numeric_columns] = X[numeric_columns].fillna(self.fill_values)
         
         # For categorical columns, use mode
-        categorical_columns = X.select_dtypes(include=['object']).columns
+        categorical_columns = X.select_dtypes(include=['object', 'category']).columns
         for col in categorical_columns:
+            mode_value = X[col].mode()
+            self.fill_values[col] = mode_value[0] if len(mode_value) > 0 else 'Unknown'
             if X[col].isnull().sum() > 0:
-                mode_value = X[col].mode()
-                if len(mode_value) > 0:
-                    X[col] = X[col].fillna(mode_value[0])
-                else:
-                    X[col] = X[col].fillna('Unknown')
+                X[col] = X[col].astype(object).fillna(self.fill_values[col])
         
         # Handle target variable missing values
         if y.isnull().sum() > 0:
-            if y.dtype in ['float64', 'int64']:
+            if pd.api.types.is_numeric_dtype(y):
                 y = y.fillna(y.mean())
             else:
                 mode_value = y.mode()
@@ -75,11 +119,13 @@ class Predictor:
                     y = y.fillna('Unknown')
         
         # Determine if it's a classification problem
-        if y.dtype == 'object' or y.nunique() <= 10:
+        if not pd.api.types.is_numeric_dtype(y) or y.nunique() <= 10:
             self.is_classification = True
-            if y.dtype == 'object':
+            if not pd.api.types.is_numeric_dtype(y):
                 y = self.label_encoder.fit_transform(y.astype(str))
         
+        self.y_all = np.asarray(y)
+        
         # Encode categorical features
         self.categorical_encoders = {}
         for col in categorical_columns:
@@ -98,11 +144,9 @@ class Predictor:
         self.X_test_scaled = self.scaler.transform(self.X_test)
         
         # Choose model
+        search_threads = 0
         if model_type == 'auto':
-            if self.is_classification:
-                self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-            else:
-                self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+            self.model, search_threads = self._search_model(time_budget, n_jobs, progress)
         elif model_type == 'linear':
             self.model = LinearRegression()
         elif model_type == 'random_forest':
@@ -112,21 +156,81 @@ class Predictor:
                 self.model = RandomForestRegressor(n_estimators=100, random_state=42)
         elif model_type == 'logistic':
             self.model = LogisticRegression(random_state=42)
+        forest = isinstance(self.model, (RandomForestRegressor, RandomForestClassifier))
+        linear = isinstance(self.model, (LinearRegression, LogisticRegression))
+        # Forests grow trees in n_jobs threads; other tree models (boosting)
+        # use an OpenMP pool, capped to the same count while they fit
+        fit_threads = 1 if linear else effective_n_jobs(n_jobs)
+        if forest:
+            self.model.set_params(n_jobs=n_jobs)
         
         # Train the model
         print(f"🤖 Training {'classification' if self.is_classification else 'regression'} model...")
         
-        if model_type in ['linear', 'logistic']:
+        fit_start = 0.7 if model_type == 'auto' else 0.1
+        progress(fit_start, 'Training model')
+        
+        if linear:
             self.model.fit(self.X_train_scaled, self.y_train)
             self.y_pred = self.model.predict(self.X_test_scaled)
+        elif staged and forest:
+            self._fit_in_stages(progress, start=fit_start)
+            self.y_pred = self.model.predict(self.X_test)
         else:
-            self.model.fit(self.X_train, self.y_train)
+            with native_thread_limit(fit_threads):
+                self.model.fit(self.X_train, self.y_train)
             self.y_pred = self.model.predict(self.X_test)
         
         # Evaluate model
-        performance = self._evaluate_model()
+        progress(0.9, 'Evaluating model')
+        self.performance = self._evaluate_model()
+        if self.leaderboard is not None:
+            self.performance['selected_model'] = self.leaderboard[0]['name']
+            self.performance['leaderboard'] = self.leaderboard
+        self.performance['n_jobs'] = max(fit_threads, search_threads)
+        if forest:
+            # A stored model predicts with the threads of whoever loads it
+            self.model.set_params(n_jobs=None)
         
-        return performance
+        return self.performance
+    
+    def _encode_dates(self, X):
+        """Replace the date columns of X by days since the epoch, NaN where missing or unparseable."""
+        for col in self.datetime_columns:
+            if col in X.columns:
+                dates = pd.to_datetime(X[col], errors='coerce')
+                if dates.dt.tz is not None:
+                    dates = dates.dt.tz_convert(None)
+                X[col] = (dates - pd.Timestamp(0)) / pd.Timedelta(days=1)
+        return X
+    
+    def _search_model(self, time_budget, n_jobs, progress):
+        """
+        Pick the model for model_type='auto' by successive halving over the training split.
+        
+        Returns:
+            Tuple of (unfitted best estimator, threads the search used at once)
+        """
+        search = successive_halving(
+            search_candidates(self.is_classification), self.X_train, self.y_train,
+            'accuracy' if self.is_classification else 'r2', time_budget=time_budget, n_jobs=n_jobs,
+            progress=lambda fraction, message=None: progress(0.1 + 0.6 * fraction, message)
+        )
+        self.leaderboard = search['leaderboard']
+        best = search['best']
+        print(f"🔎 Searched {len(self.leaderboard)} fits in {search['elapsed']:.1f}s over "
+              f"{search['rounds']} rounds, selected {best['name']} {best['params']}")
+        return clone(best['estimator']), search['n_jobs']
+    
+    def _fit_in_stages(self, progress, stages=10, start=0.1):
+        """Fit a random forest, adding its trees in stages with warm_start and reporting progress."""
+        total = self.model.n_estimators
+        self.model.set_params(warm_start=True)
+        for trees in sorted({max(1, total * stage // stages) for stage in range(1, stages + 1)}):
+            self.model.set_params(n_estimators=trees)
+            self.model.fit(self.X_train, self.y_train)
+            progress(start + (0.9 - start) * trees / total, f'Trained {trees} of {total} trees')
+        self.model.set_params(warm_start=False)
     
     def _evaluate_model(self):
         """Evaluate the trained model."""
@@ -175,17 +279,20 @@ class Predictor:
         if self.model is None:
             raise ValueError("Model not trained yet. Call train_model() first.")
         
-        # Prepare features
-        X_new = new_data[self.feature_columns].copy()
+        # Prepare features; date columns may arrive as text, e.g. from CSV chunks
+        X_new = self._encode_dates(new_data[self.feature_columns].copy())
         
-        # Handle missing values
+        # Handle missing values with the training fill values, falling back
+        # to the batch mean (and 'Unknown') for models trained without them
         numeric_columns = X_new.select_dtypes(include=[np.number]).columns
-        X_new[numeric_columns] = X_new[numeric_columns].fillna(X_new[numeric_columns].mean())
+        fill = X_new[numeric_columns].mean().to_dict()
+        fill.update({col: value for col, value in self.fill_values.items() if col in numeric_columns})
+        X_new[numeric_columns] = X_new[numeric_columns].fillna(fill)
         
-        categorical_columns = X_new.select_dtypes(include=['object']).columns
+        categorical_columns = X_new.select_dtypes(include=['object', 'category']).columns
         for col in categorical_columns:
             if X_new[col].isnull().sum() > 0:
-                X_new[col] = X_new[col].fillna('Unknown')
+                X_new[col] = X_new[col].astype(object).fillna(self.fill_values.get(col, 'Unknown'))
         
         # Apply categorical encoding if available
         if hasattr(self, 'categorical_encoders'):
@@ -234,23 +341,57 @@ class Predictor:
             print("⚠️ Feature importance not available for this model type")
             return None
     
-    def cross_validate(self, cv_folds=5):
-        """Perform cross-validation."""
+    def cross_validate(self, cv_folds=5, n_jobs=1):
+        """
+        Perform cross-validation.
+        
+        Runs cross_validate_pipeline(), so the preprocessing is fit on the
+        training rows of every fold.
+        
+        Args:
+            cv_folds: number of folds
+            n_jobs: number of folds fitted in parallel
+        
+        Returns:
+            numpy array of the per-fold scores
+        """
+        return np.array(self.cross_validate_pipeline(cv_folds, n_jobs=n_jobs)['scores'])
+
+    def cross_validate_pipeline(self, cv_folds=5, n_jobs=1):
+        """
+        Perform leakage-free cross-validation of the trained configuration.
+        
+        The imputation, categorical encoding and (for linear models) scaling
+        of train_model() are fit on the training rows of every fold, the
+        folds are split once and fitted in parallel.
+        
+        Args:
+            cv_folds: number of folds
+            n_jobs: number of folds fitted in parallel, -1 for one per CPU core
+        
+        Returns:
+            Dictionary with the per-fold 'scores', 'fit_times' and
+            'score_times' in seconds, and the 'mean' and 'std' of the scores
+        """
         if self.model is None:
             raise ValueError("Model not trained yet. Call train_model() first.")
+        if self.X_raw is None:
+            raise ValueError("Training data is not kept with a stored model. Call train_model() first.")
         
-        print(f"\n🔄 Performing {cv_folds}-fold cross-validation...")
+        print(f"\n🔄 Performing leakage-free {cv_folds}-fold cross-validation...")
         
-        # Prepare data
-        X = pd.concat([pd.DataFrame(self.X_train), pd.DataFrame(self.X_test)])
-        y = pd.concat([pd.Series(self.y_train), pd.Series(self.y_test)])
+        numeric_columns = self.X_raw.select_dtypes(include=[np.number]).columns
+        pipeline = preprocessing_pipeline(
+            clone(self.model), numeric_columns, list(self.categorical_encoders),
+            scale=isinstance(self.model, (LinearRegression, LogisticRegression))
+        )
+        folds = fold_splits(self.y_all, cv_folds, stratify=self.is_classification)
+        scoring = 'accuracy' if self.is_classification else 'r2'
+        results = cross_validate_folds(pipeline, self.X_raw, self.y_all, folds, scoring, n_jobs=n_jobs)
         
-        # Perform cross-validation
-        if self.is_classification:
-            scores = cross_val_score(self.model, X, y, cv=cv_folds, scoring='accuracy')
-            print(f"✅ Cross-validation Accuracy: {scores.mean():.4f} (+/- {scores.std() * 2:.4f})")
-        else:
-            scores = cross_val_score(self.model, X, y, cv=cv_folds, scoring='r2')
-            print(f"✅ Cross-validation R² Score: {scores.mean():.4f} (+/- {scores.std() * 2:.4f})")
+        label = 'Accuracy' if self.is_classification else 'R² Score'
+        print(f"✅ Cross-validation {label}: {results['mean']:.4f} (+/- {results['std'] * 2:.4f})")
+        print(f"   Fit time per fold: {np.mean(results['fit_times']):.3f}s, "
+              f"score time: {np.mean(results['score_times']):.3f}s")
         
-        return scores
+        return results
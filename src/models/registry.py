@@ -0,0 +1,283 @@
+"""
+On-disk registry of fitted Predictors shared by every worker process.
+
+A fitted Predictor (model, encoders and scaler) is stored with joblib under
+a key derived from the content hash of the training data and the training
+configuration, so resubmitting the same file, features, target and model
+type loads the fitted artifact instead of training again, whichever worker
+trained it. Artifacts are written atomically and evicted least recently
+used first when the registry grows over its disk budget.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+import joblib
+import sklearn
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+ARTIFACT_SUFFIX = '.joblib'
+META_SUFFIX = '.json'
+FINGERPRINT_SUFFIX = '.fingerprint.json'
+
+_fingerprints = {}
+_fingerprint_lock = threading.Lock()
+
+def stored_fingerprint(filepath):
+    """
+    Fingerprint of a file computed earlier by any worker, or None.
+    
+    Only the memo and the sidecar written by dataset_fingerprint() are
+    consulted, so this never reads the file itself and is cheap enough for
+    a request.
+    """
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+    with _fingerprint_lock:
+        if key in _fingerprints:
+            return _fingerprints[key]
+    try:
+        with open(filepath + FINGERPRINT_SUFFIX) as f:
+            stored = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    # The sidecar describes this version of the file only
+    if stored.get('source_mtime_ns') != stat.st_mtime_ns or stored.get('source_size') != stat.st_size:
+        return None
+    with _fingerprint_lock:
+        _fingerprints[key] = stored['fingerprint']
+    return stored['fingerprint']
+
+def dataset_fingerprint(filepath, block_size=4 * 1024 * 1024):
+    """
+    Content hash of a file, memoized per path, mtime and size.
+    
+    Two uploads with the same bytes get the same fingerprint, whatever
+    their names. Hashing reads the whole file, so the result is also stored
+    in a sidecar next to it for every worker process; see
+    stored_fingerprint().
+    """
+    fingerprint = stored_fingerprint(filepath)
+    if fingerprint is not None:
+        return fingerprint
+    
+    stat = os.stat(filepath)
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    fingerprint = digest.hexdigest()
+    
+    path = filepath + FINGERPRINT_SUFFIX
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'fingerprint': fingerprint, 'source_mtime_ns': stat.st_mtime_ns,
+                   'source_size': stat.st_size}, f)
+    os.replace(tmp_path, path)
+    with _fingerprint_lock:
+        _fingerprints[(os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)] = fingerprint
+    return fingerprint
+
+def model_key(fingerprint, config):
+    """
+    Registry key of a model trained on a dataset with a given configuration.
+    
+    Args:
+        fingerprint: content hash of the training data, see dataset_fingerprint()
+        config: JSON-serializable dict of training settings, e.g. features,
+            target and model type; the scikit-learn version is added so
+            artifacts of another version are never loaded
+    """
+    payload = json.dumps({'data': fingerprint, 'config': config, 'sklearn': sklearn.__version__},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+class ModelRegistry:
+    """Fitted models on disk, bounded by a disk budget with LRU eviction."""
+    
+    def __init__(self, root, max_bytes=2 * 1024 * 1024 * 1024):
+        """
+        Initialize the ModelRegistry.
+        
+        Args:
+            root: directory holding the artifacts, shared by all workers
+            max_bytes: disk budget for all artifacts, in bytes
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+    
+    def _path(self, key, suffix=ARTIFACT_SUFFIX):
+        if not re.fullmatch(r'[A-Za-z0-9_-]+', key):
+            raise ValueError(f"Invalid model key '{key}'")
+        return os.path.join(self.root, key + suffix)
+    
+    def get(self, key):
+        """Load the model stored under key, or return None on a miss."""
+        path = self._path(key)
+        try:
+            model = joblib.load(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            print(f"⚠️ Could not load model {key}: {e}")
+            self.remove(key)
+            self.misses += 1
+            return None
+        # The modification time is the recency used for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return model
+    
+    def put(self, key, model, metadata=None):
+        """
+        Store a fitted model under key, then evict old models over budget.
+        
+        Args:
+            key: registry key, see model_key()
+            model: picklable fitted model, e.g. a Predictor
+            metadata: optional JSON-serializable dict stored next to the model
+        """
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            joblib.dump(model, tmp_path)
+            meta = dict(metadata or {}, key=key, created=time.time(), nbytes=os.path.getsize(tmp_path))
+            meta_tmp_path = tmp_path + META_SUFFIX
+            with open(meta_tmp_path, 'w') as f:
+                json.dump(meta, f, default=str)
+            os.replace(meta_tmp_path, self._path(key, META_SUFFIX))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ Could not store model {key}: {e}")
+            for leftover in (tmp_path, tmp_path + META_SUFFIX):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            return
+        self.evict(keep=key)
+    
+    @contextmanager
+    def lock(self, key):
+        """Hold an exclusive lock on key across processes, e.g. while training its model."""
+        if not HAS_FCNTL:
+            yield
+            return
+        with open(self._path(key, '.lock'), 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    
+    def get_or_train(self, key, train, metadata=None):
+        """
+        Return the model stored under key, training and storing it on a miss.
+        
+        Concurrent misses on the same key, in any worker process, wait for a
+        single training run.
+        
+        Args:
+            key: registry key, see model_key()
+            train: callable returning the fitted model
+            metadata: optional dict stored next to a newly trained model
+        
+        Returns:
+            Tuple of (model, whether it was loaded from the registry)
+        """
+        model = self.get(key)
+        if model is not None:
+            return model, True
+        with self.lock(key):
+            # Another worker may have stored it while we waited
+            if os.path.exists(self._path(key)):
+                model = self.get(key)
+                if model is not None:
+                    return model, True
+            model = train()
+            self.put(key, model, metadata)
+        return model, False
+    
+    def remove(self, key):
+        """Delete the model stored under key, if any."""
+        for suffix in (ARTIFACT_SUFFIX, META_SUFFIX):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+    
+    def _artifacts(self):
+        """(mtime, size, key) of every stored model."""
+        artifacts = []
+        for name in os.listdir(self.root):
+            if not name.endswith(ARTIFACT_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            artifacts.append((stat.st_mtime, stat.st_size, name[:-len(ARTIFACT_SUFFIX)]))
+        return artifacts
+    
+    def evict(self, keep=None):
+        """Delete least recently used models until the registry fits its disk budget."""
+        artifacts = sorted(self._artifacts())
+        total = sum(size for _, size, _ in artifacts)
+        for _, size, key in artifacts:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.remove(key)
+            total -= size
+            self.evictions += 1
+            print(f"🗑️ Evicted model {key} from the registry")
+    
+    def metadata(self, key):
+        """Metadata stored with a model, or None if it is not registered."""
+        try:
+            with open(self._path(key, META_SUFFIX)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+    
+    def entries(self):
+        """Metadata of every stored model, most recently used first."""
+        entries = []
+        for mtime, size, key in sorted(self._artifacts(), reverse=True):
+            meta = self.metadata(key) or {'key': key}
+            meta.update(last_used=mtime, nbytes=size)
+            entries.append(meta)
+        return entries
+    
+    def stats(self):
+        """Return hit/miss counters and disk usage."""
+        artifacts = self._artifacts()
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(artifacts),
+            'current_bytes': sum(size for _, size, _ in artifacts),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,99 @@
+"""
+Batch scoring of large datasets with a trained Predictor.
+
+Rows are read in fixed-size chunks and scored by a thread pool, with at
+most one chunk per worker in flight, so memory stays bounded by a few
+chunks whatever the size of the input. Scored chunks are emitted in input
+order as CSV text, to stream as a download or to write to a file.
+"""
+
+import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis.parallel import resolve_workers
+
+def score_chunks(predictor, chunks, n_jobs=1):
+    """
+    Score DataFrame chunks, several at a time, in input order.
+    
+    Args:
+        predictor: trained Predictor
+        chunks: iterable of DataFrames holding the feature columns
+        n_jobs: number of chunks scored in parallel, -1 for one per CPU core
+    
+    Yields:
+        Tuple of (chunk, predictions) per chunk
+    """
+    workers = resolve_workers(n_jobs)
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, predictor.predict(chunk)
+        return
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='score') as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(predictor.predict, chunk)))
+            # Read ahead no further than the workers can score
+            if len(pending) >= workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+def iter_scored_csv(predictor, chunks, n_jobs=1, columns=None, prediction_column=None):
+    """
+    Yield the scored rows as CSV text, one piece per chunk, header first.
+    
+    Args:
+        predictor: trained Predictor
+        chunks: iterable of DataFrames holding at least the feature columns
+        n_jobs: number of chunks scored in parallel
+        columns: input columns copied to the output, all by default
+        prediction_column: name of the prediction column,
+            'predicted_<target>' by default
+    """
+    prediction_column = prediction_column or f'predicted_{predictor.target_column}'
+    header = True
+    for chunk, predictions in score_chunks(predictor, chunks, n_jobs):
+        scored = chunk if columns is None else chunk[list(columns)]
+        scored = scored.assign(**{prediction_column: predictions})
+        text = io.StringIO()
+        scored.to_csv(text, index=False, header=header)
+        header = False
+        yield text.getvalue()
+
+def score_to_csv(predictor, chunks, destination, **kwargs):
+    """
+    Write the scored rows to a CSV file, atomically.
+    
+    Args:
+        predictor: trained Predictor
+        chunks: iterable of DataFrames holding at least the feature columns
+        destination: path of the output file
+        **kwargs: passed to iter_scored_csv()
+    
+    Returns:
+        Number of rows scored
+    """
+    rows = 0
+    
+    def counted():
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+    
+    tmp_path = f'{destination}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'w', newline='') as f:
+            for text in iter_scored_csv(predictor, counted(), **kwargs):
+                f.write(text)
+        os.replace(tmp_path, destination)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
@@ -0,0 +1,206 @@
+"""
+Automatic model selection by successive halving under a time budget.
+
+Candidate configurations of several model families are first fitted on a
+small subsample of the training rows and scored on a fixed validation set;
+only the best 1/eta of them are refitted on eta times as many rows, round
+after round, until one is left to be fitted on all rows. Most candidates
+are discarded after fits that cost a fraction of a full fit, so many more
+configurations are tried than a single fixed model fitted on all rows in
+the same time. The candidates of a round are fitted in parallel by a thread
+pool, and no fit starts once the time budget is spent. The threads of the
+search are split between the pool and the native (OpenMP/BLAS) pools of the
+fits, so the search uses no more than n_jobs threads at once.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import (RandomForestClassifier, RandomForestRegressor,
+                              HistGradientBoostingClassifier, HistGradientBoostingRegressor)
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from analysis.parallel import resolve_workers, native_thread_limit
+
+# Model families searched: (family, estimator class, fixed parameters,
+# sampled parameters, whether features are scaled as for linear models)
+SEARCH_SPACE = {
+    'classification': [
+        ('logistic', LogisticRegression, {'max_iter': 1000, 'random_state': 42},
+         {'C': [0.01, 0.1, 1.0, 10.0]}, True),
+        ('random_forest', RandomForestClassifier, {'random_state': 42},
+         {'n_estimators': [50, 100, 200], 'max_depth': [None, 8, 16],
+          'min_samples_leaf': [1, 5, 20], 'max_features': ['sqrt', 0.5, 1.0]}, False),
+        ('gradient_boosting', HistGradientBoostingClassifier, {'random_state': 42},
+         {'learning_rate': [0.03, 0.1, 0.3], 'max_leaf_nodes': [15, 31, 63],
+          'min_samples_leaf': [5, 20, 50], 'l2_regularization': [0.0, 1.0]}, False)
+    ],
+    'regression': [
+        ('linear', LinearRegression, {}, {}, True),
+        ('random_forest', RandomForestRegressor, {'random_state': 42},
+         {'n_estimators': [50, 100, 200], 'max_depth': [None, 8, 16],
+          'min_samples_leaf': [1, 5, 20], 'max_features': [0.33, 0.5, 1.0]}, False),
+        ('gradient_boosting', HistGradientBoostingRegressor, {'random_state': 42},
+         {'learning_rate': [0.03, 0.1, 0.3], 'max_leaf_nodes': [15, 31, 63],
+          'min_samples_leaf': [5, 20, 50], 'l2_regularization': [0.0, 1.0]}, False)
+    ]
+}
+
+def search_candidates(is_classification, n_candidates=27, random_state=42):
+    """
+    Sample candidate configurations, spread evenly over the model families.
+    
+    Args:
+        is_classification: whether to search classifiers or regressors
+        n_candidates: number of candidates to sample; families with fewer
+            configurations contribute all of them
+        random_state: seed of the sampling
+    
+    Returns:
+        List of candidate dicts with 'name', 'family', 'params', the
+        unfitted 'estimator' and whether its features are scaled ('scale')
+    """
+    families = SEARCH_SPACE['classification' if is_classification else 'regression']
+    per_family = math.ceil(n_candidates / len(families))
+    sampled = []
+    for family, estimator_class, fixed, grid, scale in families:
+        n_iter = min(per_family, len(ParameterGrid(grid)))
+        sampled.append([(family, estimator_class(**fixed, **params), params, scale)
+                        for params in ParameterSampler(grid, n_iter=n_iter, random_state=random_state)])
+    
+    # Families take turns, so every family is tried if the budget runs out early
+    candidates = []
+    for turn in range(per_family):
+        for family, estimator, params, scale in (configs[turn] for configs in sampled if turn < len(configs)):
+            candidates.append({
+                'name': f'{family} #{len(candidates) + 1}',
+                'family': family,
+                'params': params,
+                'estimator': estimator,
+                'scale': scale
+            })
+    return candidates
+
+def successive_halving(candidates, X, y, scoring, time_budget=60, eta=3, min_rows=100,
+                       validation_size=0.2, max_validation_rows=50_000, n_jobs=1,
+                       random_state=42, progress=None):
+    """
+    Pick the best candidate by successive halving on row subsamples.
+    
+    Args:
+        candidates: list of candidate dicts, see search_candidates()
+        X: pandas DataFrame of preprocessed training features
+        y: training target values
+        scoring: scikit-learn scorer name, e.g. 'accuracy' or 'r2'
+        time_budget: seconds after which no fit starts, None for no limit;
+            fits already running are finished, and fits start until one
+            candidate is scored
+        eta: fraction of candidates dropped per round is 1 - 1/eta, and
+            the rows of every round are eta times those of the previous one
+        min_rows: rows fitted in the first round, at least; the last
+            round fits 1/eta of the rows, as the winner is refitted on all
+        validation_size: fraction of the rows held out to score candidates
+        max_validation_rows: cap on the held-out rows
+        n_jobs: threads of the search, -1 for one per CPU core; they fit
+            candidates in parallel, and threads left over when there are
+            fewer candidates go to the native pool of every fit
+        random_state: seed of the validation split and of the subsamples
+        progress: optional callable(fraction, message) called as fits finish
+    
+    Returns:
+        Dictionary with the 'best' candidate, the 'leaderboard' (one entry
+        per fit, best first: name, family, params, round, rows, score,
+        fit_time, and error for failed fits), the 'rounds' run, the
+        'elapsed' seconds and the threads used at once as 'n_jobs'
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget else math.inf
+    scorer = get_scorer(scoring)
+    y = np.asarray(y)
+    
+    # Rows are shuffled once: the validation rows come first, and every
+    # round fits a longer prefix of the remaining rows
+    order = np.random.default_rng(random_state).permutation(len(y))
+    n_validation = max(1, min(int(len(y) * validation_size), max_validation_rows))
+    validation, fit_rows = order[:n_validation], order[n_validation:]
+    X_validation, y_validation = X.iloc[validation], y[validation]
+    
+    rounds = max(1, math.ceil(math.log(len(candidates), eta)))
+    total_fits = sum(math.ceil(len(candidates) / eta ** k) for k in range(rounds))
+    threads = resolve_workers(n_jobs)
+    workers = min(threads, len(candidates))
+    threads_per_fit = max(1, threads // workers)
+    stop = threading.Event()
+    # Fits keep starting past the deadline until one candidate has a score
+    scored_any = threading.Event()
+    
+    def fit_candidate(candidate, round_index, rows):
+        if stop.is_set() or (scored_any.is_set() and time.perf_counter() >= deadline):
+            return None
+        entry = {'name': candidate['name'], 'family': candidate['family'], 'params': candidate['params'],
+                 'round': round_index, 'rows': int(rows), 'score': None}
+        model = clone(candidate['estimator'])
+        if candidate['scale']:
+            model = make_pipeline(StandardScaler(), model)
+        fit_start = time.perf_counter()
+        try:
+            model.fit(X.iloc[fit_rows[:rows]], y[fit_rows[:rows]])
+            entry['score'] = float(scorer(model, X_validation, y_validation))
+            scored_any.set()
+        except Exception as e:
+            # e.g. a subsample holding a single class
+            entry['error'] = str(e)
+        entry['fit_time'] = time.perf_counter() - fit_start
+        return entry
+    
+    leaderboard = []
+    survivors = list(candidates)
+    round_index = 0
+    with native_thread_limit(threads_per_fit), \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search') as pool:
+        try:
+            for round_index in range(rounds):
+                rows = min(len(fit_rows), max(min_rows, len(fit_rows) // eta ** (rounds - round_index)))
+                futures = {pool.submit(fit_candidate, candidate, round_index, rows): candidate
+                           for candidate in survivors}
+                scored = []
+                for future in as_completed(futures):
+                    entry = future.result()
+                    if entry is None:
+                        continue
+                    leaderboard.append(entry)
+                    if entry['score'] is not None:
+                        scored.append((entry['score'], futures[future]))
+                    if progress is not None:
+                        progress(min(1.0, len(leaderboard) / total_fits),
+                                 f"Round {round_index + 1} of {rounds}: {entry['name']} on {rows} rows")
+                if not scored or time.perf_counter() >= deadline:
+                    break
+                scored.sort(key=lambda item: item[0], reverse=True)
+                survivors = [candidate for _, candidate in scored[:max(1, len(scored) // eta)]]
+        finally:
+            # Queued fits are skipped when the search stops early
+            stop.set()
+    
+    # Fits that failed rank last; the best candidate scored highest on the most rows
+    leaderboard.sort(key=lambda entry: (entry['score'] is not None, entry['rows'], entry['score'] or 0.0),
+                     reverse=True)
+    if not leaderboard or leaderboard[0]['score'] is None:
+        raise ValueError("No candidate model could be fitted")
+    best = next(candidate for candidate in candidates if candidate['name'] == leaderboard[0]['name'])
+    
+    return {
+        'best': best,
+        'leaderboard': leaderboard,
+        'rounds': round_index + 1,
+        'elapsed': time.perf_counter() - start,
+        'n_jobs': workers * threads_per_fit
+    }
@@ -0,0 +1,121 @@
+"""
+Leakage-free cross-validation of a Predictor configuration.
+
+The preprocessing of Predictor.train_model (mean/mode imputation, ordinal
+encoding of categorical columns and, for linear models, scaling) is rebuilt
+as a scikit-learn Pipeline, so every fold fits it on its training rows only.
+Folds are split once, then fitted and scored by a thread pool; the model
+fits and NumPy work release the GIL, and threads share the data without
+copying it.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+from analysis.parallel import resolve_workers
+
+def preprocessing_pipeline(estimator, numeric_columns, categorical_columns, scale=False):
+    """
+    Build the preprocessing of Predictor.train_model followed by an estimator.
+    
+    Args:
+        estimator: unfitted scikit-learn estimator
+        numeric_columns: columns imputed with their mean
+        categorical_columns: columns imputed with their mode and ordinal
+            encoded; categories unseen in training are encoded as -1
+        scale: standardize every feature, as for linear models;
+            other columns are passed through unchanged
+    
+    Returns:
+        Unfitted sklearn Pipeline taking the raw feature DataFrame
+    """
+    categorical = Pipeline([
+        ('impute', SimpleImputer(strategy='most_frequent')),
+        ('encode', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1))
+    ])
+    steps = [('prepare', ColumnTransformer([
+        ('numeric', SimpleImputer(strategy='mean'), list(numeric_columns)),
+        ('categorical', categorical, list(categorical_columns))
+    ], remainder='passthrough', verbose_feature_names_out=False))]
+    if scale:
+        steps.append(('scale', StandardScaler()))
+    steps.append(('model', estimator))
+    return Pipeline(steps)
+
+def fold_splits(y, cv_folds=5, stratify=False, random_state=42):
+    """
+    Split row positions into shuffled folds, once for every fitted configuration.
+    
+    Args:
+        y: target values
+        cv_folds: number of folds
+        stratify: keep the class proportions in every fold, when every
+            class has at least cv_folds rows
+        random_state: seed of the shuffle
+    
+    Returns:
+        List of (train_positions, test_positions) arrays
+    """
+    y = np.asarray(y)
+    if stratify and np.unique(y, return_counts=True)[1].min() >= cv_folds:
+        splitter = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+    else:
+        splitter = KFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+    return list(splitter.split(np.zeros(len(y)), y))
+
+def cross_validate_folds(pipeline, X, y, folds, scoring, n_jobs=1):
+    """
+    Fit and score a clone of the pipeline on every fold.
+    
+    Args:
+        pipeline: unfitted estimator or Pipeline taking X
+        X: pandas DataFrame of raw features
+        y: target values, aligned with the rows of X
+        folds: list of (train_positions, test_positions), see fold_splits()
+        scoring: scikit-learn scorer name, e.g. 'accuracy' or 'r2'
+        n_jobs: number of folds fitted in parallel, -1 for one per CPU core
+    
+    Returns:
+        Dictionary with the per-fold 'scores', 'fit_times' and 'score_times'
+        (seconds), their 'mean' and 'std', the 'scoring' name and the
+        number of folds fitted at once as 'n_jobs'
+    """
+    scorer = get_scorer(scoring)
+    y = np.asarray(y)
+    
+    def run_fold(fold):
+        train, test = fold
+        model = clone(pipeline)
+        start = time.perf_counter()
+        model.fit(X.iloc[train], y[train])
+        fitted = time.perf_counter()
+        score = scorer(model, X.iloc[test], y[test])
+        return float(score), fitted - start, time.perf_counter() - fitted
+    
+    workers = min(resolve_workers(n_jobs), len(folds))
+    if workers <= 1:
+        results = [run_fold(fold) for fold in folds]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cv') as pool:
+            results = list(pool.map(run_fold, folds))
+    
+    scores, fit_times, score_times = (list(values) for values in zip(*results))
+    return {
+        'scoring': scoring,
+        'scores': scores,
+        'fit_times': fit_times,
+        'score_times': score_times,
+        'mean': float(np.mean(scores)),
+        'std': float(np.std(scores)),
+        'n_jobs': workers
+    }
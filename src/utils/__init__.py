@@ -8,6 +8,18 @@ from .data_generator import (
     create_time_features,
     split_data_by_time
 )
+from .data_loader import (
+    read_dataset,
+    ingest_upload,
+    convert_to_columnar,
+    dataset_columns,
+    iter_dataset_chunks,
+    dataframe_nbytes
+)
+from .dataset_cache import DatasetCache
+from .column_store import ColumnStore
+from .dtype_optimizer import optimize_dtypes
+from .cpu_budget import CPUBudget
 
 __all__ = [
     'generate_sample_data',
@@ -15,5 +27,15 @@ __all__ = [
     'encode_categorical_variables',
     'detect_and_handle_outliers',
     'create_time_features',
-    'split_data_by_time'
+    'split_data_by_time',
+    'read_dataset',
+    'ingest_upload',
+    'convert_to_columnar',
+    'dataset_columns',
+    'iter_dataset_chunks',
+    'dataframe_nbytes',
+    'DatasetCache',
+    'ColumnStore',
+    'optimize_dtypes',
+    'CPUBudget'
 ]
@@ -0,0 +1,222 @@
+"""
+Memory-mapped column files for out-of-core analysis.
+
+Every column of an upload is written once to a flat binary file in a sidecar
+directory: numeric columns as float64, text and categorical columns as int32
+codes into a list of categories, datetimes as datetime64[ns]. The files are
+opened with np.memmap in read-only mode, so rows are paged in on demand and
+every worker process analyzing the same upload shares the pages through the
+OS page cache instead of holding its own copy of the data.
+"""
+
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from .data_loader import iter_dataset_chunks
+
+STORE_SUFFIX = '.columns'
+
+KIND_DTYPES = {
+    'numeric': np.float64,
+    'categorical': np.int32,
+    'datetime': 'datetime64[ns]'
+}
+
+def column_kind(values):
+    """Return the storage kind of a pandas Series: numeric, categorical or datetime."""
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return 'datetime'
+    return 'categorical'
+
+class ColumnStore:
+    """Read-only, memory-mapped columns of a dataset."""
+    
+    META_FILE = 'meta.json'
+    
+    def __init__(self, path, rows, columns, kinds, source=None):
+        """
+        Initialize the ColumnStore.
+        
+        Args:
+            path: directory holding the column files
+            rows: number of rows
+            columns: list of column names, in dataset order
+            kinds: dict of column name to storage kind
+            source: modification time and size of the upload it was built from
+        """
+        self.path = path
+        self.rows = rows
+        self.columns = columns
+        self.kinds = kinds
+        self.source = source
+        self._maps = {}
+        self._categories = {}
+    
+    @staticmethod
+    def store_path(filepath):
+        """Return the directory of the column files of an upload."""
+        return filepath + STORE_SUFFIX
+    
+    @staticmethod
+    def _source_signature(filepath):
+        stat = os.stat(filepath)
+        return [stat.st_mtime_ns, stat.st_size]
+    
+    def _file(self, column, suffix='.bin'):
+        return os.path.join(self.path, f'{self.columns.index(column)}{suffix}')
+    
+    @classmethod
+    def build(cls, filepath, chunks=None, chunk_size=100_000):
+        """
+        Write the column files of an upload in one pass over its chunks.
+        
+        The kind of every column is taken from the first chunk; if a later
+        chunk does not fit it (e.g. text in a numeric column) the partial
+        files are removed and None is returned.
+        
+        Args:
+            filepath: path of the upload
+            chunks: iterable of DataFrames, read from filepath if None
+            chunk_size: rows per chunk when reading filepath
+        
+        Returns:
+            The opened ColumnStore, or None if it could not be written
+        """
+        path = cls.store_path(filepath)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        if chunks is None:
+            chunks = iter_dataset_chunks(filepath, chunk_size=chunk_size)
+        
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        store = None
+        files = []
+        try:
+            for chunk in chunks:
+                if store is None:
+                    columns = [str(col) for col in chunk.columns]
+                    kinds = {col: column_kind(chunk[orig]) for col, orig in zip(columns, chunk.columns)}
+                    store = cls(tmp_path, 0, columns, kinds, source=cls._source_signature(filepath))
+                    lookups = {col: {} for col in columns if kinds[col] == 'categorical'}
+                    files = [open(store._file(col), 'wb') for col in columns]
+                for col, orig, f in zip(store.columns, chunk.columns, files):
+                    store._encode(chunk[orig], store.kinds[col], lookups.get(col)).tofile(f)
+                store.rows += len(chunk)
+            for f in files:
+                f.close()
+            if store is None:
+                shutil.rmtree(tmp_path)
+                return None
+            
+            for col, lookup in lookups.items():
+                with open(store._file(col, '.categories.json'), 'w') as f:
+                    json.dump(list(lookup), f)
+            with open(os.path.join(tmp_path, cls.META_FILE), 'w') as f:
+                json.dump({'rows': store.rows, 'columns': store.columns, 'kinds': store.kinds,
+                           'source': store.source}, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ Could not write column files of {filepath}: {e}")
+            for f in files:
+                f.close()
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return None
+        return cls.open(filepath)
+    
+    @staticmethod
+    def _encode(values, kind, lookup=None):
+        """Convert a chunk of a column to its stored representation."""
+        if kind == 'numeric':
+            return pd.to_numeric(values).to_numpy(dtype=np.float64, na_value=np.nan)
+        if kind == 'datetime':
+            values = pd.to_datetime(values)
+            if isinstance(values.dtype, pd.DatetimeTZDtype):
+                values = values.dt.tz_convert(None)
+            return values.to_numpy(dtype='datetime64[ns]')
+        
+        # Codes are assigned in order of first appearance across chunks,
+        # so only the distinct values of a chunk are looked up
+        local_codes, uniques = pd.factorize(values)
+        mapping = np.array([lookup.setdefault(str(value), len(lookup)) for value in uniques] + [-1],
+                           dtype=np.int32)
+        return mapping[local_codes]
+    
+    @classmethod
+    def open(cls, filepath):
+        """Open the column files of an upload, or return None if they are missing or stale."""
+        path = cls.store_path(filepath)
+        meta_path = os.path.join(path, cls.META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta['source'] != cls._source_signature(filepath):
+            return None
+        return cls(path, meta['rows'], meta['columns'], meta['kinds'], source=meta['source'])
+    
+    @classmethod
+    def open_or_build(cls, filepath):
+        """Open the column files of an upload, writing them first if needed."""
+        store = cls.open(filepath)
+        if store is None:
+            print(f"🗄️ Writing memory-mapped columns of {os.path.basename(filepath)}")
+            store = cls.build(filepath)
+        return store
+    
+    def columns_of_kind(self, kind):
+        """Names of the columns stored as the given kind."""
+        return [col for col in self.columns if self.kinds[col] == kind]
+    
+    def column(self, name):
+        """Memory-mapped array of a column: float64, int32 codes or datetime64[ns]."""
+        if name not in self._maps:
+            dtype = KIND_DTYPES[self.kinds[name]]
+            if self.rows == 0:
+                self._maps[name] = np.empty(0, dtype=dtype)
+            else:
+                self._maps[name] = np.memmap(self._file(name), dtype=dtype, mode='r', shape=(self.rows,))
+        return self._maps[name]
+    
+    def categories(self, name):
+        """Category values of a categorical column, indexed by code."""
+        if name not in self._categories:
+            with open(self._file(name, '.categories.json')) as f:
+                self._categories[name] = pd.Index(json.load(f), dtype=object)
+        return self._categories[name]
+    
+    def chunk(self, start, stop, columns=None, codes=False):
+        """
+        Rows start:stop as a DataFrame.
+        
+        Args:
+            start: first row
+            stop: row after the last one
+            columns: optional list of columns, all by default
+            codes: return categorical columns as their int32 codes (-1 for
+                missing) instead of pandas categoricals, which is enough to
+                compare or hash rows
+        """
+        frame = {}
+        for col in columns if columns is not None else self.columns:
+            values = self.column(col)[start:stop]
+            if self.kinds[col] == 'categorical' and not codes:
+                values = pd.Categorical.from_codes(values, categories=self.categories(col), validate=False)
+            frame[col] = values
+        return pd.DataFrame(frame, index=pd.RangeIndex(start, start + len(next(iter(frame.values()), []))))
+    
+    def take(self, rows, columns=None):
+        """Rows at the given positions, as a DataFrame indexed by position."""
+        rows = np.asarray(rows, dtype=np.int64)
+        frame = {}
+        for col in columns if columns is not None else self.columns:
+            values = self.column(col)[rows]
+            if self.kinds[col] == 'categorical':
+                values = pd.Categorical.from_codes(values, categories=self.categories(col), validate=False)
+            frame[col] = values
+        return pd.DataFrame(frame, index=rows)
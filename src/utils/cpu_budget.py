@@ -0,0 +1,104 @@
+"""
+Process-wide CPU budget for parallel work.
+
+Every web worker process gets an equal share of the host's cores, from the
+number of gunicorn workers (WEB_CONCURRENCY), and every task of a process
+(a request, a training job) reserves threads from that share while it
+runs. Concurrent tasks therefore split the cores instead of each starting
+one thread per core, and BLAS/OpenMP thread pools are capped to the share
+of the process.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    from threadpoolctl import threadpool_limits
+    HAS_THREADPOOLCTL = True
+except ImportError:
+    HAS_THREADPOOLCTL = False
+
+def available_cores():
+    """Number of cores this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def web_concurrency():
+    """Number of web worker processes sharing the host, as gunicorn reads it."""
+    try:
+        return max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    except ValueError:
+        return 1
+
+class CPUBudget:
+    """Threads of one process, reserved by its concurrent tasks."""
+    
+    def __init__(self, threads=None, cores=None, processes=None):
+        """
+        Initialize the CPUBudget.
+        
+        Args:
+            threads: threads of this process; by default its share of the
+                cores, cores // processes
+            cores: cores of the host, detected by default
+            processes: worker processes sharing the cores, WEB_CONCURRENCY by default
+        """
+        self.cores = cores or available_cores()
+        self.processes = processes or web_concurrency()
+        self.threads = max(1, threads or self.cores // self.processes)
+        self.in_use = 0
+        self._lock = threading.Lock()
+    
+    def limit_native_threads(self):
+        """Cap the BLAS and OpenMP thread pools of this process to its share."""
+        if HAS_THREADPOOLCTL:
+            threadpool_limits(limits=self.threads)
+    
+    def reserve(self, requested=-1):
+        """
+        Reserve threads for a task; release them with release() when it ends.
+        
+        A task always gets at least one thread, so it never waits; tasks
+        started while the share is in use run single-threaded.
+        
+        Args:
+            requested: thread count asked for, None or -1 for every free thread
+        
+        Returns:
+            The number of threads granted
+        """
+        with self._lock:
+            free = max(1, self.threads - self.in_use)
+            if requested is None or requested < 0:
+                granted = free
+            else:
+                granted = max(1, min(int(requested), free))
+            self.in_use += granted
+        return granted
+    
+    @contextmanager
+    def reserved(self, requested=-1):
+        """Reserve threads for the duration of a with block, yielding the count granted."""
+        threads = self.reserve(requested)
+        try:
+            yield threads
+        finally:
+            self.release(threads)
+    
+    def release(self, threads):
+        """Return threads granted by reserve()."""
+        with self._lock:
+            self.in_use = max(0, self.in_use - threads)
+    
+    def stats(self):
+        """Return the core count, the share of this process and the threads in use."""
+        with self._lock:
+            return {
+                'cores': self.cores,
+                'processes': self.processes,
+                'threads': self.threads,
+                'in_use': self.in_use
+            }
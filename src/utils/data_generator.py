@@ -92,7 +92,7 @@ def clean_data(data, strategy='mean'):
         cleaned_data = cleaned_data.dropna()
     
     # Fill categorical missing values with mode
-    categorical_columns = cleaned_data.select_dtypes(include=['object']).columns
+    categorical_columns = cleaned_data.select_dtypes(include=['object', 'category']).columns
     for col in categorical_columns:
         if cleaned_data[col].isnull().sum() > 0:
             cleaned_data[col] = cleaned_data[col].fillna(cleaned_data[col].mode()[0])
@@ -111,7 +111,7 @@ def encode_categorical_variables(data, columns=None, method='label'):
     encoded_data = data.copy()
     
     if columns is None:
-        columns = data.select_dtypes(include=['object']).columns
+        columns = data.select_dtypes(include=['object', 'category']).columns
     
     if method == 'label':
         from sklearn.preprocessing import LabelEncoder
@@ -125,7 +125,8 @@ def encode_categorical_variables(data, columns=None, method='label'):
     
     return encoded_data
 
-def detect_and_handle_outliers(data, columns=None, method='iqr', action='cap'):
+def detect_and_handle_outliers(data, columns=None, method='iqr', action='cap',
+                               approximate=False, error=0.01, sketches=None):
     """
     Detect and handle outliers.
     
@@ -134,6 +135,9 @@ def detect_and_handle_outliers(data, columns=None, method='iqr', action='cap'):
         columns: list of columns to check (if None, check all numeric)
         method: 'iqr' or 'zscore'
         action: 'cap', 'remove', or 'flag'
+        approximate: take Q1/Q3 from KLL quantile sketches (IQR method only)
+        error: normalized rank error allowed in approximate mode
+        sketches: optional dict of column name to prebuilt KLLSketch
     """
     processed_data = data.copy()
     
@@ -144,8 +148,16 @@ def detect_and_handle_outliers(data, columns=None, method='iqr', action='cap'):
     
     for col in columns:
         if method == 'iqr':
-            Q1 = data[col].quantile(0.25)
-            Q3 = data[col].quantile(0.75)
+            if approximate:
+                from analysis.sketches import KLLSketch
+                sketch = (sketches or {}).get(col)
+                if sketch is None:
+                    sketch = KLLSketch.from_error(error).update(
+                        data[col].to_numpy(dtype=np.float64, na_value=np.nan))
+                Q1, Q3 = sketch.quantiles([0.25, 0.75])
+            else:
+                Q1 = data[col].quantile(0.25)
+                Q3 = data[col].quantile(0.75)
             IQR = Q3 - Q1
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
@@ -0,0 +1,202 @@
+"""
+Loading helpers for uploaded datasets.
+
+Uploads are parsed once at ingest and written next to the original as an
+uncompressed Arrow IPC (Feather v2) file. Later loads memory-map that file
+and only materialize the requested columns instead of re-tokenizing the
+CSV/Excel text.
+"""
+
+import os
+import pandas as pd
+
+from .dtype_optimizer import optimize_dtypes
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+COLUMNAR_SUFFIX = '.arrow'
+
+def columnar_path(filepath):
+    """Return the path of the columnar copy of an upload."""
+    return filepath + COLUMNAR_SUFFIX
+
+def has_columnar(filepath):
+    """Check whether an up-to-date columnar copy of filepath exists."""
+    if not HAS_PYARROW:
+        return False
+    path = columnar_path(filepath)
+    return (os.path.exists(path) and
+            os.path.getmtime(path) >= os.path.getmtime(filepath))
+
+def parse_raw(filepath, columns=None):
+    """
+    Parse the original CSV or Excel file.
+    
+    Of a workbook, the sheet picked for its conversion is parsed, also
+    while the conversion is running or after it failed; the first sheet if
+    none was picked.
+    
+    Args:
+        filepath: path to a .csv, .xlsx or .xls file
+        columns: optional list of columns to keep
+    """
+    if filepath.endswith('.csv'):
+        return pd.read_csv(filepath, usecols=columns)
+    from .excel_converter import ExcelConverter
+    
+    status = ExcelConverter.status(filepath)
+    sheet = status['sheet'] if status is not None else 0
+    return pd.read_excel(filepath, sheet_name=sheet, usecols=columns)
+
+def convert_to_columnar(filepath, data=None):
+    """
+    Write the columnar copy of an upload.
+    
+    Args:
+        filepath: path of the original upload
+        data: already parsed DataFrame, parsed from filepath if None
+    
+    Returns:
+        Path of the columnar file, or None if it could not be written
+    """
+    if not HAS_PYARROW:
+        return None
+    if data is None:
+        data = parse_raw(filepath)
+    
+    path = columnar_path(filepath)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        # Uncompressed so the file can be memory-mapped without decoding
+        feather.write_feather(data.reset_index(drop=True), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ Could not write columnar copy of {filepath}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    return path
+
+def convert_csv_to_columnar_chunked(filepath, chunksize=100_000):
+    """
+    Write the columnar copy of a CSV without loading it into memory.
+    
+    The Arrow schema is taken from the first chunk; if a later chunk does
+    not fit that schema the partial file is removed and None is returned.
+    
+    Args:
+        filepath: path of the original CSV upload
+        chunksize: number of rows parsed per chunk
+    """
+    if not HAS_PYARROW:
+        return None
+    
+    path = columnar_path(filepath)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    writer = None
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            for chunk in pd.read_csv(filepath, chunksize=chunksize):
+                if writer is None:
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    writer = pa.ipc.new_file(sink, schema)
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                writer.write_table(table)
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ Could not write columnar copy of {filepath}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    return path
+
+def ingest_upload(filepath, optimize=True):
+    """
+    Parse a freshly uploaded file and write its columnar copy, row index
+    and quantile sketches.
+    
+    Args:
+        filepath: path of the original upload
+        optimize: store compact dtypes (see optimize_dtypes) in the columnar copy
+    """
+    from .row_index import RowIndex
+    from analysis.sketches import build_quantile_sketches, save_quantile_sketches
+    
+    data = parse_raw(filepath)
+    if optimize:
+        data, _ = optimize_dtypes(data)
+    convert_to_columnar(filepath, data)
+    RowIndex.build(filepath, data=data).save()
+    save_quantile_sketches(filepath, build_quantile_sketches(data))
+    return data
+
+def dataset_columns(filepath):
+    """Return the column names of a dataset without loading its rows."""
+    if has_columnar(filepath):
+        return list(feather.read_table(columnar_path(filepath), memory_map=True).column_names)
+    if filepath.endswith('.csv'):
+        return pd.read_csv(filepath, nrows=0).columns.tolist()
+    return pd.read_excel(filepath, nrows=0).columns.tolist()
+
+def read_dataset(filepath, columns=None, optimize=True):
+    """
+    Load a dataset, preferring its memory-mapped columnar copy.
+    
+    Args:
+        filepath: path to a .csv, .xlsx or .xls file
+        columns: optional list of columns to load
+        optimize: convert columns to compact dtypes (see optimize_dtypes) when
+            parsing the original file; the columnar copy already holds the
+            dtypes chosen at ingest and is returned as stored
+    """
+    if has_columnar(filepath):
+        table = feather.read_table(columnar_path(filepath), columns=columns, memory_map=True)
+        return table.to_pandas()
+    data = parse_raw(filepath, columns=columns)
+    if optimize:
+        data, _ = optimize_dtypes(data)
+    return data
+
+def iter_dataset_chunks(filepath, chunk_size=100_000, columns=None):
+    """
+    Yield a dataset as DataFrame chunks without loading it all at once.
+    
+    The columnar copy is read from a memory map and its record batches are
+    sliced, without copying, into chunks of at most chunk_size rows; a CSV
+    is parsed chunk by chunk. Excel files cannot be streamed and are parsed
+    whole, then sliced.
+    
+    Args:
+        filepath: path to a .csv, .xlsx or .xls file
+        chunk_size: maximum rows per chunk
+        columns: optional list of columns to load
+    """
+    if has_columnar(filepath):
+        with pa.memory_map(columnar_path(filepath)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunk_size):
+                    yield batch.slice(start, chunk_size).to_pandas()
+    elif filepath.endswith('.csv'):
+        yield from pd.read_csv(filepath, usecols=columns, chunksize=chunk_size)
+    else:
+        data = parse_raw(filepath, columns=columns)
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+
+def dataframe_nbytes(data):
+    """Estimate the in-memory size of a DataFrame in bytes."""
+    return int(data.memory_usage(deep=True).sum())
@@ -0,0 +1,137 @@
+"""
+In-process cache of parsed datasets shared by all requests of a worker.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from .data_loader import read_dataset, dataframe_nbytes, columnar_path
+
+class DatasetCache:
+    """
+    LRU cache of parsed datasets bounded by a memory budget.
+    
+    Entries are keyed by absolute path plus file mtime and size, so a file
+    that is overwritten by a new upload is parsed again instead of being
+    served stale.
+    """
+    
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        """
+        Initialize the DatasetCache.
+        
+        Args:
+            max_bytes: memory budget for all cached entries, in bytes
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks = {}
+    
+    @staticmethod
+    def make_key(filepath, namespace='data'):
+        """
+        Build the cache key for a file from its path, mtime and size.
+        
+        The mtime of the columnar copy is part of the key too, since a
+        background conversion (e.g. picking another Excel sheet) replaces it
+        without touching the original upload.
+        """
+        stat = os.stat(filepath)
+        columnar = columnar_path(filepath)
+        columnar_mtime = os.stat(columnar).st_mtime_ns if os.path.exists(columnar) else None
+        return (namespace, os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size, columnar_mtime)
+    
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+    
+    def put(self, key, value, nbytes):
+        """
+        Store a value and evict least recently used entries over budget.
+        
+        Values larger than the whole budget are not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+    
+    def get_or_load(self, filepath, loader=read_dataset, namespace='data', size_of=dataframe_nbytes):
+        """
+        Return the parsed dataset for filepath, loading it on a miss.
+        
+        Concurrent misses on the same key wait for a single load.
+        
+        Args:
+            filepath: path of the file on disk
+            loader: callable that parses filepath
+            namespace: separates different derived values of the same file
+            size_of: callable returning the memory footprint of a value
+        """
+        key = self.make_key(filepath, namespace)
+        value = self.get(key)
+        if value is not None:
+            return value
+        
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+            try:
+                value = loader(filepath)
+                # Ingest loaders write the columnar copy, which changes the key
+                self.put(self.make_key(filepath, namespace), value, size_of(value))
+            finally:
+                with self._lock:
+                    self._load_locks.pop(key, None)
+        
+        return value
+    
+    def invalidate(self, filepath=None):
+        """Drop all entries for filepath, or every entry if filepath is None."""
+        with self._lock:
+            if filepath is None:
+                self._entries.clear()
+                self.current_bytes = 0
+                return
+            path = os.path.abspath(filepath)
+            for key in [k for k in self._entries if k[1] == path]:
+                self.current_bytes -= self._entries.pop(key)[1]
+    
+    def stats(self):
+        """Return hit/miss counters and memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
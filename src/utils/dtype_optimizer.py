@@ -0,0 +1,97 @@
+"""
+Load-time dtype optimization to shrink the memory footprint of datasets.
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+
+def _downcast_float(series):
+    """Downcast a float column to float32 only if every value survives the round trip."""
+    if series.dtype != np.float64:
+        return series
+    downcast = series.astype(np.float32)
+    if np.array_equal(downcast.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+        return downcast
+    return series
+
+def _parse_dates(series, sample_size=100):
+    """Convert a text column to datetime if all of its values are dates, else return None."""
+    non_null = series.dropna()
+    if non_null.empty:
+        return None
+    sample = non_null.iloc[:sample_size].astype(str)
+    # Cheap pre-check so free text and numeric codes are not parsed as dates
+    if not sample.str.contains(r'^\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}', regex=True).all():
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        parsed = pd.to_datetime(series, errors='coerce')
+    if parsed.isnull().sum() != series.isnull().sum():
+        return None
+    return parsed
+
+def optimize_dtypes(data, max_category_ratio=0.5, max_categories=1000, parse_dates=True):
+    """
+    Convert columns to compact dtypes without losing values.
+    
+    - integers are downcast to the smallest integer type holding their range
+    - floats become float32 where that is exact
+    - text columns that look like dates become datetime64
+    - low-cardinality text columns become category
+    
+    Args:
+        data: pandas DataFrame
+        max_category_ratio: maximum unique/non-null ratio for a category column
+        max_categories: maximum number of unique values for a category column
+        parse_dates: whether to detect and parse date columns
+    
+    Returns:
+        Tuple of (optimized DataFrame, report dict)
+    """
+    before_bytes = int(data.memory_usage(deep=True).sum())
+    optimized = data.copy()
+    conversions = {}
+    
+    for col in optimized.columns:
+        series = optimized[col]
+        old_dtype = str(series.dtype)
+        
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            converted = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            converted = _downcast_float(series)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            converted = _parse_dates(series) if parse_dates else None
+            if converted is None:
+                non_null = series.count()
+                unique_count = series.nunique()
+                if (non_null > 0 and unique_count <= max_categories and
+                        unique_count / non_null <= max_category_ratio):
+                    converted = series.astype('category')
+                else:
+                    converted = series
+        else:
+            continue
+        
+        if str(converted.dtype) != old_dtype:
+            optimized[col] = converted
+            conversions[col] = f'{old_dtype} -> {converted.dtype}'
+    
+    after_bytes = int(optimized.memory_usage(deep=True).sum())
+    report = {
+        'before_bytes': before_bytes,
+        'after_bytes': after_bytes,
+        'saved_bytes': before_bytes - after_bytes,
+        'reduction_ratio': before_bytes / after_bytes if after_bytes else 1.0,
+        'conversions': conversions
+    }
+    optimized.attrs['memory_report'] = report
+    
+    if conversions:
+        print(f"🗜️ Optimized dtypes: {before_bytes / 1024:.2f} KB -> {after_bytes / 1024:.2f} KB "
+              f"({report['reduction_ratio']:.1f}x smaller)")
+    
+    return optimized, report
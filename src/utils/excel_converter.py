@@ -0,0 +1,177 @@
+"""
+Background conversion of Excel uploads to the columnar format.
+
+Parsing a workbook is by far the slowest load path, so each Excel upload is
+converted once, off the request thread, into the same Arrow copy that CSV
+uploads get. CSV files received in chunks are too large to convert within a
+request, so they are queued here as well. Conversion status is kept in a
+JSON sidecar so every worker process can report it.
+"""
+
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pandas as pd
+
+from .data_loader import HAS_PYARROW, columnar_path, convert_to_columnar, convert_csv_to_columnar_chunked
+from .dtype_optimizer import optimize_dtypes
+from .row_index import RowIndex
+from analysis.sketches import SKETCH_SUFFIX, build_quantile_sketches, save_quantile_sketches
+
+def excel_sheet_names(filepath):
+    """Return the sheet names of a workbook without parsing the sheets."""
+    with pd.ExcelFile(filepath) as workbook:
+        return workbook.sheet_names
+
+def sheet_columnar_path(filepath, sheet):
+    """Return the path of the columnar copy of one sheet of a workbook."""
+    safe_name = re.sub(r'[^A-Za-z0-9_-]+', '_', str(sheet))
+    return f'{filepath}.sheet-{safe_name}.arrow'
+
+def _has_sheet_columnar(filepath, sheet):
+    path = sheet_columnar_path(filepath, sheet)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(filepath)
+
+def _convert_sheet(filepath, sheet):
+    """Parse one sheet and write its columnar copy (runs in a worker process)."""
+    data = pd.read_excel(filepath, sheet_name=sheet)
+    data, _ = optimize_dtypes(data)
+    path = sheet_columnar_path(filepath, sheet)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    data.reset_index(drop=True).to_feather(tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return sheet
+
+class ExcelConverter:
+    """Queue of upload-to-columnar conversions run by a background thread pool."""
+    
+    STATUS_SUFFIX = '.convert.json'
+    
+    def __init__(self, max_workers=2, max_sheet_processes=None):
+        """
+        Initialize the ExcelConverter.
+        
+        Args:
+            max_workers: number of workbooks converted at the same time
+            max_sheet_processes: process limit for parallel multi-sheet
+                conversion (defaults to the CPU count)
+        """
+        self.max_sheet_processes = max_sheet_processes or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='excel-convert')
+    
+    @classmethod
+    def status(cls, filepath):
+        """
+        Return the conversion status dict of an upload, or None if it was
+        never submitted or the file was replaced since.
+        """
+        path = filepath + cls.STATUS_SUFFIX
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            status = json.load(f)
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        if (status.get('source_mtime_ns') != stat.st_mtime_ns or
+                status.get('source_size') != stat.st_size):
+            return None
+        return status
+    
+    def _write_status(self, filepath, **status):
+        # The status describes this version of the upload only
+        stat = os.stat(filepath)
+        status.update(source_mtime_ns=stat.st_mtime_ns, source_size=stat.st_size)
+        path = filepath + self.STATUS_SUFFIX
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f)
+        os.replace(tmp_path, path)
+    
+    def submit(self, filepath, sheet=0, all_sheets=False):
+        """
+        Queue the conversion of a workbook.
+        
+        Args:
+            filepath: path of the Excel upload
+            sheet: sheet name or position used as the dataset
+            all_sheets: also convert every other sheet, in parallel
+                processes, so switching sheets later needs no parsing
+        """
+        # Copies derived from the previously selected sheet no longer describe
+        # the dataset; until the new ones exist, the sheet is parsed directly
+        for path in (columnar_path(filepath), RowIndex.index_path(filepath), filepath + SKETCH_SUFFIX):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._write_status(filepath, status='queued', sheet=sheet)
+        return self._executor.submit(self._convert, filepath, sheet, all_sheets)
+    
+    def submit_csv(self, filepath, dtypes=None, missing=None):
+        """
+        Queue the columnar copy and row index of a CSV received in chunks.
+        
+        Both are passes over the whole file, which may be several GB, so
+        they run here instead of in the request of the last chunk.
+        
+        Args:
+            filepath: path of the completed CSV upload
+            dtypes: column dtypes from the upload profile
+            missing: missing counts per column from the upload profile
+        """
+        self._write_status(filepath, status='queued', step='Waiting for a free worker')
+        return self._executor.submit(self._convert_csv, filepath, dtypes, missing)
+    
+    def _convert_csv(self, filepath, dtypes, missing):
+        try:
+            self._write_status(filepath, status='running', step='Writing the columnar copy')
+            convert_csv_to_columnar_chunked(filepath)
+            self._write_status(filepath, status='running', step='Indexing rows')
+            RowIndex.build(filepath, dtypes=dtypes, missing=missing).save()
+            self._write_status(filepath, status='done')
+        except Exception as e:
+            print(f"❌ Columnar conversion failed for {filepath}: {e}")
+            self._write_status(filepath, status='error', error=str(e))
+    
+    def _convert(self, filepath, sheet, all_sheets):
+        try:
+            self._write_status(filepath, status='running', sheet=sheet)
+            sheets = excel_sheet_names(filepath)
+            if isinstance(sheet, int):
+                sheet = sheets[sheet]
+            if sheet not in sheets:
+                raise ValueError(f"Sheet '{sheet}' not found")
+            
+            pending = [sheet]
+            if all_sheets:
+                pending += [name for name in sheets if name != sheet]
+            pending = [name for name in pending if not _has_sheet_columnar(filepath, name)]
+            
+            if HAS_PYARROW and len(pending) > 1:
+                workers = min(len(pending), self.max_sheet_processes)
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    list(pool.map(_convert_sheet, [filepath] * len(pending), pending))
+            elif HAS_PYARROW and pending:
+                _convert_sheet(filepath, pending[0])
+            
+            if HAS_PYARROW:
+                # The selected sheet becomes the dataset's columnar copy
+                tmp_path = f'{columnar_path(filepath)}.{os.getpid()}.tmp'
+                shutil.copyfile(sheet_columnar_path(filepath, sheet), tmp_path)
+                os.replace(tmp_path, columnar_path(filepath))
+                data = pd.read_feather(columnar_path(filepath))
+            else:
+                data, _ = optimize_dtypes(pd.read_excel(filepath, sheet_name=sheet))
+                convert_to_columnar(filepath, data)
+            
+            RowIndex.build(filepath, data=data).save()
+            save_quantile_sketches(filepath, build_quantile_sketches(data))
+            self._write_status(filepath, status='done', sheet=sheet, sheets=sheets)
+        except Exception as e:
+            print(f"❌ Excel conversion failed for {filepath}: {e}")
+            self._write_status(filepath, status='error', sheet=sheet, error=str(e))
@@ -0,0 +1,231 @@
+"""
+Sidecar row index for uploaded datasets.
+
+The index is built once at ingest and stored next to the upload. It holds
+the row count, schema and null counts, plus the byte offset of every Nth
+row of a CSV file, so previews and pages of rows can be served without
+parsing the rows before them.
+
+Rows are located by scanning for newlines outside double-quoted fields and
+skipping blank lines, as pandas does with its default dialect. When the
+scan disagrees with an already parsed DataFrame (another quote character
+or escaping, for instance), no offsets are kept and pages are read from the
+columnar copy instead.
+"""
+
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from .data_loader import has_columnar, columnar_path
+
+class RowIndex:
+    """Row count, schema, null counts and sparse row offsets of a dataset."""
+    
+    SUFFIX = '.idx.json'
+    
+    def __init__(self, filepath, row_count, columns, dtypes, missing, offsets=None, stride=1000):
+        """
+        Initialize the RowIndex.
+        
+        Args:
+            filepath: path of the indexed upload
+            row_count: number of data rows
+            columns: list of column names
+            dtypes: dict of column name to dtype string
+            missing: dict of column name to null count
+            offsets: byte offset of rows 0, stride, 2*stride, ... (CSV only)
+            stride: number of rows between recorded offsets
+        """
+        self.filepath = filepath
+        self.row_count = row_count
+        self.columns = columns
+        self.dtypes = dtypes
+        self.missing = missing
+        self.offsets = offsets
+        self.stride = stride
+    
+    @classmethod
+    def build(cls, filepath, data=None, dtypes=None, missing=None, stride=1000,
+              block_size=4 * 1024 * 1024):
+        """
+        Build the index of an upload.
+        
+        Schema and null counts are taken from an already parsed DataFrame or
+        from precomputed dtypes/missing dicts, so the rows are not parsed
+        again just for the index.
+        
+        Args:
+            filepath: path of the upload
+            data: parsed DataFrame of the upload
+            dtypes: dict of column dtypes, used when data is None
+            missing: dict of column null counts, used when data is None
+            stride: number of rows between recorded offsets
+            block_size: bytes scanned at a time when locating rows
+        """
+        if data is not None:
+            columns = [str(col) for col in data.columns]
+            dtypes = {str(col): str(dtype) for col, dtype in data.dtypes.items()}
+            missing = {str(col): int(count) for col, count in data.isnull().sum().items()}
+        else:
+            columns = list(dtypes)
+        
+        if not filepath.endswith('.csv'):
+            row_count = len(data) if data is not None else None
+            return cls(filepath, row_count, columns, dtypes, missing, stride=stride)
+        
+        offsets = []
+        row_count = 0
+        with open(filepath, 'rb') as f:
+            _read_record(f)  # header
+            position = f.tell()
+            row_start = position
+            in_quotes = False
+            previous_byte = ord('\n')
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                values = np.frombuffer(block, dtype=np.uint8)
+                newlines = np.flatnonzero(values == ord('\n'))
+                quotes = np.flatnonzero(values == ord('"'))
+                if len(quotes) or in_quotes:
+                    # A newline ends a row only after an even number of quotes;
+                    # escaped quotes ("") come in pairs and keep the parity
+                    quoted = (np.searchsorted(quotes, newlines) + in_quotes) % 2 == 1
+                    newlines = newlines[~quoted]
+                    in_quotes = (in_quotes + len(quotes)) % 2 == 1
+                # Row i starts at row_start for the first row, then after each newline
+                starts = np.concatenate(([row_start], position + newlines + 1))
+                ends = position + newlines
+                # Blank lines, possibly with a carriage return, are skipped like pandas does
+                before_end = np.where(newlines > 0, values[np.maximum(newlines - 1, 0)], previous_byte)
+                lengths = ends - starts[:-1]
+                blank = (lengths == 0) | ((lengths == 1) & (before_end == ord('\r')))
+                # Only rows that ended in this block are complete
+                row_starts = starts[:-1][~blank]
+                rows = np.arange(row_count, row_count + len(row_starts))
+                offsets.extend(row_starts[rows % stride == 0].tolist())
+                row_count += len(row_starts)
+                row_start = int(starts[-1])
+                position += len(block)
+                previous_byte = values[-1]
+            # A final row without a trailing newline
+            tail = position - row_start
+            if tail > 1 or (tail == 1 and previous_byte != ord('\r')):
+                if row_count % stride == 0:
+                    offsets.append(row_start)
+                row_count += 1
+        
+        if data is not None and row_count != len(data):
+            # The parser saw a different dialect; the parsed shape is the truth
+            print(f"⚠️ Row scan of {filepath} found {row_count} rows, pandas {len(data)}; "
+                  f"pages will be read from the columnar copy")
+            return cls(filepath, len(data), columns, dtypes, missing, stride=stride)
+        
+        return cls(filepath, row_count, columns, dtypes, missing, offsets=offsets, stride=stride)
+    
+    @classmethod
+    def index_path(cls, filepath):
+        return filepath + cls.SUFFIX
+    
+    def save(self):
+        """Write the index next to the upload."""
+        stat = os.stat(self.filepath)
+        payload = {
+            'source_mtime_ns': stat.st_mtime_ns,
+            'source_size': stat.st_size,
+            'row_count': self.row_count,
+            'columns': self.columns,
+            'dtypes': self.dtypes,
+            'missing': self.missing,
+            'offsets': self.offsets,
+            'stride': self.stride
+        }
+        path = self.index_path(self.filepath)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, filepath):
+        """Load the index of an upload, or None if it is missing or stale."""
+        path = cls.index_path(filepath)
+        if not os.path.exists(path) or not os.path.exists(filepath):
+            return None
+        with open(path) as f:
+            payload = json.load(f)
+        stat = os.stat(filepath)
+        if (payload['source_mtime_ns'] != stat.st_mtime_ns or
+                payload['source_size'] != stat.st_size):
+            return None
+        return cls(filepath, payload['row_count'], payload['columns'], payload['dtypes'],
+                   payload['missing'], offsets=payload['offsets'], stride=payload['stride'])
+    
+    @property
+    def shape(self):
+        return (self.row_count, len(self.columns))
+    
+    def read_rows(self, offset=0, limit=10):
+        """
+        Read a page of rows without parsing the rows before it.
+        
+        CSV files seek to the nearest recorded offset; other formats slice
+        the memory-mapped columnar copy.
+        
+        Args:
+            offset: index of the first row to return
+            limit: maximum number of rows to return
+        """
+        if offset < 0 or limit < 0:
+            raise ValueError("offset and limit must not be negative")
+        if self.row_count is not None:
+            limit = max(0, min(limit, self.row_count - offset))
+        if limit == 0:
+            return pd.DataFrame(columns=self.columns)
+        
+        if self.offsets is None:
+            if has_columnar(self.filepath):
+                import pyarrow.feather as feather
+                table = feather.read_table(columnar_path(self.filepath), memory_map=True)
+                return table.slice(offset, limit).to_pandas()
+            if not self.filepath.endswith('.csv'):
+                raise ValueError("No columnar copy available for random access")
+            # Unindexed CSV: parse up to the end of the page
+            return pd.read_csv(self.filepath, nrows=offset + limit).iloc[offset:].reset_index(drop=True)
+        
+        block_start = self.offsets[offset // self.stride]
+        skip = offset % self.stride
+        records = []
+        with open(self.filepath, 'rb') as f:
+            header = _read_record(f)
+            f.seek(block_start)
+            for _ in range(skip):
+                _read_record(f)
+            for _ in range(limit):
+                record = _read_record(f)
+                if not record:
+                    break
+                records.append(record if record.endswith(b'\n') else record + b'\n')
+        
+        return pd.read_csv(io.BytesIO(header + b''.join(records)))
+
+def _read_record(f):
+    """
+    Read the next CSV row from a binary file, or b'' at the end.
+    
+    A row spans several lines while a double-quoted field is open, and
+    blank lines are skipped, matching the offsets recorded by RowIndex.build.
+    """
+    while True:
+        record = f.readline()
+        while record.count(b'"') % 2 == 1:
+            line = f.readline()
+            if not line:
+                break
+            record += line
+        if not record or record.strip(b'\r\n'):
+            return record
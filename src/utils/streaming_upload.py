@@ -0,0 +1,312 @@
+"""
+Chunked upload handling with incremental profiling for large CSV files.
+
+The client sends the file as a sequence of bounded chunks. Each chunk is
+appended to a partial file on disk and only the newly completed lines are
+parsed, so memory use stays flat regardless of the file size and a running
+summary is available after every chunk.
+"""
+
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from analysis.sketches import KLLSketch, save_quantile_sketches
+
+def _merge_dtype(current, new):
+    """Combine the dtype seen so far with the dtype of a new chunk."""
+    if current is None or current == new:
+        return new
+    try:
+        a, b = np.dtype(current), np.dtype(new)
+        if a.kind in 'biuf' and b.kind in 'biuf':
+            return str(np.promote_types(a, b))
+    except TypeError:
+        pass
+    return 'object'
+
+def _is_numeric_dtype_name(name):
+    try:
+        return np.dtype(name).kind in 'biuf'
+    except TypeError:
+        return False
+
+class IncrementalProfiler:
+    """
+    Running row count, dtypes, missing counts, head and per-column quantile
+    sketches over DataFrame chunks.
+    """
+    
+    def __init__(self, head_rows=5, sketch_error=0.01):
+        """
+        Initialize the IncrementalProfiler.
+        
+        Args:
+            head_rows: number of leading rows kept for the preview
+            sketch_error: normalized rank error of the numeric column sketches
+        """
+        self.head_rows = head_rows
+        self.sketch_error = sketch_error
+        self.sketches = {}
+        self.row_count = 0
+        self.columns = []
+        self.dtypes = {}
+        self.missing = {}
+        self.head = []
+    
+    def update(self, chunk):
+        """
+        Fold a DataFrame chunk into the profile.
+        
+        Args:
+            chunk: pandas DataFrame with the same columns as earlier chunks
+        """
+        if not self.columns:
+            self.columns = [str(col) for col in chunk.columns]
+        
+        null_counts = chunk.isnull().sum()
+        for col in chunk.columns:
+            key = str(col)
+            self.missing[key] = self.missing.get(key, 0) + int(null_counts[col])
+            # An all-missing chunk says nothing about the column type
+            if null_counts[col] < len(chunk):
+                self.dtypes[key] = _merge_dtype(self.dtypes.get(key), str(chunk[col].dtype))
+            if pd.api.types.is_numeric_dtype(chunk[col]):
+                if key not in self.sketches:
+                    self.sketches[key] = KLLSketch.from_error(self.sketch_error)
+                self.sketches[key].update(chunk[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        
+        if len(self.head) < self.head_rows:
+            needed = self.head_rows - len(self.head)
+            self.head.extend(json.loads(chunk.head(needed).to_json(orient='records', date_format='iso')))
+        
+        self.row_count += len(chunk)
+    
+    def summary(self):
+        """Return the profile in the same layout as a fully loaded upload."""
+        head = pd.DataFrame(self.head, columns=self.columns)
+        return {
+            'shape': (self.row_count, len(self.columns)),
+            'columns': list(self.columns),
+            'dtypes': {col: self.dtypes.get(col, 'object') for col in self.columns},
+            'head': head.to_dict(),
+            'missing': dict(self.missing)
+        }
+    
+    def to_state(self):
+        """Return a JSON-serializable snapshot of the profile."""
+        return {
+            'head_rows': self.head_rows,
+            'sketch_error': self.sketch_error,
+            'sketches': {col: sketch.to_dict() for col, sketch in self.sketches.items()},
+            'row_count': self.row_count,
+            'columns': self.columns,
+            'dtypes': self.dtypes,
+            'missing': self.missing,
+            'head': self.head
+        }
+    
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a profiler from a snapshot created by to_state()."""
+        profiler = cls(head_rows=state['head_rows'], sketch_error=state.get('sketch_error', 0.01))
+        profiler.sketches = {col: KLLSketch.from_dict(sketch)
+                             for col, sketch in state.get('sketches', {}).items()}
+        profiler.row_count = state['row_count']
+        profiler.columns = state['columns']
+        profiler.dtypes = state['dtypes']
+        profiler.missing = state['missing']
+        profiler.head = state['head']
+        return profiler
+
+class StreamingUpload:
+    """
+    A CSV upload received as a sequence of chunks.
+    
+    Progress is kept in a JSON sidecar next to the partial file, so chunks
+    of one upload may be handled by different worker processes.
+    
+    Quoted fields containing newlines are not supported, because chunks are
+    split on line boundaries before parsing.
+    """
+    
+    PART_SUFFIX = '.part'
+    STATE_SUFFIX = '.part.json'
+    PROFILE_SUFFIX = '.profile.json'
+    
+    def __init__(self, filepath, block_size=4 * 1024 * 1024, max_bytes=None):
+        """
+        Initialize the StreamingUpload.
+        
+        Args:
+            filepath: final path of the uploaded file
+            block_size: bytes read from the request and parsed at a time
+            max_bytes: optional limit on the total upload size
+        """
+        self.filepath = filepath
+        self.part_path = filepath + self.PART_SUFFIX
+        self.state_path = filepath + self.STATE_SUFFIX
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        else:
+            self.state = self._initial_state()
+        self.profiler = IncrementalProfiler.from_state(self.state['profile'])
+    
+    @staticmethod
+    def _initial_state(total_bytes=None):
+        return {
+            'received_bytes': 0,
+            'parsed_bytes': 0,
+            'total_bytes': total_bytes,
+            'header': None,
+            'complete': False,
+            'profile': IncrementalProfiler().to_state()
+        }
+    
+    @property
+    def received_bytes(self):
+        return self.state['received_bytes']
+    
+    def append(self, stream, offset, final=False, total_bytes=None):
+        """
+        Append one chunk of the upload and profile its complete lines.
+        
+        A chunk at offset 0 starts the upload over, discarding what an
+        interrupted upload of the same name left behind; to resume one,
+        send the next chunk at received_bytes instead.
+        
+        Args:
+            stream: file-like object with the chunk body
+            offset: byte offset of the chunk within the whole file
+            final: whether this is the last chunk
+            total_bytes: optional size of the whole file, reported by
+                summary() so a client can tell whether a partial upload
+                is its own before resuming it
+        
+        Returns:
+            Running summary of the upload
+        """
+        if self.state['complete']:
+            raise ValueError("Upload is already complete")
+        if offset == 0:
+            self.state = self._initial_state(total_bytes)
+            self.profiler = IncrementalProfiler()
+        if offset != self.received_bytes:
+            raise ValueError(f"Expected chunk at offset {self.received_bytes}, got {offset}")
+        
+        mode = 'ab' if offset > 0 else 'wb'
+        with open(self.part_path, mode) as part:
+            while True:
+                block = stream.read(self.block_size)
+                if not block:
+                    break
+                self.state['received_bytes'] += len(block)
+                if self.max_bytes is not None and self.received_bytes > self.max_bytes:
+                    raise ValueError(f"Upload exceeds the limit of {self.max_bytes} bytes")
+                part.write(block)
+        
+        self._parse_pending(final)
+        
+        if final:
+            self._finalize()
+        else:
+            self._save_state()
+        
+        return self.summary()
+    
+    def _parse_pending(self, final):
+        """Parse the bytes received since the last complete line."""
+        with open(self.part_path, 'rb') as part:
+            part.seek(self.state['parsed_bytes'])
+            
+            if self.state['header'] is None:
+                header = part.readline()
+                if not header.endswith(b'\n') and not final:
+                    return
+                self.state['header'] = header.decode('utf-8')
+                self.state['parsed_bytes'] = part.tell()
+            header = self.state['header'].encode('utf-8')
+            if not header.endswith(b'\n'):
+                header += b'\n'
+            
+            carry = b''
+            while True:
+                block = part.read(self.block_size)
+                if not block and not carry:
+                    break
+                data = carry + block
+                at_end = not block
+                if at_end and final:
+                    complete, carry = data, b''
+                else:
+                    cut = data.rfind(b'\n') + 1
+                    complete, carry = data[:cut], data[cut:]
+                
+                if complete.strip():
+                    chunk = pd.read_csv(io.BytesIO(header + complete))
+                    self.profiler.update(chunk)
+                self.state['parsed_bytes'] += len(complete)
+                
+                if at_end:
+                    break
+    
+    def _finalize(self):
+        """Move the completed file into place and store its profile."""
+        os.replace(self.part_path, self.filepath)
+        self.state['complete'] = True
+        self.state['profile'] = self.profiler.to_state()
+        # The profile describes this version of the file only, see load_upload_profile()
+        stat = os.stat(self.filepath)
+        profile = dict(self.state['profile'], source_mtime_ns=stat.st_mtime_ns, source_size=stat.st_size)
+        profile_path = self.filepath + self.PROFILE_SUFFIX
+        tmp_path = f'{profile_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(profile, f)
+        os.replace(tmp_path, profile_path)
+        # Drop sketches of columns that turned out not to be numeric
+        save_quantile_sketches(self.filepath, {
+            col: sketch for col, sketch in self.profiler.sketches.items()
+            if _is_numeric_dtype_name(self.profiler.dtypes.get(col, 'object'))
+        })
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+    
+    def _save_state(self):
+        self.state['profile'] = self.profiler.to_state()
+        tmp_path = f'{self.state_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+    
+    def summary(self):
+        """Return the running profile plus upload progress."""
+        summary = self.profiler.summary()
+        summary['received_bytes'] = self.received_bytes
+        summary['total_bytes'] = self.state.get('total_bytes')
+        summary['complete'] = self.state['complete']
+        return summary
+
+def load_upload_profile(filepath):
+    """
+    Return the stored profile of a completed streaming upload, or None if
+    there is none or the file was replaced since, e.g. by a regular upload.
+    """
+    profile_path = filepath + StreamingUpload.PROFILE_SUFFIX
+    if not os.path.exists(profile_path):
+        return None
+    with open(profile_path) as f:
+        profile = json.load(f)
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    if (profile.get('source_mtime_ns') != stat.st_mtime_ns or
+            profile.get('source_size') != stat.st_size):
+        return None
+    return IncrementalProfiler.from_state(profile).summary()
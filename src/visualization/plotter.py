@@ -19,14 +19,26 @@ sns.set_palette("husl")
 class Plotter:
     """Class for creating various types of plots and visualizations."""
     
-    def __init__(self, figsize=(10, 6)):
+    def __init__(self, figsize=(10, 6), max_points=None, seed=42):
         """
         Initialize the Plotter.
         
         Args:
             figsize: Default figure size for matplotlib plots
+            max_points: if set, point-level plots draw a uniform random sample
+                of at most this many rows, which keeps very large datasets
+                interactive without visibly changing the shape of a plot
+            seed: random seed of that sample
         """
         self.figsize = figsize
+        self.max_points = max_points
+        self.seed = seed
+    
+    def _points(self, data):
+        """Down-sample data to max_points rows, keeping the original row order."""
+        if self.max_points is None or len(data) <= self.max_points:
+            return data
+        return data.sample(n=self.max_points, random_state=self.seed).sort_index()
         
     def plot_distribution(self, data, column, plot_type='hist', save_path=None):
         """
@@ -38,6 +50,7 @@ class Plotter:
             plot_type: 'hist', 'box', 'violin', or 'kde'
             save_path: path to save the plot
         """
+        data = self._points(data)
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
         fig.suptitle(f'Distribution Analysis: {column}', fontsize=16, fontweight='bold')
         
@@ -122,6 +135,7 @@ class Plotter:
             color_col: column for color coding (optional)
             save_path: path to save the plot
         """
+        data = self._points(data)
         plt.figure(figsize=self.figsize)
         
         if color_col and color_col in data.columns:
@@ -224,6 +238,7 @@ class Plotter:
             value_col: value column name
             save_path: path to save the plot
         """
+        data = self._points(data)
         # Convert date column to datetime
         data[date_col] = pd.to_datetime(data[date_col])
         
@@ -255,6 +270,7 @@ class Plotter:
             color_col: column for color coding (optional)
             plot_type: 'scatter', 'line', 'bar'
         """
+        data = self._points(data)
         if plot_type == 'scatter':
             fig = px.scatter(data, x=x_col, y=y_col, color=color_col,
                            title=f'Interactive Scatter: {x_col} vs {y_col}',
@@ -284,6 +300,7 @@ class Plotter:
             columns: list of column names
             save_path: path to save the plot
         """
+        data = self._points(data)
         n_cols = min(3, len(columns))
         n_rows = (len(columns) + n_cols - 1) // n_cols
         
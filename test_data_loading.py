@@ -0,0 +1,300 @@
+"""
+Test script to verify dataset loading, caching and ingest sidecars.
+"""
+
+import sys
+import os
+import tempfile
+import io
+import numpy as np
+import pandas as pd
+sys.path.append('src')
+
+from utils.dataset_cache import DatasetCache
+from utils.data_loader import (HAS_PYARROW, convert_to_columnar, convert_csv_to_columnar_chunked, has_columnar,
+                               columnar_path, read_dataset, ingest_upload, iter_dataset_chunks, dataset_columns)
+from utils.dtype_optimizer import optimize_dtypes
+from utils.row_index import RowIndex
+from utils.excel_converter import ExcelConverter
+from utils.streaming_upload import StreamingUpload, load_upload_profile
+from utils.data_generator import generate_sample_data
+
+def write_csv(directory, name, n_samples=300):
+    """Write a generated dataset and return its path."""
+    filepath = os.path.join(directory, name)
+    generate_sample_data(filepath, n_samples=n_samples)
+    return filepath
+
+def touch_later(filepath):
+    """Bump the mtime of a file, as a new upload under the same name would."""
+    stat = os.stat(filepath)
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 60 * 10 ** 9))
+
+def test_dataset_cache():
+    """Test cache hits, misses, invalidation on change and the byte budget."""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = write_csv(tmp, 'first.csv')
+        second = write_csv(tmp, 'second.csv')
+        loads = []
+        
+        def loader(path):
+            loads.append(path)
+            return pd.read_csv(path)
+        
+        cache = DatasetCache(max_bytes=10 ** 9)
+        data = cache.get_or_load(first, loader=loader)
+        assert cache.get_or_load(first, loader=loader) is data
+        assert len(loads) == 1 and cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+        
+        # An overwritten file is a new key
+        touch_later(first)
+        cache.get_or_load(first, loader=loader)
+        assert len(loads) == 2
+        
+        # The budget holds one dataset: loading another evicts the least recently used
+        nbytes = cache.stats()['current_bytes'] // 2
+        cache = DatasetCache(max_bytes=int(nbytes * 1.5))
+        cache.get_or_load(first, loader=loader)
+        cache.get_or_load(second, loader=loader)
+        stats = cache.stats()
+        assert stats['entries'] == 1 and stats['evictions'] == 1 and stats['current_bytes'] <= cache.max_bytes
+        
+        # Values larger than the budget are returned but not cached
+        small = DatasetCache(max_bytes=1)
+        small.get_or_load(first, loader=loader)
+        assert small.stats()['entries'] == 0 and small.stats()['current_bytes'] == 0
+        
+        cache.invalidate(second)
+        assert cache.stats()['entries'] == 0 and cache.stats()['current_bytes'] == 0
+    print("✅ Dataset cache hits, evicts and stays within its budget")
+
+def test_columnar_round_trip():
+    """Test that the columnar copy loads the same frame as parsing the original."""
+    if not HAS_PYARROW:
+        print("⚠️ pyarrow not installed, skipping columnar round trip")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = write_csv(tmp, 'data.csv')
+        parsed = pd.read_csv(filepath)
+        assert not has_columnar(filepath)
+        
+        assert convert_to_columnar(filepath) == columnar_path(filepath) and has_columnar(filepath)
+        pd.testing.assert_frame_equal(read_dataset(filepath), parsed)
+        pd.testing.assert_frame_equal(read_dataset(filepath, columns=['age', 'city']), parsed[['age', 'city']])
+        assert dataset_columns(filepath) == parsed.columns.tolist()
+        chunks = list(iter_dataset_chunks(filepath, chunk_size=70))
+        assert max(len(chunk) for chunk in chunks) == 70
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), parsed)
+        
+        # The copy written chunk by chunk holds the same rows
+        assert convert_csv_to_columnar_chunked(filepath, chunksize=70) is not None
+        pd.testing.assert_frame_equal(read_dataset(filepath), parsed)
+        
+        # Ingest stores the optimized frame, which loads back unchanged
+        ingested = ingest_upload(filepath)
+        pd.testing.assert_frame_equal(read_dataset(filepath), ingested)
+        
+        # A replaced upload is parsed again, not served from the old copy
+        touch_later(filepath)
+        assert not has_columnar(filepath)
+        pd.testing.assert_frame_equal(read_dataset(filepath, optimize=False), parsed)
+    print("✅ Columnar copies round-trip the parsed datasets")
+
+def send_chunk(filepath, raw, start, stop, final=False):
+    """Send raw[start:stop] to the streaming upload of filepath, as one request would."""
+    upload = StreamingUpload(filepath, block_size=1000)
+    return upload.append(io.BytesIO(raw[start:stop]), start, final=final, total_bytes=len(raw))
+
+def test_streaming_upload():
+    """Test chunked uploads: offset checks, resume across instances and the final profile."""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_csv(tmp, 'source.csv')
+        raw = open(source, 'rb').read()
+        parsed = pd.read_csv(source)
+        filepath = os.path.join(tmp, 'upload.csv')
+        bounds = [0, 5000, 12345, len(raw)]
+        
+        send_chunk(filepath, raw, bounds[0], bounds[1])
+        
+        # A chunk past the received bytes is refused, and the state is untouched
+        try:
+            send_chunk(filepath, raw, bounds[2], bounds[3])
+            assert False, "offset mismatch accepted"
+        except ValueError:
+            pass
+        assert StreamingUpload(filepath).received_bytes == bounds[1]
+        
+        # Resuming from the reported offset, in a new instance, completes the upload
+        summary = send_chunk(filepath, raw, bounds[1], bounds[2])
+        assert summary['received_bytes'] == bounds[2] and summary['shape'][0] < len(parsed)
+        summary = send_chunk(filepath, raw, bounds[2], bounds[3], final=True)
+        assert summary['complete'] and open(filepath, 'rb').read() == raw
+        assert summary['shape'] == parsed.shape
+        assert summary['missing'] == parsed.isnull().sum().to_dict()
+        
+        profile = load_upload_profile(filepath)
+        assert profile['shape'] == parsed.shape and profile['columns'] == parsed.columns.tolist()
+        
+        # The profile of a replaced file is not served
+        touch_later(filepath)
+        assert load_upload_profile(filepath) is None
+        
+        # After an interrupted upload, a retry from offset 0 starts over...
+        retried = os.path.join(tmp, 'retried.csv')
+        send_chunk(retried, raw, 0, bounds[2])
+        assert StreamingUpload(retried).summary()['total_bytes'] == len(raw)
+        summary = send_chunk(retried, raw, 0, bounds[1])
+        assert summary['received_bytes'] == bounds[1] and summary['shape'][0] == raw[:bounds[1]].count(b'\n') - 1
+        # ...and one resuming from the reported progress completes it
+        offset = StreamingUpload(retried).received_bytes
+        summary = send_chunk(retried, raw, offset, bounds[3], final=True)
+        assert open(retried, 'rb').read() == raw and summary['shape'] == parsed.shape
+        assert summary['missing'] == parsed.isnull().sum().to_dict()
+    print("✅ Streaming uploads check offsets, resume and profile every row")
+
+def test_optimize_dtypes():
+    """Test that dtype optimization keeps every value and reports the memory saved."""
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'small_int': rng.integers(0, 100, 1000),
+        'big_int': rng.integers(0, 2 ** 40, 1000),
+        'exact_float': rng.integers(0, 1000, 1000) / 4,
+        'precise_float': rng.normal(size=1000),
+        'label': rng.choice(['a', 'b', 'c'], 1000),
+        'free_text': [f'row {i}' for i in range(1000)],
+        'joined': pd.date_range('2020-01-01', periods=1000).strftime('%Y-%m-%d')
+    })
+    data.loc[::7, 'exact_float'] = np.nan
+    
+    optimized, report = optimize_dtypes(data)
+    dtypes = optimized.dtypes.astype(str).to_dict()
+    assert dtypes['small_int'] == 'int8' and dtypes['big_int'] == 'int64'
+    assert dtypes['exact_float'] == 'float32' and dtypes['precise_float'] == 'float64'
+    assert dtypes['label'] == 'category' and dtypes['free_text'] != 'category'
+    assert pd.api.types.is_datetime64_any_dtype(optimized['joined'])
+    
+    for col in data.columns:
+        if col == 'joined':
+            assert (optimized[col].dt.strftime('%Y-%m-%d') == data[col]).all()
+        elif pd.api.types.is_numeric_dtype(data[col]):
+            assert np.array_equal(optimized[col].to_numpy(dtype=np.float64), data[col].to_numpy(dtype=np.float64),
+                                  equal_nan=True), col
+        else:
+            assert (optimized[col].astype(str) == data[col].astype(str)).all(), col
+    
+    assert report['before_bytes'] == data.memory_usage(deep=True).sum()
+    assert report['after_bytes'] == optimized.memory_usage(deep=True).sum() < report['before_bytes']
+    assert set(report['conversions']) == {'small_int', 'exact_float', 'label', 'joined'}
+    assert optimized.attrs['memory_report'] == report
+    print("✅ Dtype optimization is lossless and reports its savings")
+
+def test_row_index():
+    """Test that row offsets and pages match pandas, including a last row without newline."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = write_csv(tmp, 'data.csv', n_samples=1050)
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        with open(filepath, 'wb') as f:
+            f.write(raw.rstrip(b'\n'))
+        parsed = pd.read_csv(filepath)
+        
+        index = RowIndex.build(filepath, data=parsed, stride=100, block_size=4096)
+        assert index.shape == parsed.shape and len(index.offsets) == 11
+        with open(filepath, 'rb') as f:
+            lines = f.read().split(b'\n')
+        assert all(raw.startswith(lines[1 + row], offset) for row, offset in zip(range(0, 1050, 100), index.offsets))
+        
+        index.save()
+        loaded = RowIndex.load(filepath)
+        assert loaded.offsets == index.offsets and loaded.missing == parsed.isnull().sum().to_dict()
+        for offset, limit in [(0, 5), (99, 3), (100, 10), (1045, 10), (1050, 5)]:
+            page = loaded.read_rows(offset, limit)
+            expected = parsed.iloc[offset:offset + limit].reset_index(drop=True)
+            assert len(page) == len(expected), (offset, limit)
+            if len(page):
+                pd.testing.assert_frame_equal(page, expected, check_dtype=False)
+        
+        touch_later(filepath)
+        assert RowIndex.load(filepath) is None
+        
+        # Newlines inside quoted fields and blank lines do not start rows
+        for raw in [b'id,note\n1,"a\nb"\n2,c\n3,d\n', b'id,note\r\n\r\n1,"say ""hi\r\n"""\r\n2,c\r\n3,d']:
+            with open(filepath, 'wb') as f:
+                f.write(raw)
+            parsed = pd.read_csv(filepath)
+            index = RowIndex.build(filepath, data=parsed, stride=2, block_size=3)
+            assert index.shape == parsed.shape == (3, 2) and index.offsets is not None
+            for offset in range(3):
+                pd.testing.assert_frame_equal(index.read_rows(offset, 2),
+                                              parsed.iloc[offset:offset + 2].reset_index(drop=True))
+        
+        # A quote the parser reads literally: the scan disagrees, so pages are parsed instead
+        with open(filepath, 'wb') as f:
+            f.write(b'id,size\n1,5" pipe\n2,a\n3,b\n')
+        parsed = pd.read_csv(filepath)
+        index = RowIndex.build(filepath, data=parsed)
+        assert index.shape == parsed.shape and index.offsets is None
+        pd.testing.assert_frame_equal(index.read_rows(1, 2), parsed.iloc[1:3].reset_index(drop=True))
+    print("✅ Row index pages match pandas")
+
+def test_excel_conversion():
+    """Test the conversion status of workbooks and streamed CSVs from queued to done."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = os.path.join(tmp, 'book.xlsx')
+        sheets = {'first': pd.DataFrame({'a': range(5)}), 'second': pd.DataFrame({'b': ['x', 'y', 'z']})}
+        with pd.ExcelWriter(filepath) as writer:
+            for name, frame in sheets.items():
+                frame.to_excel(writer, sheet_name=name, index=False)
+        
+        converter = ExcelConverter(max_workers=1)
+        assert converter.status(filepath) is None
+        future = converter.submit(filepath, sheet='second')
+        assert converter.status(filepath)['status'] in ('queued', 'running', 'done')
+        future.result()
+        status = converter.status(filepath)
+        assert status['status'] == 'done' and status['sheet'] == 'second' and status['sheets'] == list(sheets)
+        assert read_dataset(filepath)['b'].astype(str).tolist() == ['x', 'y', 'z']
+        assert RowIndex.load(filepath).row_count == 3
+        
+        # Another sheet is loaded as soon as it is picked, converted or not
+        future = converter.submit(filepath, sheet='first')
+        assert read_dataset(filepath).columns.tolist() == ['a']
+        future.result()
+        assert read_dataset(filepath)['a'].tolist() == list(range(5)) and RowIndex.load(filepath).row_count == 5
+        
+        # A sheet that failed to convert is not replaced by the first one
+        converter.submit(filepath, sheet='missing').result()
+        assert converter.status(filepath)['status'] == 'error'
+        try:
+            read_dataset(filepath)
+            assert False, "loaded a sheet that was not picked"
+        except ValueError:
+            pass
+        
+        # A replaced workbook starts over
+        touch_later(filepath)
+        assert converter.status(filepath) is None
+        
+        csv_path = write_csv(tmp, 'streamed.csv')
+        parsed = pd.read_csv(csv_path)
+        dtypes = parsed.dtypes.astype(str).to_dict()
+        converter.submit_csv(csv_path, dtypes=dtypes, missing=parsed.isnull().sum().to_dict()).result()
+        assert converter.status(csv_path)['status'] == 'done'
+        assert RowIndex.load(csv_path).row_count == len(parsed)
+        assert has_columnar(csv_path) == HAS_PYARROW
+    print("✅ Conversions report their status from queued to done")
+
+def main():
+    """Run all tests."""
+    print("🧪 Testing Dataset Loading")
+    print("=" * 30)
+    test_dataset_cache()
+    test_columnar_round_trip()
+    test_streaming_upload()
+    test_optimize_dtypes()
+    test_row_index()
+    test_excel_conversion()
+    print("\n🎉 Dataset loading tests complete!")
+
+if __name__ == "__main__":
+    main()
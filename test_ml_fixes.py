@@ -4,11 +4,22 @@ Test script to verify machine learning training fixes.
 
 import sys
 import os
+import tempfile
+import threading
+import time
+import uuid
+import numpy as np
 import pandas as pd
 sys.path.append('src')
 
 from models.predictor import Predictor
+from models.registry import ModelRegistry, dataset_fingerprint, stored_fingerprint, model_key
+from models.scoring import score_to_csv
+from models.jobs import JobQueue
+from models.search import search_candidates, successive_halving
+from utils.cpu_budget import CPUBudget
 from utils.data_generator import generate_sample_data
+from utils.dtype_optimizer import optimize_dtypes
 
 def test_ml_training():
     """Test machine learning training with various scenarios."""
@@ -115,5 +126,209 @@ def test_ml_training():
     print("\n🎉 Machine Learning Testing Complete!")
     print("All core functionality has been verified and fixed.")
 
+def test_model_registry():
+    """Test that stored models are reused per data and config, and evicted over budget."""
+    os.makedirs('data', exist_ok=True)
+    data = generate_sample_data('data/ml_test_data.csv', n_samples=200)
+    features = ['age', 'education_years', 'department']
+    config = {'features': features, 'target': 'income', 'model_type': 'random_forest'}
+    
+    def train():
+        predictor = Predictor()
+        predictor.train_model(data, features, 'income', model_type='random_forest')
+        return predictor
+    
+    with tempfile.TemporaryDirectory() as root:
+        # The fingerprint is stored for every worker, and forgotten when the file changes
+        filepath = os.path.join(root, 'data.csv')
+        data.to_csv(filepath, index=False)
+        assert stored_fingerprint(filepath) is None
+        fingerprint = dataset_fingerprint(filepath)
+        assert os.path.exists(filepath + '.fingerprint.json') and stored_fingerprint(filepath) == fingerprint
+        stat = os.stat(filepath)
+        os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 60 * 10 ** 9))
+        assert stored_fingerprint(filepath) is None and dataset_fingerprint(filepath) == fingerprint
+        
+        key = model_key(fingerprint, config)
+        assert key != model_key(fingerprint, dict(config, model_type='linear'))
+        assert key != model_key(fingerprint, dict(config, sheet='Other'))
+        
+        registry = ModelRegistry(root)
+        trained, cached = registry.get_or_train(key, train)
+        assert not cached
+        
+        # Another process sees the same artifact on disk
+        loaded, cached = ModelRegistry(root).get_or_train(key, train)
+        assert cached and loaded.X_train is None
+        assert loaded.performance == trained.performance
+        assert np.allclose(loaded.predict(data.head(20)), trained.predict(data.head(20)))
+        
+        registry.max_bytes = 1
+        registry.put('other', trained)
+        assert registry.get(key) is None and registry.get('other') is not None
+    print("✅ Model registry reuses fitted models")
+
+def test_batch_scoring():
+    """Test that chunked, parallel scoring matches scoring all rows at once."""
+    data = generate_sample_data('data/ml_test_data.csv', n_samples=200)
+    features = ['age', 'satisfaction_score', 'department']
+    predictor = Predictor()
+    predictor.train_model(data, features, 'performance_rating', model_type='random_forest')
+    
+    # Missing values are filled with training values, not per-chunk means
+    new_data = data.copy()
+    new_data.loc[:99, 'satisfaction_score'] = np.nan
+    expected = predictor.predict(new_data)
+    assert (predictor.predict(new_data.iloc[:100]) == expected[:100]).all()
+    
+    chunks = [new_data.iloc[start:start + 64] for start in range(0, len(new_data), 64)]
+    with tempfile.TemporaryDirectory() as root:
+        destination = os.path.join(root, 'scored.csv')
+        rows = score_to_csv(predictor, iter(chunks), destination, n_jobs=2, columns=['age'])
+        scored = pd.read_csv(destination)
+    assert rows == len(new_data) and list(scored.columns) == ['age', 'predicted_performance_rating']
+    assert (scored['predicted_performance_rating'].to_numpy() == expected).all()
+    print("✅ Batch scoring matches whole-frame predictions")
+
+def test_training_jobs():
+    """Test background training jobs: progress, results, limits and cancellation."""
+    data = generate_sample_data('data/ml_test_data.csv', n_samples=200)
+    release = threading.Event()
+    
+    def train(progress):
+        predictor = Predictor()
+        predictor.train_model(data, ['age', 'education_years'], 'income', model_type='random_forest',
+                              progress=progress)
+        return {'r2_score': predictor.performance['r2_score']}
+    
+    def blocked(progress):
+        while not release.wait(0.01):
+            progress(0.5, 'Waiting')
+        return {}
+    
+    def wait(queue, job_id):
+        while queue.status(job_id)['status'] in ('queued', 'running'):
+            time.sleep(0.01)
+        return queue.status(job_id)
+    
+    with tempfile.TemporaryDirectory() as root:
+        queue = JobQueue(root, max_workers=1, max_pending=1)
+        status = wait(queue, queue.submit(train, filename='ml_test_data.csv'))
+        assert status['status'] == 'done' and status['progress'] == 1.0
+        assert status['filename'] == 'ml_test_data.csv' and 'r2_score' in status['result']
+        
+        running = queue.submit(blocked, key='blocked')
+        assert queue.submit(blocked, key='blocked') == running
+        queued = queue.submit(train)
+        try:
+            queue.submit(train)
+            assert False, "the queue should be full"
+        except RuntimeError:
+            pass
+        
+        # A queued job is dropped at once, a running one stops at its next progress report
+        assert queue.cancel(queued) and queue.status(queued)['status'] == 'cancelled'
+        assert queue.cancel(running) and wait(queue, running)['status'] == 'cancelled'
+        assert not queue.cancel(running)
+        release.set()
+        
+        # A job whose worker process died is reported failed once its heartbeat is stale
+        dead = uuid.uuid4().hex
+        queue._write_status(dead, {'id': dead, 'status': 'running', 'progress': 0.5, 'pid': 0})
+        other = JobQueue(root, stale_after=60)
+        assert other.status(dead)['status'] == 'running'
+        os.utime(os.path.join(root, dead + JobQueue.STATUS_SUFFIX), (time.time() - 120, time.time() - 120))
+        assert other.status(dead)['status'] == 'error' and 'stopped' in other.status(dead)['error']
+        assert not other.cancel(dead) and queue.status(dead)['status'] == 'error'
+    print("✅ Training jobs report progress and can be cancelled")
+
+def test_cpu_budget():
+    """Test that concurrent tasks split the threads of a process."""
+    budget = CPUBudget(cores=8, processes=2)
+    assert budget.threads == 4
+    first = budget.reserve()
+    assert first == 4 and budget.reserve(2) == 1
+    budget.release(1)
+    budget.release(first)
+    with budget.reserved(3) as threads:
+        assert threads == 3 and budget.reserve() == 1
+    
+    data = generate_sample_data('data/ml_test_data.csv', n_samples=200)
+    predictor = Predictor()
+    performance = predictor.train_model(data, ['age', 'education_years'], 'income', model_type='random_forest',
+                                        n_jobs=2)
+    assert performance['n_jobs'] == 2 and predictor.model.n_jobs is None
+    print("✅ CPU budget splits threads between tasks")
+
+def test_pipeline_cross_validation():
+    """Test that cross-validation refits the preprocessing on every training fold."""
+    data = generate_sample_data('data/ml_test_data.csv', n_samples=200)
+    features = ['age', 'education_years', 'department']
+    
+    predictor = Predictor()
+    predictor.train_model(data, features, 'performance_rating', model_type='logistic')
+    serial = predictor.cross_validate_pipeline(cv_folds=4)
+    parallel = predictor.cross_validate_pipeline(cv_folds=4, n_jobs=2)
+    assert len(serial['scores']) == len(serial['fit_times']) == len(serial['score_times']) == 4
+    assert serial['scores'] == parallel['scores'] and parallel['n_jobs'] == 2
+    assert all(0 <= score <= 1 for score in serial['scores']) and min(serial['fit_times']) > 0
+    assert predictor.cross_validate(cv_folds=4).tolist() == serial['scores']
+    
+    regressor = Predictor()
+    regressor.train_model(data, features, 'income', model_type='random_forest')
+    results = regressor.cross_validate_pipeline(cv_folds=3, n_jobs=-1)
+    assert results['scoring'] == 'r2' and len(results['scores']) == 3
+    print("✅ Leakage-free cross-validation returns per-fold scores and timings")
+
+def test_auto_model_search():
+    """Test that auto mode searches model families and reports its leaderboard."""
+    data = generate_sample_data('data/ml_test_data.csv', n_samples=200)
+    features = ['age', 'education_years', 'department']
+    
+    candidates = search_candidates(is_classification=True, n_candidates=9)
+    assert len(candidates) == 9 and len({candidate['family'] for candidate in candidates[:3]}) == 3
+    
+    predictor = Predictor()
+    performance = predictor.train_model(data, features, 'performance_rating', model_type='auto', time_budget=30)
+    leaderboard = performance['leaderboard']
+    assert leaderboard[0]['name'] == performance['selected_model'] and leaderboard[0]['score'] is not None
+    assert max(entry['round'] for entry in leaderboard) > 0
+    assert len(predictor.predict(data.head(5))) == 5
+    
+    # A spent budget still returns the best of the fits started before the deadline
+    X = predictor.X_train
+    search = successive_halving(candidates, X, predictor.y_train, 'accuracy', time_budget=1e-9)
+    assert len(search['leaderboard']) >= 1 and search['best']['name'] == search['leaderboard'][0]['name']
+    
+    # Threads are split between parallel fits and the native pool of each fit
+    search = successive_halving(candidates[:2], X, predictor.y_train, 'accuracy', n_jobs=5)
+    assert search['n_jobs'] == 4
+    performance = Predictor().train_model(data, features, 'performance_rating', model_type='auto',
+                                          time_budget=30, n_jobs=2)
+    assert performance['n_jobs'] == 2
+    print("✅ Auto mode selects a model by successive halving")
+
+def test_datetime_features():
+    """Test that parsed date columns are usable as features."""
+    data, _ = optimize_dtypes(generate_sample_data('data/ml_test_data.csv', n_samples=200))
+    assert pd.api.types.is_datetime64_any_dtype(data['hire_date'])
+    
+    predictor = Predictor()
+    predictor.train_model(data, ['age', 'department', 'hire_date'], 'income', model_type='random_forest')
+    assert predictor.datetime_columns == ['hire_date']
+    
+    # Dates read back as text from a CSV chunk are parsed the same way
+    text_dates = data.head(10).astype({'hire_date': str})
+    assert (predictor.predict(text_dates) == predictor.predict(data.head(10))).all()
+    assert len(predictor.cross_validate_pipeline(cv_folds=3)['scores']) == 3
+    print("✅ Date columns are used as days since the epoch")
+
 if __name__ == "__main__":
     test_ml_training()
+    test_model_registry()
+    test_batch_scoring()
+    test_training_jobs()
+    test_cpu_budget()
+    test_pipeline_cross_validation()
+    test_auto_model_search()
+    test_datetime_features()
@@ -0,0 +1,338 @@
+"""
+Test script to verify the streaming statistics engine.
+"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append('src')
+
+from analysis.streaming_stats import StreamingStats
+from analysis.sketches import KLLSketch, HyperLogLog, SpaceSaving, bit_length, build_quantile_sketches
+from analysis.correlation import correlation_matrix, top_correlations
+from analysis.duplicates import DuplicateTracker, find_duplicates
+from analysis.data_analyzer import DataAnalyzer
+from analysis.incremental import AnalysisState
+from analysis.sampling import ReservoirSampler, draw_sample
+from analysis.out_of_core import OutOfCoreAnalyzer
+from analysis.missing_patterns import MissingPatterns
+from analysis.aggregation import AGGREGATIONS
+from utils.column_store import ColumnStore
+
+def make_test_data(n_samples=2000):
+    """Create a mixed-type DataFrame with missing values."""
+    rng = np.random.default_rng(42)
+    data = pd.DataFrame({
+        'income': rng.lognormal(10.5, 0.5, n_samples),
+        'age': rng.integers(18, 65, n_samples),
+        'score': rng.normal(5, 2, n_samples),
+        'department': rng.choice(['Engineering', 'Sales', 'HR'], n_samples)
+    })
+    data.loc[rng.choice(n_samples, 100, replace=False), 'score'] = np.nan
+    return data
+
+def test_matches_describe():
+    """Single-frame statistics match DataFrame.describe()."""
+    data = make_test_data()
+    expected = data.select_dtypes(include=[np.number]).describe().to_dict()
+    summary = StreamingStats.from_frame(data).describe()
+    
+    assert list(summary) == list(expected)
+    for col in expected:
+        for stat, value in expected[col].items():
+            assert np.isclose(summary[col][stat], value), (col, stat)
+    print("✅ Frame statistics match describe()")
+
+def test_merge_chunks():
+    """Statistics merged from chunks match a single pass."""
+    data = make_test_data()
+    merged = StreamingStats()
+    for start in range(0, len(data), 300):
+        merged.merge(StreamingStats.from_frame(data.iloc[start:start + 300]))
+    
+    expected = data.select_dtypes(include=[np.number]).describe().to_dict()
+    summary = merged.describe()
+    for col in expected:
+        for stat in ['count', 'mean', 'std', 'min', 'max']:
+            assert np.isclose(summary[col][stat], expected[col][stat]), (col, stat)
+    assert merged.missing_values() == data.isnull().sum().to_dict()
+    print("✅ Merged chunk statistics match a single pass")
+
+def test_kll_quantiles():
+    """Merged KLL sketches stay within their rank error bound."""
+    rng = np.random.default_rng(7)
+    values = rng.lognormal(0, 1, 200_000)
+    sketch = KLLSketch.from_error(0.01)
+    for start in range(0, len(values), 50_000):
+        sketch.merge(KLLSketch.from_error(0.01).update(values[start:start + 50_000]))
+    
+    sorted_values = np.sort(values)
+    for q in [0.25, 0.5, 0.75]:
+        rank = np.searchsorted(sorted_values, sketch.quantile(q)) / len(values)
+        assert abs(rank - q) < 0.02, (q, rank)
+    assert sketch.n == len(values)
+    print("✅ KLL sketch quantiles within error bound")
+
+def test_chunk_quartiles_from_sketches():
+    """Chunked statistics report sketch-based quartiles."""
+    data = make_test_data()
+    summary = StreamingStats.from_chunks(
+        data.iloc[start:start + 500] for start in range(0, len(data), 500)
+    ).describe()
+    expected = data['income'].quantile(0.5)
+    assert abs(summary['income']['50%'] - expected) / expected < 0.05
+    print("✅ Chunked quartiles come from sketches")
+
+def test_categorical_sketches():
+    """Distinct counts and heavy hitters stay close to the exact values."""
+    rng = np.random.default_rng(3)
+    values = pd.Series(rng.zipf(1.3, 300_000).astype(str))
+    distinct = HyperLogLog()
+    heavy_hitters = SpaceSaving(capacity=200)
+    for start in range(0, len(values), 50_000):
+        distinct.merge(HyperLogLog().update(values.iloc[start:start + 50_000]))
+        heavy_hitters.update(values.iloc[start:start + 50_000])
+    
+    expected = values.nunique()
+    assert abs(distinct.count() - expected) / expected < 0.05
+    assert list(heavy_hitters.top(5)) == list(values.value_counts().index[:5])
+    assert HyperLogLog.from_dict(distinct.to_dict()).count() == distinct.count()
+    
+    # Register ranks need exact bit lengths, also past the 53-bit float mantissa
+    edges = [0, 1, 2 ** 32 - 1, 2 ** 32, 2 ** 53 + 1, 2 ** 60 - 1, 2 ** 64 - 1]
+    assert bit_length(np.array(edges, dtype=np.uint64)).tolist() == [value.bit_length() for value in edges]
+    print("✅ Categorical sketches match exact counts")
+
+def test_parallel_matches_serial():
+    """Column-sharded statistics and correlations match the serial results."""
+    data = make_test_data()
+    serial = StreamingStats.from_frame(data).describe()
+    parallel = StreamingStats.from_frame(data, n_jobs=3)
+    assert parallel.columns == list(data.columns)
+    assert parallel.describe() == serial
+    
+    expected = data.select_dtypes(include=[np.number]).corr()
+    corr = correlation_matrix(data, n_jobs=2, block_size=2)
+    assert np.allclose(corr.to_numpy(), expected.to_numpy())
+    print("✅ Parallel profiling matches serial results")
+
+def test_top_correlations():
+    """Top-k mode finds the strongest pairs of the dense matrix."""
+    rng = np.random.default_rng(11)
+    data = pd.DataFrame(rng.normal(size=(1000, 40))).add_prefix('x')
+    data['x1'] = data['x0'] + rng.normal(scale=0.1, size=1000)
+    data['x2'] = -data['x3'] + rng.normal(scale=0.5, size=1000)
+    
+    pairs = top_correlations(data, k=2, block_size=8)
+    assert [(pair['var1'], pair['var2']) for pair in pairs] == [('x0', 'x1'), ('x2', 'x3')]
+    assert np.isclose(pairs[1]['correlation'], data['x2'].corr(data['x3']), atol=1e-5)
+    print("✅ Top-k correlations match the dense matrix")
+
+def test_rank_correlations():
+    """Spearman and Kendall matrices match pandas."""
+    data = make_test_data().dropna()
+    data['income_rank'] = data['income'].rank() + np.arange(len(data)) % 3
+    for method in ['spearman', 'kendall']:
+        expected = data.select_dtypes(include=[np.number]).corr(method=method)
+        corr = correlation_matrix(data, method=method, n_jobs=2)
+        assert np.allclose(corr.to_numpy(), expected.to_numpy()), method
+    print("✅ Rank correlations match pandas")
+
+def test_duplicate_detection():
+    """Hash-based duplicates match duplicated(), also over appended chunks."""
+    data = make_test_data().round({'income': -4, 'score': 0})
+    expected = data.duplicated().sum()
+    report = find_duplicates(data, chunk_size=300)
+    assert report['duplicates'] == expected
+    
+    largest = report['groups'][0]
+    assert len(data.iloc[largest['rows']].drop_duplicates()) == 1
+    assert largest['size'] == data.groupby(list(data.columns), dropna=False).size().max()
+    
+    tracker = DuplicateTracker(columns=['age', 'department'])
+    tracker.update(data.iloc[:1000])
+    tracker.update(data.iloc[1000:])
+    assert tracker.duplicates == data.duplicated(['age', 'department']).sum()
+    print("✅ Duplicate detection matches duplicated()")
+
+def test_analyzer_memoization():
+    """The analyzer shares the caller's data and drops stale intermediates."""
+    data = make_test_data()
+    analyzer = DataAnalyzer(data)
+    assert np.shares_memory(analyzer.data['income'].to_numpy(), data['income'].to_numpy())
+    assert analyzer.summary_stats is analyzer.summary_stats
+    
+    analyzer.data['double_age'] = analyzer.data['age'] * 2
+    assert 'double_age' in analyzer.numeric_columns
+    assert 'double_age' not in data.columns
+    assert analyzer.correlation_matrix().loc['age', 'double_age'] == 1.0
+    
+    # Structural changes drop memoized results, not the caller's sketches
+    sketches = build_quantile_sketches(data)
+    analyzer = DataAnalyzer(data, quantile_sketches=sketches)
+    analyzer.data['half_age'] = analyzer.data['age'] / 2
+    assert 'half_age' in analyzer.numeric_columns
+    assert analyzer.quantile_sketches == sketches
+    
+    # Writes through either frame stay private to it
+    analyzer.data.loc[0, 'income'] = -1.0
+    assert data.loc[0, 'income'] != -1.0
+    print("✅ Analyzer memoizes intermediates and invalidates them")
+
+def test_incremental_analysis():
+    """Updating a state with appended rows matches analyzing all rows."""
+    data = make_test_data()
+    data = pd.concat([data, data.iloc[:50]], ignore_index=True)
+    state = AnalysisState.build(data.iloc[:1500])
+    assert state.extends(data)
+    assert not state.extends(data.iloc[::-1].reset_index(drop=True))
+    state.update(data.iloc[1500:])
+    full = AnalysisState.build(data)
+    
+    for col in ['count', 'mean', 'std']:
+        assert np.isclose(state.stats.describe()['score'][col], full.stats.describe()['score'][col])
+    assert state.duplicates.duplicates == data.duplicated().sum()
+    assert np.allclose(state.correlations.matrix(), data.select_dtypes(include=[np.number]).corr())
+    
+    analyzer = DataAnalyzer(data, analysis_state=state)
+    assert analyzer.null_counts['score'] == data['score'].isnull().sum()
+    
+    # Chunked states only sketch quartiles; in-memory data still gets describe()'s exact ones
+    chunked = AnalysisState.build(data, chunk_size=500)
+    expected = data.select_dtypes(include=[np.number]).describe().to_dict()
+    summary = DataAnalyzer(data, analysis_state=chunked).basic_stats()['numeric_summary']
+    for col in expected:
+        for stat, value in expected[col].items():
+            assert np.isclose(summary[col][stat], value), (col, stat)
+    assert chunked.stats.quantiles is None
+    print("✅ Incremental analysis matches a full pass")
+
+def test_sampling_estimates():
+    """Test reservoir and stratified samples and their confidence intervals."""
+    data = make_test_data(20000)
+    chunks = [data.iloc[start:start + 3000] for start in range(0, len(data), 3000)]
+    
+    sampler = ReservoirSampler(500)
+    for chunk in chunks:
+        sampler.update(chunk)
+    assert len(sampler.sample) == 500 and sampler.rows_seen == len(data)
+    
+    for stratify_by in [None, 'department']:
+        sample = draw_sample(chunks, 1000, stratify_by=stratify_by)
+        assert sample.population_rows == len(data)
+        analyzer = DataAnalyzer.from_sample(sample)
+        stats = analyzer.basic_stats()
+        assert stats['shape'][0] == len(data)
+        mean = stats['confidence_intervals']['numeric_summary']['income']['mean']
+        assert mean['lower'] <= data['income'].mean() <= mean['upper']
+        missing = stats['confidence_intervals']['missing_values']['score']
+        assert missing['lower'] <= data['score'].isnull().sum() <= missing['upper']
+    print("✅ Sample estimates cover the full-data values")
+
+def test_out_of_core_analysis():
+    """Test reports over memory-mapped column files against in-memory analysis."""
+    data = make_test_data(3000)
+    data = pd.concat([data, data.iloc[:25]], ignore_index=True)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = os.path.join(tmp, 'data.csv')
+        data.to_csv(filepath, index=False)
+        store = ColumnStore.build(filepath, chunk_size=700)
+        assert store.rows == len(data)
+        assert ColumnStore.open(filepath).kinds == store.kinds
+        
+        analyzer = OutOfCoreAnalyzer(store, chunk_size=1000)
+        stats = analyzer.basic_stats()
+        assert stats['missing_values'] == data.isnull().sum().to_dict()
+        assert np.isclose(stats['numeric_summary']['income']['mean'], data['income'].mean())
+        assert stats['categorical_summary']['department'] == data['department'].value_counts().to_dict()
+        assert np.allclose(analyzer.correlation_analysis(), data.select_dtypes(include=[np.number]).corr())
+        report = analyzer.data_quality_report()
+        assert report['duplicates'] == data.duplicated().sum()
+        assert report['co_missingness'] == DataAnalyzer(data).data_quality_report()['co_missingness']
+        
+        outliers = analyzer.detect_outliers('score', method='zscore')
+        z_scores = (data['score'] - data['score'].mean()).abs() / data['score'].std(ddof=0)
+        assert list(outliers.index) == list(data.index[z_scores > 3])
+    print("✅ Out-of-core analysis matches in-memory analysis")
+
+def test_missing_patterns():
+    """Test pattern counts and co-missingness against the unpacked null mask."""
+    rng = np.random.default_rng(7)
+    data = make_test_data(5000)
+    data.loc[rng.choice(len(data), 400, replace=False), 'income'] = np.nan
+    data.loc[data['income'].isnull() & (rng.random(len(data)) < 0.5), 'department'] = None
+    mask = data.isnull()
+    
+    patterns = MissingPatterns(data.columns)
+    for start in range(0, len(data), 1500):
+        patterns.merge(MissingPatterns(data.columns).update(data.iloc[start:start + 1500]))
+    expected = mask.value_counts()
+    assert patterns.n_patterns == len(expected)
+    for pattern in patterns.top(len(expected)):
+        key = tuple(col in pattern['columns'] for col in data.columns)
+        assert pattern['count'] == expected[key], pattern
+    
+    co_missing = patterns.co_missingness()
+    missing_columns = list(co_missing.index)
+    assert missing_columns == [col for col in data.columns if mask[col].any()]
+    indicators = mask[missing_columns].astype(int)
+    assert (co_missing.to_numpy() == (indicators.T @ indicators).to_numpy()).all()
+    assert np.allclose(patterns.co_missingness('correlation'), indicators.corr())
+    
+    report = DataAnalyzer(data).data_quality_report()
+    assert report['n_missing_patterns'] == len(expected)
+    assert report['missing_patterns'][0]['columns'] == []
+    assert report['co_missingness'] == co_missing.to_dict()
+    print("✅ Missing-value patterns match the null mask")
+
+def test_aggregation():
+    """Test group-by aggregation over cached group indexes against pandas."""
+    data = make_test_data()
+    data['region'] = np.where(data['age'] % 3 == 0, 'North', 'South')
+    data.loc[::50, 'department'] = None
+    analyzer = DataAnalyzer(data)
+    
+    for func in AGGREGATIONS:
+        result = analyzer.aggregate(['department', 'region'], ['income', 'score'], func)
+        expected = data.groupby(['department', 'region'])[['income', 'score']].agg(func)
+        if func == 'size':
+            expected = pd.concat([expected, expected], axis=1)
+        assert result.index.equals(expected.index), func
+        assert np.allclose(result.to_numpy(dtype=float), expected.to_numpy(dtype=float), equal_nan=True), func
+    
+    # Every key column is factorized once, whatever is aggregated
+    index = analyzer.group_index('department')
+    analyzer.aggregate('department', 'age', ['min', 'max'])
+    assert analyzer.group_index('department') is index
+    
+    pivot = analyzer.aggregate('department', 'score', 'mean', pivot='region')
+    expected = data.pivot_table(index='department', columns='region', values='score', aggfunc='mean')
+    assert np.allclose(pivot.to_numpy(), expected.to_numpy())
+    print("✅ Group-by aggregation matches pandas")
+
+def main():
+    """Run all tests."""
+    print("🧪 Testing Streaming Statistics")
+    print("=" * 30)
+    test_matches_describe()
+    test_merge_chunks()
+    test_kll_quantiles()
+    test_chunk_quartiles_from_sketches()
+    test_categorical_sketches()
+    test_parallel_matches_serial()
+    test_top_correlations()
+    test_rank_correlations()
+    test_duplicate_detection()
+    test_analyzer_memoization()
+    test_incremental_analysis()
+    test_sampling_estimates()
+    test_out_of_core_analysis()
+    test_missing_patterns()
+    test_aggregation()
+    print("\n🎉 Streaming statistics tests complete!")
+
+if __name__ == "__main__":
+    main()